@@ -0,0 +1,96 @@
+"""Esquema inicial: users y dive_logs
+
+Equivale a las tablas que creaba /api/v1/recreate-tables.
+Bases de datos existentes creadas con ese endpoint: `alembic stamp 0001`
+y después `alembic upgrade head`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("profile_image", sa.String(), nullable=True),
+        sa.Column("location", sa.String(), nullable=True),
+        sa.Column("certification_level", sa.String(), nullable=True),
+        sa.Column("certification_agency", sa.String(), nullable=True),
+        sa.Column("total_dives", sa.Integer(), nullable=True),
+        sa.Column("max_depth_achieved", sa.Float(), nullable=True),
+        sa.Column("diving_since", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_login", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "dive_logs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("dive_number", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("dive_date", sa.DateTime(), nullable=False),
+        sa.Column("dive_time_start", sa.DateTime(), nullable=True),
+        sa.Column("dive_time_end", sa.DateTime(), nullable=True),
+        sa.Column("dive_duration", sa.Integer(), nullable=True),
+        sa.Column("location_lat", sa.Float(), nullable=True),
+        sa.Column("location_lng", sa.Float(), nullable=True),
+        sa.Column("dive_site_name", sa.String(), nullable=False),
+        sa.Column("country", sa.String(), nullable=True),
+        sa.Column("region", sa.String(), nullable=True),
+        sa.Column("max_depth", sa.Float(), nullable=False),
+        sa.Column("avg_depth", sa.Float(), nullable=True),
+        sa.Column("water_temperature", sa.Float(), nullable=True),
+        sa.Column("air_temperature", sa.Float(), nullable=True),
+        sa.Column("visibility", sa.Float(), nullable=True),
+        sa.Column("suit_type", sa.String(), nullable=True),
+        sa.Column("suit_thickness", sa.String(), nullable=True),
+        sa.Column("weight_used", sa.Float(), nullable=True),
+        sa.Column("tank_volume", sa.Float(), nullable=True),
+        sa.Column("gas_mix", sa.String(), nullable=True),
+        sa.Column("start_pressure", sa.Integer(), nullable=True),
+        sa.Column("end_pressure", sa.Integer(), nullable=True),
+        sa.Column("current", sa.String(), nullable=True),
+        sa.Column("surge", sa.String(), nullable=True),
+        sa.Column("weather", sa.String(), nullable=True),
+        sa.Column("sea_state", sa.String(), nullable=True),
+        sa.Column("buddy_name", sa.String(), nullable=True),
+        sa.Column("dive_guide", sa.String(), nullable=True),
+        sa.Column("safety_stop", sa.Boolean(), nullable=True),
+        sa.Column("safety_stop_time", sa.Integer(), nullable=True),
+        sa.Column("marine_life", sa.Text(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("rating", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_dive_logs_id", "dive_logs", ["id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dive_logs_id", table_name="dive_logs")
+    op.drop_table("dive_logs")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
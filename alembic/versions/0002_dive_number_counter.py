@@ -0,0 +1,42 @@
+"""dive_number único por usuario (contador atómico en users.total_dives)
+
+Antes de crear la restricción se renumeran los duplicados que pudieron
+crear inserciones concurrentes y se alinea total_dives con el mayor
+dive_number de cada usuario.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Renumerar solo los usuarios con dive_number repetidos
+    op.execute("""
+        UPDATE dive_logs SET dive_number = numbered.new_number
+        FROM (
+            SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY dive_number, id) AS new_number
+            FROM dive_logs
+            WHERE user_id IN (
+                SELECT user_id FROM dive_logs GROUP BY user_id, dive_number HAVING COUNT(*) > 1
+            )
+        ) AS numbered
+        WHERE dive_logs.id = numbered.id
+    """)
+    op.execute("""
+        UPDATE users SET total_dives = latest.max_number
+        FROM (SELECT user_id, MAX(dive_number) AS max_number FROM dive_logs GROUP BY user_id) AS latest
+        WHERE users.id = latest.user_id AND COALESCE(users.total_dives, 0) < latest.max_number
+    """)
+    op.create_unique_constraint("uq_dive_logs_user_dive_number", "dive_logs", ["user_id", "dive_number"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_dive_logs_user_dive_number", "dive_logs", type_="unique")
@@ -0,0 +1,55 @@
+"""Estadísticas materializadas por usuario
+
+Crea user_dive_stats y user_country_stats y las rellena desde dive_logs
+(equivalente a `python -m app.services.user_stats rebuild`).
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "user_dive_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("dive_count", sa.Integer(), nullable=False),
+        sa.Column("total_minutes", sa.Integer(), nullable=False),
+        sa.Column("depth_sum", sa.Float(), nullable=False),
+        sa.Column("depth_count", sa.Integer(), nullable=False),
+        sa.Column("max_depth", sa.Float(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_table(
+        "user_country_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("country", sa.String(), primary_key=True),
+        sa.Column("dive_count", sa.Integer(), nullable=False),
+    )
+
+    op.execute("""
+        INSERT INTO user_dive_stats (user_id, dive_count, total_minutes, depth_sum, depth_count, max_depth)
+        SELECT user_id, COUNT(id), COALESCE(SUM(dive_duration), 0), COALESCE(SUM(avg_depth), 0),
+               COUNT(avg_depth), MAX(max_depth)
+        FROM dive_logs
+        GROUP BY user_id
+    """)
+    op.execute("""
+        INSERT INTO user_country_stats (user_id, country, dive_count)
+        SELECT user_id, COALESCE(country, 'Unknown'), COUNT(id)
+        FROM dive_logs
+        GROUP BY user_id, COALESCE(country, 'Unknown')
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("user_country_stats")
+    op.drop_table("user_dive_stats")
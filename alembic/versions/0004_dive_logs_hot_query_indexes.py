@@ -0,0 +1,43 @@
+"""Índices compuestos para las consultas por usuario de dive_logs
+
+- (user_id, dive_number): ya lo cubre uq_dive_logs_user_dive_number (0002)
+- (user_id, dive_date DESC, id DESC): listados paginados y comprobaciones de propiedad
+- (user_id, country): agrupaciones por país
+
+En Postgres se crean con CONCURRENTLY para no bloquear escrituras.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    concurrently = op.get_bind().dialect.name == "postgresql"
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dive_logs_user_date_id",
+            "dive_logs",
+            ["user_id", sa.text("dive_date DESC"), sa.text("id DESC")],
+            postgresql_concurrently=concurrently,
+        )
+        op.create_index(
+            "ix_dive_logs_user_country",
+            "dive_logs",
+            ["user_id", "country"],
+            postgresql_concurrently=concurrently,
+        )
+    op.execute("ANALYZE dive_logs")
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dive_logs_user_country", table_name="dive_logs")
+    op.drop_index("ix_dive_logs_user_date_id", table_name="dive_logs")
@@ -0,0 +1,93 @@
+"""Geohash de dive_logs para búsquedas por cercanía
+
+Añade dive_logs.geohash (calculado desde location_lat/location_lng),
+lo rellena para los dives existentes y crea los índices de rango.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+# Copia congelada de app.core.geohash: la migración no debe cambiar si
+# cambia el código de la aplicación
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+STORED_PRECISION = 9
+
+
+def geohash_for(lat, lng):
+    """Geohash de precisión STORED_PRECISION (None sin coordenadas)"""
+    if lat is None or lng is None:
+        return None
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < STORED_PRECISION:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def upgrade() -> None:
+    op.add_column("dive_logs", sa.Column("geohash", sa.String(length=12), nullable=True))
+
+    bind = op.get_bind()
+    dive_logs = sa.table(
+        "dive_logs",
+        sa.column("id", sa.Integer),
+        sa.column("location_lat", sa.Float),
+        sa.column("location_lng", sa.Float),
+        sa.column("geohash", sa.String),
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(dive_logs.c.id, dive_logs.c.location_lat, dive_logs.c.location_lng)
+            .where(
+                dive_logs.c.id > last_id,
+                dive_logs.c.location_lat.isnot(None),
+                dive_logs.c.location_lng.isnot(None),
+            )
+            .order_by(dive_logs.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            dive_logs.update().where(dive_logs.c.id == sa.bindparam("row_id")).values(geohash=sa.bindparam("value")),
+            [{"row_id": row.id, "value": geohash_for(row.location_lat, row.location_lng)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    op.create_index("ix_dive_logs_geohash", "dive_logs", ["geohash"])
+    op.create_index("ix_dive_logs_user_geohash", "dive_logs", ["user_id", "geohash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_dive_logs_user_geohash", table_name="dive_logs")
+    op.drop_index("ix_dive_logs_geohash", table_name="dive_logs")
+    op.drop_column("dive_logs", "geohash")
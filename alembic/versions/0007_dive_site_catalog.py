@@ -0,0 +1,233 @@
+"""Catálogo deduplicado de países y sitios de buceo
+
+Crea countries y dive_sites, añade dive_logs.site_id/country_id y los
+rellena con la misma normalización y coincidencia difusa que el catálogo
+de la aplicación. user_country_stats pasa a indexarse por country_id.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import difflib
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+# Copia congelada de la normalización de app.services.dive_sites: la
+# migración no debe cambiar si cambia el código de la aplicación
+UNKNOWN_COUNTRY = "Unknown"
+SITE_MATCH_CUTOFF = 0.88
+COUNTRY_ALIASES = {
+    "usa": "united states",
+    "us": "united states",
+    "united states of america": "united states",
+    "eeuu": "united states",
+    "ee uu": "united states",
+    "u s a": "united states",
+    "estados unidos": "united states",
+    "uk": "united kingdom",
+    "reino unido": "united kingdom",
+    "great britain": "united kingdom",
+    "espana": "spain",
+    "egipto": "egypt",
+    "filipinas": "philippines",
+    "tailandia": "thailand",
+    "maldivas": "maldives",
+    "brasil": "brazil",
+    "francia": "france",
+    "italia": "italy",
+    "grecia": "greece",
+    "croacia": "croatia",
+}
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+
+
+def normalize_name(name):
+    if not name:
+        return ""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", ascii_name.lower()).strip()
+
+
+def normalize_country(name):
+    normalized = normalize_name(name) or normalize_name(UNKNOWN_COUNTRY)
+    return COUNTRY_ALIASES.get(normalized, normalized)
+
+
+def best_match(normalized, candidates):
+    """Candidato más parecido por encima del umbral; los números deben coincidir"""
+    digits = _DIGITS.findall(normalized)
+    candidates = [candidate for candidate in candidates if _DIGITS.findall(candidate) == digits]
+    matches = difflib.get_close_matches(normalized, candidates, n=1, cutoff=SITE_MATCH_CUTOFF)
+    return matches[0] if matches else None
+
+countries = sa.table(
+    "countries",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("normalized_name", sa.String),
+)
+dive_sites = sa.table(
+    "dive_sites",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("normalized_name", sa.String),
+    sa.column("country_id", sa.Integer),
+    sa.column("region", sa.String),
+)
+dive_logs = sa.table(
+    "dive_logs",
+    sa.column("id", sa.Integer),
+    sa.column("dive_site_name", sa.String),
+    sa.column("country", sa.String),
+    sa.column("region", sa.String),
+    sa.column("site_id", sa.Integer),
+    sa.column("country_id", sa.Integer),
+)
+
+
+def _build_catalog(bind) -> dict:
+    """
+    Crear países y sitios desde los textos existentes
+    La grafía más frecuente de cada sitio queda como nombre canónico
+    Devuelve (dive_site_name, country) -> (site_id, country_id)
+    """
+    country_ids = {}
+    site_ids = {}  # country_id -> {normalized_name: site_id}
+    mapping = {}
+
+    def country_id_for(name):
+        normalized = normalize_country(name)
+        if normalized not in country_ids:
+            aliased = normalize_name(name) != normalized and name
+            display = normalized.title() if aliased else (name or UNKNOWN_COUNTRY).strip()
+            country_ids[normalized] = bind.execute(
+                countries.insert().values(name=display, normalized_name=normalized).returning(countries.c.id)
+            ).scalar_one()
+        return country_ids[normalized]
+
+    dives = sa.func.count(dive_logs.c.id)
+    pairs = bind.execute(
+        sa.select(dive_logs.c.dive_site_name, dive_logs.c.country, sa.func.max(dive_logs.c.region))
+        .group_by(dive_logs.c.dive_site_name, dive_logs.c.country)
+        .order_by(dives.desc())
+    ).all()
+    for site_name, country, region in pairs:
+        country_id = country_id_for(country)
+        sites = site_ids.setdefault(country_id, {})
+        normalized = normalize_name(site_name)
+        site_id = None
+        if normalized:
+            match = normalized if normalized in sites else best_match(normalized, sites)
+            if match is not None:
+                site_id = sites[match]
+            else:
+                site_id = bind.execute(
+                    dive_sites.insert().values(
+                        name=site_name.strip(), normalized_name=normalized, country_id=country_id, region=region
+                    ).returning(dive_sites.c.id)
+                ).scalar_one()
+                sites[normalized] = site_id
+        mapping[(site_name, country)] = (site_id, country_id)
+    return mapping
+
+
+def upgrade() -> None:
+    op.create_table(
+        "countries",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("normalized_name", sa.String(), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_table(
+        "dive_sites",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("normalized_name", sa.String(), nullable=False),
+        sa.Column("country_id", sa.Integer(), sa.ForeignKey("countries.id"), nullable=False),
+        sa.Column("region", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.UniqueConstraint("country_id", "normalized_name", name="uq_dive_sites_country_name"),
+    )
+    op.add_column("dive_logs", sa.Column("site_id", sa.Integer(), sa.ForeignKey("dive_sites.id"), nullable=True))
+    op.add_column("dive_logs", sa.Column("country_id", sa.Integer(), sa.ForeignKey("countries.id"), nullable=True))
+
+    bind = op.get_bind()
+    mapping = _build_catalog(bind)
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(dive_logs.c.id, dive_logs.c.dive_site_name, dive_logs.c.country)
+            .where(dive_logs.c.id > last_id)
+            .order_by(dive_logs.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for row in rows:
+            site_id, country_id = mapping[(row.dive_site_name, row.country)]
+            values.append({"row_id": row.id, "new_site_id": site_id, "new_country_id": country_id})
+        bind.execute(
+            dive_logs.update()
+            .where(dive_logs.c.id == sa.bindparam("row_id"))
+            .values(site_id=sa.bindparam("new_site_id"), country_id=sa.bindparam("new_country_id")),
+            values,
+        )
+        last_id = rows[-1].id
+
+    op.drop_index("ix_dive_logs_user_country", table_name="dive_logs")
+    op.create_index("ix_dive_logs_user_country_id", "dive_logs", ["user_id", "country_id"])
+    op.create_index("ix_dive_logs_site_id", "dive_logs", ["site_id"])
+
+    # Contadores por país: la clave pasa del texto libre a country_id
+    op.drop_table("user_country_stats")
+    op.create_table(
+        "user_country_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("country_id", sa.Integer(), sa.ForeignKey("countries.id"), primary_key=True),
+        sa.Column("dive_count", sa.Integer(), nullable=False),
+    )
+    op.execute("""
+        INSERT INTO user_country_stats (user_id, country_id, dive_count)
+        SELECT user_id, country_id, COUNT(id)
+        FROM dive_logs
+        GROUP BY user_id, country_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table("user_country_stats")
+    op.create_table(
+        "user_country_stats",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("country", sa.String(), primary_key=True),
+        sa.Column("dive_count", sa.Integer(), nullable=False),
+    )
+    op.execute("""
+        INSERT INTO user_country_stats (user_id, country, dive_count)
+        SELECT user_id, COALESCE(country, 'Unknown'), COUNT(id)
+        FROM dive_logs
+        GROUP BY user_id, COALESCE(country, 'Unknown')
+    """)
+
+    op.drop_index("ix_dive_logs_site_id", table_name="dive_logs")
+    op.drop_index("ix_dive_logs_user_country_id", table_name="dive_logs")
+    op.create_index("ix_dive_logs_user_country", "dive_logs", ["user_id", "country"])
+    with op.batch_alter_table("dive_logs") as batch_op:
+        batch_op.drop_column("country_id")
+        batch_op.drop_column("site_id")
+    op.drop_table("dive_sites")
+    op.drop_table("countries")
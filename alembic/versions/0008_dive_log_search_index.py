@@ -0,0 +1,48 @@
+"""Índice GIN de búsqueda full-text en dive_logs
+
+Índice de expresión sobre el tsvector ponderado de sitio, país, región,
+vida marina y notas (el SEARCH_VECTOR_SQL del modelo). Solo Postgres: en SQLite la
+búsqueda usa un índice invertido en memoria.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+# Copia congelada de app.models.dive_log.SEARCH_VECTOR_SQL: el índice de
+# expresión de esta revisión no debe cambiar si cambia el modelo
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple'::regconfig, coalesce(dive_site_name, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(country, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(region, '')), 'A') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(marine_life, '')), 'B') || "
+    "setweight(to_tsvector('simple'::regconfig, coalesce(notes, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_dive_logs_search",
+            "dive_logs",
+            [sa.text(f"({SEARCH_VECTOR_SQL})")],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+    op.execute("ANALYZE dive_logs")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.drop_index("ix_dive_logs_search", table_name="dive_logs")
@@ -0,0 +1,161 @@
+"""Índice de especies y agregados de avistamientos
+
+Crea species, dive_sightings y species_site_month_stats. Extrae las
+especies de dive_logs.marine_life de los dives existentes y calcula los
+avistamientos por especie, sitio y mes.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+import json
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 5000
+
+# Copia congelada de normalize_name y parse_species (app.services): la
+# migración no debe cambiar si cambia el código de la aplicación
+MAX_SPECIES_PER_DIVE = 50
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_SEPARATORS = re.compile(r"[,;|\n]+")
+
+
+def normalize_name(name):
+    if not name:
+        return ""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", ascii_name.lower()).strip()
+
+
+def parse_species(marine_life):
+    """Nombres de especie de un array JSON o de texto separado; sin duplicados"""
+    if not marine_life or not marine_life.strip():
+        return []
+    text = marine_life.strip()
+    names = None
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if isinstance(items, list):
+            names = []
+            for item in items:
+                if isinstance(item, dict):
+                    item = item.get("name") or item.get("species")
+                if isinstance(item, str):
+                    names.append(item)
+    if names is None:
+        names = _SEPARATORS.split(text)
+
+    species = {}
+    for name in names:
+        name = name.strip()
+        normalized = normalize_name(name)
+        if normalized and normalized not in species:
+            species[normalized] = name
+    return list(species.values())[:MAX_SPECIES_PER_DIVE]
+
+species = sa.table(
+    "species",
+    sa.column("id", sa.Integer),
+    sa.column("name", sa.String),
+    sa.column("normalized_name", sa.String),
+)
+dive_sightings = sa.table(
+    "dive_sightings",
+    sa.column("dive_log_id", sa.Integer),
+    sa.column("species_id", sa.Integer),
+)
+dive_logs = sa.table(
+    "dive_logs",
+    sa.column("id", sa.Integer),
+    sa.column("marine_life", sa.Text),
+    sa.column("site_id", sa.Integer),
+    sa.column("dive_date", sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "species",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("normalized_name", sa.String(), nullable=False, unique=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_table(
+        "dive_sightings",
+        sa.Column("dive_log_id", sa.Integer(), sa.ForeignKey("dive_logs.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("species_id", sa.Integer(), sa.ForeignKey("species.id"), primary_key=True),
+    )
+    op.create_index("ix_dive_sightings_species", "dive_sightings", ["species_id"])
+    op.create_table(
+        "species_site_month_stats",
+        sa.Column("species_id", sa.Integer(), sa.ForeignKey("species.id"), primary_key=True),
+        sa.Column("site_id", sa.Integer(), sa.ForeignKey("dive_sites.id"), primary_key=True),
+        sa.Column("month", sa.Integer(), primary_key=True),
+        sa.Column("sighting_count", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_species_site_month_stats_site", "species_site_month_stats", ["site_id", "month"])
+
+    bind = op.get_bind()
+    species_ids = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(dive_logs.c.id, dive_logs.c.marine_life)
+            .where(dive_logs.c.id > last_id, dive_logs.c.marine_life.isnot(None))
+            .order_by(dive_logs.c.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not rows:
+            break
+        values = []
+        for row in rows:
+            for name in parse_species(row.marine_life):
+                normalized = normalize_name(name)
+                if normalized not in species_ids:
+                    species_ids[normalized] = bind.execute(
+                        species.insert().values(name=name, normalized_name=normalized).returning(species.c.id)
+                    ).scalar_one()
+                values.append({"dive_log_id": row.id, "species_id": species_ids[normalized]})
+        if values:
+            bind.execute(dive_sightings.insert(), values)
+        last_id = rows[-1].id
+
+    month = sa.extract("month", dive_logs.c.dive_date)
+    month_stats = sa.table(
+        "species_site_month_stats",
+        sa.column("species_id", sa.Integer),
+        sa.column("site_id", sa.Integer),
+        sa.column("month", sa.Integer),
+        sa.column("sighting_count", sa.Integer),
+    )
+    bind.execute(
+        month_stats.insert().from_select(
+            ["species_id", "site_id", "month", "sighting_count"],
+            sa.select(dive_sightings.c.species_id, dive_logs.c.site_id, month, sa.func.count())
+            .select_from(dive_sightings.join(dive_logs, dive_logs.c.id == dive_sightings.c.dive_log_id))
+            .where(dive_logs.c.site_id.isnot(None))
+            .group_by(dive_sightings.c.species_id, dive_logs.c.site_id, month),
+        )
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_species_site_month_stats_site", table_name="species_site_month_stats")
+    op.drop_table("species_site_month_stats")
+    op.drop_index("ix_dive_sightings_species", table_name="dive_sightings")
+    op.drop_table("dive_sightings")
+    op.drop_table("species")
@@ -0,0 +1,42 @@
+"""Perfiles del ordenador de buceo
+
+Crea dive_profiles: series de profundidad, temperatura y tiempo como
+deltas int16 comprimidos en columnas binarias (una fila por dive) y el
+resultado del análisis. safety_stop/safety_stop_time de dive_logs se
+rellenan al subir cada perfil (o con `python -m app.services.profiles reanalyze`).
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "dive_profiles",
+        sa.Column("dive_log_id", sa.Integer(), sa.ForeignKey("dive_logs.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("interval_seconds", sa.Float(), nullable=True),
+        sa.Column("depth_data", sa.LargeBinary(), nullable=False),
+        sa.Column("temperature_data", sa.LargeBinary(), nullable=True),
+        sa.Column("time_data", sa.LargeBinary(), nullable=True),
+        sa.Column("duration_seconds", sa.Float(), nullable=False),
+        sa.Column("max_depth", sa.Float(), nullable=False),
+        sa.Column("avg_depth", sa.Float(), nullable=False),
+        sa.Column("max_ascent_rate", sa.Float(), nullable=True),
+        sa.Column("ascent_violations", sa.Integer(), nullable=False),
+        sa.Column("safety_stop_seconds", sa.Float(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("dive_profiles")
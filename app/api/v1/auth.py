@@ -1,12 +1,14 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.core.security import (
     authenticate_user, 
     create_access_token, 
     get_password_hash,
-    get_current_active_user
+    get_current_active_user_read,
+    get_user_by_email
 )
 from app.core.config import settings
 from app.models.user import User
@@ -15,12 +17,12 @@ from app.schemas.user import UserCreate, UserLogin, UserResponse, Token
 router = APIRouter()
 
 @router.post("/register", response_model=Token)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """
     Registrar nuevo usuario
     """
     # Verificar si el email ya existe
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await get_user_by_email(db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +30,8 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Verificar si el username ya existe
-    existing_username = db.query(User).filter(User.username == user_data.username).first()
+    result = await db.execute(select(User).where(User.username == user_data.username))
+    existing_username = result.scalars().first()
     if existing_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -36,7 +39,7 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     
     # Calcular dive_number inicial
     total_dives = user_data.total_dives or 0
@@ -55,8 +58,8 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     # Crear token de acceso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -72,11 +75,11 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     )
 
 @router.post("/login", response_model=Token)
-async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login_user(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """
     Login de usuario existente
     """
-    user = authenticate_user(db, user_credentials.email, user_credentials.password)
+    user = await authenticate_user(db, user_credentials.email, user_credentials.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -87,7 +90,7 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
     # Actualizar last_login
     from datetime import datetime
     user.last_login = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     # Crear token de acceso
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -103,7 +106,7 @@ async def login_user(user_credentials: UserLogin, db: Session = Depends(get_db))
     )
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_profile(current_user: User = Depends(get_current_active_user)):
+async def get_current_user_profile(current_user: User = Depends(get_current_active_user_read)):
     """
     Obtener perfil del usuario actual
     """
@@ -1,35 +1,58 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from app.core.database import get_db
-from app.core.security import get_current_active_user
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_db, get_read_db, is_replica_session, read_session
+from app.core.dates import DATE_ORDERS
+from app.core.http_cache import is_not_modified, make_etag, not_modified, set_cache_headers
+from app.core.response_cache import response_cache
+from app.core.responses import DefaultJSONResponse, model_response
+from app.core.security import get_current_active_user, get_current_active_user_read
 from app.models.user import User
 from app.models.dive_log import DiveLog
-from app.schemas.dive_log import DiveLogCreate, DiveLogResponse, DiveLogSummary, DiveLogUpdate
+from app.models.dive_profile import DiveProfile
+from app.schemas.dive_log import DiveLogCreate, DiveLogResponse, DiveLogSummary, DiveLogUpdate, DiveProfileUpload
+from app.services.dive_import import IMPORT_FORMATS, ImportFormatError, import_dive_logs
+from app.services.dive_numbers import add_dive_log
+from app.services.dive_sites import site_catalog
+from app.services.export import MEDIA_TYPES, ExportFormatError, check_format, export_dive_logs, export_filename
+from app.services.gas import ROLLING_WINDOW, get_gas_analytics
+from app.services.geo import MAX_RADIUS_KM, find_nearby_dives, find_nearby_sites
+from app.services.pagination import InvalidCursorError, paginate_dive_logs, split_page
+from app.services.profiles import DEFAULT_CHART_POINTS, ProfileError, downsample, get_profile, save_profile, unpack
+from app.services.projection import project, schema_fields, serialize_rows
+from app.services.search import search_dive_logs
+from app.services.sightings import apply_sighting_delta, load_sighting_snapshot, sighting_snapshot, species_catalog
+from app.services.stats import STATS_SECTIONS, compute_dive_stats, get_site_stats
+from app.services.user_stats import apply_dive_delta, dive_snapshot, get_dive_log_version, read_dive_stats
 
 router = APIRouter()
 
+async def dive_log_validators(db: AsyncSession, user_id: int, *parts):
+    """
+    ETag y Last-Modified de una representación de los dive logs del usuario
+    Se basan en la versión por usuario (+1 en cada escritura) y en la fecha
+    de la última escritura: no hace falta leer dive_logs para responder 304
+    """
+    version = await get_dive_log_version(db, user_id)
+    if version is None:
+        return None, None
+    return make_etag(user_id, version.version, version.updated_at, *parts), version.updated_at
+
 @router.post("/", response_model=DiveLogResponse)
 async def create_dive_log(
     dive_data: DiveLogCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crear nuevo registro de buceo
     """
-    # Calcular el siguiente dive_number para el usuario
-    last_dive = db.query(DiveLog).filter(
-        DiveLog.user_id == current_user.id
-    ).order_by(desc(DiveLog.dive_number)).first()
-    
-    next_dive_number = 1 if not last_dive else last_dive.dive_number + 1
-    
     # Crear nuevo dive log
     new_dive_log = DiveLog(
-        user_id=current_user.id,
-        dive_number=next_dive_number,
         dive_site_name=dive_data.dive_site_name,
         dive_date=dive_data.dive_date,
         max_depth=dive_data.max_depth,
@@ -40,6 +63,8 @@ async def create_dive_log(
         visibility=dive_data.visibility,
         country=dive_data.country,
         region=dive_data.region,
+        location_lat=dive_data.location_lat,
+        location_lng=dive_data.location_lng,
         suit_type=dive_data.suit_type,
         suit_thickness=dive_data.suit_thickness,
         weight_used=dive_data.weight_used,
@@ -60,71 +85,256 @@ async def create_dive_log(
         rating=dive_data.rating
     )
     
-    db.add(new_dive_log)
-    db.commit()
-    db.refresh(new_dive_log)
+    # IDs canónicos de sitio, país y especies (las altas van en esta misma transacción)
+    await site_catalog.assign(db, new_dive_log)
+    species_ids = await species_catalog.resolve(db, new_dive_log.marine_life)
     
-    # Actualizar total_dives del usuario
-    current_user.total_dives = next_dive_number
-    if dive_data.max_depth and (not current_user.max_depth_achieved or dive_data.max_depth > current_user.max_depth_achieved):
-        current_user.max_depth_achieved = dive_data.max_depth
+    # dive_number, total_dives y max_depth_achieved en una sola transacción
+    await add_dive_log(db, current_user, new_dive_log)
+    await apply_dive_delta(db, current_user.id, None, dive_snapshot(new_dive_log))
+    await apply_sighting_delta(db, new_dive_log.id, None, sighting_snapshot(new_dive_log, species_ids))
+    await db.commit()
+    await response_cache.invalidate_user(current_user.id)
     
-    db.commit()
+    return model_response(DiveLogResponse.model_validate(new_dive_log))
+
+@router.post("/import")
+async def import_dive_logs_bulk(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv | ndjson (por defecto según Content-Type)"),
+    date_order: Optional[str] = Query(None, description="dmy | mdy para fechas ambiguas como 01/02/2025"),
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importación masiva de dive logs desde CSV o NDJSON
+    El cuerpo se procesa en streaming y se inserta por lotes;
+    devuelve un informe de errores por fila
+    """
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = "csv" if "csv" in content_type else "ndjson"
+    if format not in IMPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported format '{format}'"
+        )
+    if date_order is not None and date_order not in DATE_ORDERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported date_order '{date_order}'"
+        )
     
-    return DiveLogResponse.from_orm(new_dive_log)
+    try:
+        return await import_dive_logs(db, current_user, request.stream(), format, date_order)
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        # Los lotes ya confirmados son visibles aunque la importación falle
+        await response_cache.invalidate_user(current_user.id)
 
 @router.get("/", response_model=List[DiveLogSummary])
 async def get_user_dive_logs(
-    skip: int = Query(0, ge=0),
-    limit: int = Query(50, ge=1, le=100),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    cursor: Optional[str] = Query(None, description="Cursor opaco de X-Next-Cursor"),
+    limit: int = Query(50, ge=1, le=settings.DIVE_LOGS_MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Obtener dive logs del usuario actual
+    Paginación por cursor: la siguiente página se pide con ?cursor=<X-Next-Cursor>
+    """
+    async def build():
+        etag, last_modified = await dive_log_validators(db, current_user.id, "list", cursor, limit)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        try:
+            # Solo las columnas de DiveLogSummary (sin notes/marine_life)
+            query = paginate_dive_logs(
+                project(DiveLog, DiveLogSummary).where(DiveLog.user_id == current_user.id), cursor, limit
+            )
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        result = await db.execute(query)
+        rows, next_cursor = split_page(result.all(), limit)
+        
+        # Serialización directa desde las tuplas; response_model queda para la documentación
+        response = DefaultJSONResponse(serialize_rows(rows, schema_fields(DiveLogSummary)))
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+        return set_cache_headers(response, etag, last_modified)
+    
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:list", {"cursor": cursor, "limit": limit}, build,
+        store=not is_replica_session(db)
+    )
+
+@router.get("/search")
+async def search_user_dive_logs(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200, description="Palabras o prefijos (todas deben aparecer)"),
+    min_depth: Optional[float] = Query(None, ge=0),
+    max_depth: Optional[float] = Query(None, ge=0),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    country: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=1000),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Buscar en notas, vida marina y nombres de sitio de los dives del usuario
+    Resultados ordenados por relevancia con filtros de profundidad, fecha y país
     """
-    dive_logs = db.query(DiveLog).filter(
-        DiveLog.user_id == current_user.id
-    ).order_by(desc(DiveLog.dive_date)).offset(skip).limit(limit).all()
+    async def build():
+        results = await search_dive_logs(
+            db, current_user.id, q, limit, offset, min_depth, max_depth, date_from, date_to, country
+        )
+        return DefaultJSONResponse(results)
     
-    return [DiveLogSummary.from_orm(dive_log) for dive_log in dive_logs]
+    params = {
+        "q": q, "min_depth": min_depth, "max_depth": max_depth, "date_from": date_from,
+        "date_to": date_to, "country": country, "limit": limit, "offset": offset,
+    }
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:search", params, build,
+        store=not is_replica_session(db)
+    )
+
+@router.get("/export")
+async def export_user_dive_logs(
+    request: Request,
+    format: str = Query("csv", description="csv | ndjson | parquet"),
+    gzip: bool = Query(False, description="Comprimir al vuelo (en Parquet, códec gzip por columna)"),
+    current_user: User = Depends(get_current_active_user_read)
+):
+    """
+    Exportar el logbook completo del usuario en streaming
+    Las filas se leen por lotes con un cursor del servidor y se envían
+    según se codifican: la memoria no depende del número de dives
+    """
+    try:
+        check_format(format)
+    except ExportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    user_id = current_user.id
+    
+    async def body():
+        # Sesión propia: la de get_read_db se cierra antes de enviar el cuerpo
+        async with read_session(request) as db:
+            async for chunk in export_dive_logs(db, user_id, format, gzip):
+                yield chunk
+    
+    compressed = gzip and format != "parquet"
+    return StreamingResponse(
+        body(),
+        media_type="application/gzip" if compressed else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_filename(user_id, format, gzip)}"'},
+    )
+
+@router.get("/nearby")
+async def get_nearby_dive_logs(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(10.0, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=settings.DIVE_LOGS_MAX_PAGE_SIZE),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Dives del usuario cerca de un punto, ordenados por distancia
+    """
+    return await find_nearby_dives(db, current_user.id, lat, lng, radius_km, limit)
+
+@router.get("/sites/nearby")
+async def get_nearby_dive_sites(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(25.0, gt=0, le=MAX_RADIUS_KM),
+    limit: int = Query(50, ge=1, le=settings.DIVE_LOGS_MAX_PAGE_SIZE),
+    mine: bool = Query(False, description="Solo sitios donde ha buceado el usuario"),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Sitios de buceo registrados cerca de un punto, con su número de dives
+    """
+    return await find_nearby_sites(db, lat, lng, radius_km, limit, current_user.id if mine else None)
+
+@router.get("/sites/{site_id}")
+async def get_dive_site_stats(
+    site_id: int,
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Estadísticas de un sitio del catálogo con los dives de todos los usuarios
+    """
+    stats = await get_site_stats(db, site_id)
+    if stats is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dive site not found"
+        )
+    return stats
 
 @router.get("/{dive_id}", response_model=DiveLogResponse)
 async def get_dive_log_detail(
     dive_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    request: Request,
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """
     Obtener detalle de un dive log específico
     """
-    dive_log = db.query(DiveLog).filter(
-        DiveLog.id == dive_id,
-        DiveLog.user_id == current_user.id
-    ).first()
-    
-    if not dive_log:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Dive log not found"
+    async def build():
+        etag, last_modified = await dive_log_validators(db, current_user.id, "detail", dive_id)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        result = await db.execute(
+            select(DiveLog).where(
+                DiveLog.id == dive_id,
+                DiveLog.user_id == current_user.id
+            )
         )
+        dive_log = result.scalars().first()
+        
+        if not dive_log:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dive log not found"
+            )
+        
+        response = model_response(DiveLogResponse.model_validate(dive_log))
+        return set_cache_headers(response, etag, last_modified)
     
-    return DiveLogResponse.from_orm(dive_log)
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:detail", {"id": dive_id}, build,
+        store=not is_replica_session(db)
+    )
 
 @router.put("/{dive_id}", response_model=DiveLogResponse)
 async def update_dive_log(
     dive_id: int,
     dive_update: DiveLogUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Actualizar dive log existente
     """
-    dive_log = db.query(DiveLog).filter(
-        DiveLog.id == dive_id,
-        DiveLog.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(DiveLog).where(
+            DiveLog.id == dive_id,
+            DiveLog.user_id == current_user.id
+        )
+    )
+    dive_log = result.scalars().first()
     
     if not dive_log:
         raise HTTPException(
@@ -133,28 +343,40 @@ async def update_dive_log(
         )
     
     # Actualizar campos que no son None
+    old_snapshot = dive_snapshot(dive_log)
+    old_sightings = await load_sighting_snapshot(db, dive_log)
     update_data = dive_update.dict(exclude_unset=True)
     for field, value in update_data.items():
         setattr(dive_log, field, value)
+    if update_data.keys() & {"dive_site_name", "country", "region"}:
+        await site_catalog.assign(db, dive_log)
+    species_ids = old_sightings["species_ids"]
+    if "marine_life" in update_data:
+        species_ids = await species_catalog.resolve(db, dive_log.marine_life)
     
-    db.commit()
-    db.refresh(dive_log)
+    await apply_dive_delta(db, current_user.id, old_snapshot, dive_snapshot(dive_log))
+    await apply_sighting_delta(db, dive_log.id, old_sightings, sighting_snapshot(dive_log, species_ids))
+    await db.commit()
+    await response_cache.invalidate_user(current_user.id)
     
-    return DiveLogResponse.from_orm(dive_log)
+    return model_response(DiveLogResponse.model_validate(dive_log))
 
 @router.delete("/{dive_id}")
 async def delete_dive_log(
     dive_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Eliminar dive log
     """
-    dive_log = db.query(DiveLog).filter(
-        DiveLog.id == dive_id,
-        DiveLog.user_id == current_user.id
-    ).first()
+    result = await db.execute(
+        select(DiveLog).where(
+            DiveLog.id == dive_id,
+            DiveLog.user_id == current_user.id
+        )
+    )
+    dive_log = result.scalars().first()
     
     if not dive_log:
         raise HTTPException(
@@ -162,47 +384,150 @@ async def delete_dive_log(
             detail="Dive log not found"
         )
     
-    db.delete(dive_log)
-    db.commit()
+    old_snapshot = dive_snapshot(dive_log)
+    # Avistamientos y perfil antes que el dive (referencian dive_logs.id)
+    await apply_sighting_delta(db, dive_log.id, await load_sighting_snapshot(db, dive_log), None)
+    await db.execute(delete(DiveProfile).where(DiveProfile.dive_log_id == dive_log.id))
+    await db.delete(dive_log)
+    await apply_dive_delta(db, current_user.id, old_snapshot, None)
+    await db.commit()
+    await response_cache.invalidate_user(current_user.id)
     
     return {"message": "Dive log deleted successfully"}
 
-@router.get("/stats/summary")
-async def get_dive_stats(
+@router.put("/{dive_id}/profile")
+async def upload_dive_profile(
+    dive_id: int,
+    profile: DiveProfileUpload,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    Estadísticas de buceo del usuario
+    Subir (o sustituir) el perfil del ordenador de buceo de un dive
+    Recalcula profundidad media/máxima y la parada de seguridad del dive log
     """
-    dive_logs = db.query(DiveLog).filter(DiveLog.user_id == current_user.id).all()
-    
-    if not dive_logs:
-        return {
-            "total_dives": 0,
-            "max_depth": 0,
-            "total_time": 0,
-            "average_depth": 0,
-            "favorite_locations": []
-        }
+    result = await db.execute(
+        select(DiveLog).where(
+            DiveLog.id == dive_id,
+            DiveLog.user_id == current_user.id
+        )
+    )
+    dive_log = result.scalars().first()
     
-    total_dives = len(dive_logs)
-    max_depth = max([dive.max_depth for dive in dive_logs])
-    total_time = sum([dive.dive_duration for dive in dive_logs if dive.dive_duration])
-    avg_depth = sum([dive.avg_depth for dive in dive_logs if dive.avg_depth]) / len([dive for dive in dive_logs if dive.avg_depth])
+    if not dive_log:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dive log not found"
+        )
     
-    # Ubicaciones más visitadas
-    locations = {}
-    for dive in dive_logs:
-        country = dive.country or "Unknown"
-        locations[country] = locations.get(country, 0) + 1
+    old_snapshot = dive_snapshot(dive_log)
+    try:
+        analysis = await save_profile(db, dive_log, profile)
+    except ProfileError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
-    favorite_locations = sorted(locations.items(), key=lambda x: x[1], reverse=True)[:5]
+    await apply_dive_delta(db, current_user.id, old_snapshot, dive_snapshot(dive_log))
+    await db.commit()
+    await response_cache.invalidate_user(current_user.id)
     
     return {
-        "total_dives": total_dives,
-        "max_depth": max_depth,
-        "total_time_minutes": total_time,
-        "average_depth": round(avg_depth, 1) if avg_depth else 0,
-        "favorite_locations": [{"country": loc[0], "dives": loc[1]} for loc in favorite_locations]
-    }
\ No newline at end of file
+        "dive_log_id": dive_id,
+        "sample_count": len(profile.depths),
+        "analysis": analysis.as_dict(),
+        "dive_log": DiveLogResponse.model_validate(dive_log),
+    }
+
+@router.get("/{dive_id}/profile")
+async def get_dive_profile(
+    dive_id: int,
+    request: Request,
+    points: int = Query(DEFAULT_CHART_POINTS, ge=10, le=5000, description="Puntos máximos para la gráfica"),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Perfil del dive reducido para gráficas, con el análisis guardado
+    """
+    async def build():
+        profile = await get_profile(db, current_user.id, dive_id)
+        if profile is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Dive profile not found"
+            )
+        return DefaultJSONResponse({
+            "dive_log_id": dive_id,
+            "sample_count": profile.sample_count,
+            "duration_seconds": profile.duration_seconds,
+            "max_depth": profile.max_depth,
+            "avg_depth": round(profile.avg_depth, 2),
+            "max_ascent_rate": profile.max_ascent_rate,
+            "ascent_violations": profile.ascent_violations,
+            "safety_stop_seconds": profile.safety_stop_seconds,
+            "chart": downsample(unpack(profile), points),
+        })
+    
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:profile", {"id": dive_id, "points": points}, build,
+        store=not is_replica_session(db)
+    )
+
+@router.get("/stats/gas")
+async def get_gas_stats(
+    request: Request,
+    window: int = Query(ROLLING_WINDOW, ge=2, le=100, description="Dives de la media móvil de RMV"),
+    points: int = Query(100, ge=0, le=1000, description="Últimos dives de la serie"),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Consumo de gas (SAC/RMV) del usuario: percentiles por mezcla y traje
+    y tendencia con media móvil
+    """
+    async def build():
+        return DefaultJSONResponse(await get_gas_analytics(db, current_user.id, window, points))
+    
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:gas", {"window": window, "points": points}, build,
+        store=not is_replica_session(db)
+    )
+
+@router.get("/stats/summary")
+async def get_dive_stats(
+    request: Request,
+    include: Optional[str] = Query(
+        None,
+        description="Secciones extra separadas por comas: " + ", ".join(STATS_SECTIONS)
+    ),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Estadísticas de buceo del usuario
+    """
+    sections = [name.strip() for name in include.split(",") if name.strip()] if include else []
+    unknown = [name for name in sections if name not in STATS_SECTIONS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown stats sections: {', '.join(unknown)}"
+        )
+    
+    async def build():
+        etag, last_modified = await dive_log_validators(db, current_user.id, "stats", *sections)
+        if is_not_modified(request, etag, last_modified):
+            return not_modified(etag, last_modified)
+        
+        # Lectura O(1) de la tabla materializada; si el usuario no tiene fila
+        # (sin dives o estadísticas sin reconstruir) se calcula en SQL
+        stats = await read_dive_stats(db, current_user.id)
+        if stats is None:
+            return DefaultJSONResponse(await compute_dive_stats(db, current_user.id, sections))
+        for name in sections:
+            stats[name] = await STATS_SECTIONS[name](db, current_user.id)
+        return set_cache_headers(DefaultJSONResponse(stats), etag, last_modified)
+    
+    return await response_cache.respond(
+        request, current_user.id, "dive_logs:stats", {"include": ",".join(sorted(sections))}, build,
+        store=not is_replica_session(db)
+    )
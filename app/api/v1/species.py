@@ -0,0 +1,58 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_read_db
+from app.core.security import get_current_active_user_read
+from app.models.dive_site import DiveSite
+from app.models.user import User
+from app.services.sightings import find_species, get_species, site_seasonality, species_seasonality
+
+router = APIRouter()
+
+@router.get("/")
+async def list_species(
+    q: Optional[str] = Query(None, max_length=100, description="Prefijo del nombre"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Buscar especies por prefijo con su número total de avistamientos
+    """
+    return await find_species(db, q, limit)
+
+@router.get("/sites/{site_id}/seasonality")
+async def get_site_seasonality(
+    site_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Mapa de calor especie x mes de un sitio de buceo
+    """
+    site = await db.get(DiveSite, site_id)
+    if site is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dive site not found"
+        )
+    return {"site_id": site.id, "name": site.name, **await site_seasonality(db, site_id, limit)}
+
+@router.get("/{species_id}")
+async def get_species_sightings(
+    species_id: int,
+    limit: int = Query(20, ge=1, le=200),
+    current_user: User = Depends(get_current_active_user_read),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Dónde y cuándo se ha visto una especie: sitios x meses desde los agregados
+    """
+    species = await get_species(db, species_id)
+    if species is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Species not found"
+        )
+    return {"species_id": species.id, "name": species.name, **await species_seasonality(db, species_id, limit)}
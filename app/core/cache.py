@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Cache en memoria LRU con expiración por entrada
+    Cuenta hits/misses para exponer el ratio de aciertos; con maxweight
+    acota además la suma de los pesos de las entradas (p. ej. su tamaño)
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, maxweight: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxweight = maxweight
+        self.weight = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at, weight = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.weight -= weight
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, weight: int = 1):
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        with self._lock:
+            self._pop(key)
+            if self.maxweight is not None and weight > self.maxweight:
+                return
+            self._data[key] = (value, time.monotonic() + ttl, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (
+                self.maxweight is not None and self.weight > self.maxweight
+            ):
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.weight -= evicted
+                self.evictions += 1
+
+    def _pop(self, key: Hashable):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self.weight -= entry[2]
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._pop(key)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self.weight,
+            "maxweight": self.maxweight,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+class CacheBackend:
+    """Interfaz de backend para la caché de respuestas (valores str)"""
+
+    async def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: str, ttl: float):
+        raise NotImplementedError
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        """Guardar solo si la clave no existe (SET NX); True si se guardó"""
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+class MemoryCacheBackend(CacheBackend):
+    """Backend LRU en proceso (tests y despliegues de un solo worker)"""
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        self._cache.set(key, value, ttl=ttl)
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        with self._lock:
+            if self._cache.get(key) is not None:
+                return False
+            self._cache.set(key, value, ttl=ttl)
+            return True
+
+    async def incr(self, key: str) -> int:
+        with self._lock:
+            value = int(self._cache.get(key) or 0) + 1
+            self._cache.set(key, str(value), ttl=float("inf"))
+            return value
+
+    async def delete(self, key: str):
+        self._cache.invalidate(key)
+
+class RedisCacheBackend(CacheBackend):
+    """Backend Redis (compartido entre workers e instancias)"""
+
+    def __init__(self, url: str):
+        # redis es opcional: solo se importa si se usa este backend
+        import redis.asyncio as redis
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._client.set(key, value, px=int(ttl * 1000))
+
+    async def add(self, key: str, value: str, ttl: float) -> bool:
+        return bool(await self._client.set(key, value, px=int(ttl * 1000), nx=True))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(key)
+
+    async def delete(self, key: str):
+        await self._client.delete(key)
+
+    async def close(self):
+        await self._client.aclose()
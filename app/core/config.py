@@ -2,6 +2,30 @@ from typing import List, Optional
 import os
 from pydantic_settings import BaseSettings
 
+def _env_int(name: str) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+def _env_bool(name: str) -> Optional[bool]:
+    value = os.getenv(name)
+    return value.lower() == "true" if value else None
+
+def to_async_url(url: str) -> str:
+    """
+    Misma URL con driver async
+    (asyncpg para Postgres, aiosqlite para SQLite en tests)
+    """
+    if url.startswith("postgres://"):
+        # Render/Heroku usan el esquema antiguo "postgres://"
+        url = "postgresql://" + url[len("postgres://"):]
+    if url.startswith("postgresql+psycopg2://"):
+        url = "postgresql://" + url[len("postgresql+psycopg2://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
 class Settings(BaseSettings):
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "production")
@@ -16,6 +40,26 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     ALGORITHM: str = "HS256"
     
+    # Password hashing (bcrypt fuera del event loop)
+    PASSWORD_HASH_EXECUTOR: str = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")  # thread | process
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))  # 503 al superarlo
+    
+    # Cache de usuarios autenticados y de tokens JWT verificados. Es por
+    # proceso: un usuario desactivado o modificado sigue cacheado en los demás
+    # workers hasta USER_CACHE_TTL_SECONDS, así que conviene mantenerlo corto
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "1024"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+    TOKEN_CACHE_SIZE: int = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
+    TOKEN_CACHE_TTL_SECONDS: int = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+    
+    # Índices de búsqueda en memoria (fallback SQLite), por usuario. Cada
+    # entrada (término, dive) ocupa ~70 bytes (tracemalloc): el tope de 1M
+    # entradas acota la caché a ~70 MB por worker
+    SEARCH_INDEX_CACHE_SIZE: int = int(os.getenv("SEARCH_INDEX_CACHE_SIZE", "64"))
+    SEARCH_INDEX_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_INDEX_CACHE_TTL_SECONDS", "600"))
+    SEARCH_INDEX_CACHE_MAX_POSTINGS: int = int(os.getenv("SEARCH_INDEX_CACHE_MAX_POSTINGS", "1000000"))
+    
     # Database - Render DATABASE_URL tiene prioridad
     DATABASE_URL: Optional[str] = os.getenv("DATABASE_URL")
     
@@ -26,6 +70,27 @@ class Settings(BaseSettings):
     POSTGRES_DB: str = os.getenv("POSTGRES_DB", "diveapp_db")
     POSTGRES_PORT: str = os.getenv("POSTGRES_PORT", "5432")
     
+    # Pool de conexiones: sin valor se usa el preset de ENVIRONMENT
+    # (POOL_PRESETS en app/core/database.py)
+    DB_POOL_SIZE: Optional[int] = _env_int("DB_POOL_SIZE")
+    DB_MAX_OVERFLOW: Optional[int] = _env_int("DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT: Optional[int] = _env_int("DB_POOL_TIMEOUT")  # segundos esperando conexión
+    DB_POOL_RECYCLE: Optional[int] = _env_int("DB_POOL_RECYCLE")
+    DB_POOL_PRE_PING: Optional[bool] = _env_bool("DB_POOL_PRE_PING")
+    
+    # Detrás de PgBouncer en modo transaction: sin prepared statements cacheados
+    # y, por defecto, sin pool propio (NullPool)
+    DB_PGBOUNCER: bool = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+    DB_NULL_POOL: Optional[bool] = _env_bool("DB_NULL_POOL")
+    
+    # Réplicas de lectura (URLs separadas por comas; vacío = solo primario)
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    REPLICA_HEALTH_CHECK_SECONDS: int = int(os.getenv("REPLICA_HEALTH_CHECK_SECONDS", "10"))
+    REPLICA_MAX_LAG_SECONDS: int = int(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+    # Tras un commit, las lecturas del cliente van al primario durante este tiempo
+    READ_YOUR_WRITES_SECONDS: int = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+    READ_YOUR_WRITES_COOKIE: str = os.getenv("READ_YOUR_WRITES_COOKIE", "diveapp_primary_until")
+    
     @property
     def DATABASE_URL_COMPUTED(self) -> str:
         """
@@ -38,9 +103,43 @@ class Settings(BaseSettings):
         # Construir URL para desarrollo local
         return f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
     
+    @property
+    def ASYNC_DATABASE_URL_COMPUTED(self) -> str:
+        """
+        Misma base de datos que DATABASE_URL_COMPUTED pero con driver async
+        (asyncpg para Postgres, aiosqlite para SQLite en tests)
+        """
+        return to_async_url(self.DATABASE_URL_COMPUTED)
+    
+    # Codificación JSON de las respuestas: orjson (si está instalado) | json
+    RESPONSE_JSON_ENCODER: str = os.getenv("RESPONSE_JSON_ENCODER", "orjson")
+    
+    # Tamaño máximo de página en los listados de dive logs
+    DIVE_LOGS_MAX_PAGE_SIZE: int = int(os.getenv("DIVE_LOGS_MAX_PAGE_SIZE", "100"))
+    
+    # Importación masiva de dive logs (memoria acotada por lote)
+    IMPORT_BATCH_SIZE: int = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "500"))
+    IMPORT_MAX_LINE_BYTES: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(64 * 1024)))
+    
+    # Exportación en streaming: filas por lote del cursor (y por row group en Parquet)
+    EXPORT_BATCH_SIZE: int = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+    
+    # Perfiles de ordenador de buceo: muestras máximas por dive y umbrales de análisis
+    PROFILE_MAX_SAMPLES: int = int(os.getenv("PROFILE_MAX_SAMPLES", "50000"))
+    MAX_ASCENT_RATE: float = float(os.getenv("MAX_ASCENT_RATE", "10"))  # m/min
+    
+    # Orden por defecto de fechas ambiguas (01/02/2025): dmy | mdy
+    DATE_ORDER: str = os.getenv("DATE_ORDER", "dmy")
+    
     # Redis (opcional por ahora)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
+    # Caché de respuestas de lectura: none | memory | redis
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "none")
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "300"))
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "4096"))  # solo backend memory
+    
     # CORS origins
     @property
     def BACKEND_CORS_ORIGINS(self) -> List[str]:
@@ -86,6 +185,14 @@ class Settings(BaseSettings):
     # Monitoring
     SENTRY_DSN: Optional[str] = os.getenv("SENTRY_DSN")
     
+    # Cabecera Server-Timing (tiempos de app/DB/pool) para depuración
+    SERVER_TIMING_ENABLED: bool = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+    
+    # Auditor de queries (desarrollo/CI): N+1, queries lentas y presupuestos
+    QUERY_AUDIT_ENABLED: bool = os.getenv("QUERY_AUDIT_ENABLED", "false").lower() == "true"
+    QUERY_AUDIT_REPEAT_THRESHOLD: int = int(os.getenv("QUERY_AUDIT_REPEAT_THRESHOLD", "5"))
+    SLOW_QUERY_THRESHOLD_MS: int = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    
     # Debug info
     def get_debug_info(self):
         """
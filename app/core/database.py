@@ -1,16 +1,81 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from app.core.config import settings
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+from app.core.config import settings, to_async_url
+from app.core.metrics import (
+    Gauge, db_pool_overflow_events, db_pool_timeouts, pool_gauges, record_pool_wait, record_query, registry
+)
+from app.core.query_audit import install_query_auditor
+
+logger = logging.getLogger(__name__)
+
+# Presets del pool por entorno; cada valor se puede sobreescribir con DB_*
+POOL_PRESETS = {
+    "development": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 30,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    },
+    "staging": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    },
+    # Sin pre_ping (un round trip menos por checkout): las conexiones se
+    # reciclan antes del timeout de inactividad del servidor y LIFO mantiene
+    # calientes solo las necesarias
+    "production": {
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_timeout": 10,
+        "pool_recycle": 300,
+        "pool_pre_ping": False,
+        "pool_use_lifo": True,
+    },
+}
+
+def pool_options() -> dict:
+    """Preset de ENVIRONMENT con los overrides de Settings aplicados"""
+    options = dict(POOL_PRESETS.get(settings.ENVIRONMENT, POOL_PRESETS["production"]))
+    overrides = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    options.update({name: value for name, value in overrides.items() if value is not None})
+    return options
+
+def use_null_pool() -> bool:
+    if settings.DB_NULL_POOL is not None:
+        return settings.DB_NULL_POOL
+    # PgBouncer ya hace de pool: por defecto no se mantiene otro aquí
+    return settings.DB_PGBOUNCER
 
 # Create database engine con configuración para producción
+# (síncrono - usado por scripts y create_tables)
 engine = create_engine(
     settings.DATABASE_URL_COMPUTED,
-    pool_pre_ping=True,  # Verificar conexiones antes de usar
-    pool_recycle=300,    # Reciclar conexiones cada 5 minutos
-    pool_size=5,         # Máximo 5 conexiones simultáneas
-    max_overflow=0,      # No permitir conexiones adicionales
     echo=False,          # Set to True para ver SQL queries en logs
+    **pool_options()
 )
 
 # Create sessionmaker
@@ -20,20 +85,341 @@ SessionLocal = sessionmaker(
     bind=engine
 )
 
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Pool async que mide la espera para obtener una conexión y el overflow"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        overflow = self._overflow
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            record_pool_wait(time.perf_counter() - started)
+        if self._overflow > max(overflow, 0):
+            db_pool_overflow_events.inc()
+        return connection
+
+def _pgbouncer_connect_args() -> dict:
+    """
+    asyncpg detrás de PgBouncer (modo transaction): sin caché de prepared
+    statements y con nombres únicos para no chocar entre conexiones del servidor
+    """
+    return {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 0,
+        "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+    }
+
+def _async_engine_options(url: str) -> dict:
+    """
+    Opciones del engine async según el driver
+    SQLite (aiosqlite) no acepta parámetros de pool de conexiones
+    """
+    if url.startswith("sqlite"):
+        return {"echo": False}
+    options = {"echo": False}
+    if settings.DB_PGBOUNCER:
+        options["connect_args"] = _pgbouncer_connect_args()
+    if use_null_pool():
+        options["poolclass"] = NullPool
+        return options
+    options["poolclass"] = TimedAsyncAdaptedQueuePool
+    options.update(pool_options())
+    return options
+
+# Engine async (asyncpg en producción, aiosqlite en tests) usado por los endpoints
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL_COMPUTED,
+    **_async_engine_options(settings.ASYNC_DATABASE_URL_COMPUTED)
+)
+
+# Conexiones en uso / libres / overflow en /metrics
+registry.add_collector(lambda: pool_gauges(async_engine.pool))
+
+# Tiempo y número de queries por request (ver app.core.metrics)
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    record_query(time.perf_counter() - conn.info["query_started"].pop())
+
+def _handle_cursor_error(context):
+    # Sentencia fallida: after_cursor_execute no se llama
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        record_query(time.perf_counter() - started.pop())
+
+def instrument_engine(sync_engine):
+    """Métricas por request y auditor opcional en un engine (primario o réplica)"""
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_cursor_error)
+    # Auditor opcional de N+1 y queries lentas (desarrollo y CI)
+    if settings.QUERY_AUDIT_ENABLED:
+        install_query_auditor(sync_engine)
+
+def _sqlite_connect(dbapi_connection, connection_record):
+    # Sin el BEGIN implícito de pysqlite (solo antes de DML): lo emite _sqlite_begin
+    dbapi_connection.isolation_level = None
+
+def _sqlite_begin(conn):
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+def use_sqlite_transactions(sync_engine):
+    """
+    SQLite (tests): transacciones explícitas para que SAVEPOINT y ROLLBACK
+    se comporten como en Postgres. IMMEDIATE toma el lock de escritura al
+    empezar: dos transacciones concurrentes esperan (busy timeout) en vez
+    de fallar al pasar de lectura a escritura
+    """
+    event.listen(sync_engine, "connect", _sqlite_connect)
+    event.listen(sync_engine, "begin", _sqlite_begin)
+
+instrument_engine(async_engine.sync_engine)
+if async_engine.dialect.name == "sqlite":
+    use_sqlite_transactions(async_engine.sync_engine)
+
+# Sessionmaker async - expire_on_commit=False para poder leer atributos
+# después de commit sin lanzar lazy loads fuera del event loop
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Create base class for declarative models
 Base = declarative_base()
 
 # Dependency para obtener sesión de base de datos
-def get_db():
+async def get_db():
     """
-    Dependency que provee una sesión de base de datos
+    Dependency que provee una sesión async de base de datos
     Se cierra automáticamente después de cada request
     """
-    db = SessionLocal()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@dataclass
+class Replica:
+    engine: object
+    sessionmaker: async_sessionmaker
+    healthy: bool = True
+    last_error: Optional[str] = None
+
+@dataclass
+class _WriteTracker:
+    """Marca de la request actual: hubo commit contra el primario"""
+    wrote: bool = False
+
+_write_tracker: ContextVar[Optional[_WriteTracker]] = ContextVar("diveapp_write_tracker", default=None)
+
+@event.listens_for(Session, "after_commit")
+def _mark_write(session):
+    tracker = _write_tracker.get()
+    if tracker is not None and not session.info.get("replica"):
+        tracker.wrote = True
+
+def transaction_info(session) -> dict:
+    """
+    Datos ligados a la transacción actual de una sesión (sync o async)
+    Se descartan al terminar la transacción, con commit o con rollback
+    """
+    session = getattr(session, "sync_session", session)
+    return session.info.setdefault("transaction", {})
+
+def on_commit(session, callback: Callable[[], None]):
+    """
+    Ejecutar callback tras el commit de la transacción actual
+    Los SAVEPOINT no cuentan y un rollback lo descarta: sirve para publicar
+    en cachés de proceso solo lo que ya es visible para otras conexiones
+    """
+    transaction_info(session).setdefault("on_commit", []).append(callback)
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session):
+    if session.in_nested_transaction():
+        return
+    for callback in session.info.get("transaction", {}).pop("on_commit", ()):
+        try:
+            callback()
+        except Exception:
+            logger.exception("on_commit callback failed")
+
+@event.listens_for(Session, "after_transaction_end")
+def _end_transaction_info(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("transaction", None)
+
+class ReadReplicaRouter:
+    """
+    Reparto de lecturas entre réplicas
+    - Round-robin entre las réplicas sanas; sin réplicas sanas, el primario
+    - Health check periódico en segundo plano (SELECT 1 y lag en Postgres)
+    - Read-your-writes: tras escribir, el cliente lee del primario durante
+      READ_YOUR_WRITES_SECONDS (cookie puesta por ReadYourWritesMiddleware)
+    """
+
+    def __init__(self, urls: List[str], check_interval: float = 10.0, max_lag: float = 30.0):
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self.replicas: List[Replica] = []
+        for url in map(to_async_url, urls):
+            replica_engine = create_async_engine(url, **_async_engine_options(url))
+            instrument_engine(replica_engine.sync_engine)
+            self.replicas.append(Replica(
+                engine=replica_engine,
+                sessionmaker=async_sessionmaker(
+                    bind=replica_engine,
+                    class_=AsyncSession,
+                    autoflush=False,
+                    expire_on_commit=False,
+                    info={"replica": True},
+                ),
+            ))
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def choose(self) -> Optional[Replica]:
+        """Siguiente réplica sana (round-robin) o None"""
+        if not self.replicas:
+            return None
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.healthy:
+                return replica
+        return None
+
+    async def check(self, replica: Replica):
+        try:
+            async with replica.engine.connect() as conn:
+                await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self.check_interval / 2)
+                if conn.dialect.name == "postgresql":
+                    lag = await conn.scalar(text(
+                        "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                    ))
+                    if lag > self.max_lag:
+                        raise RuntimeError(f"replication lag {lag:.1f}s")
+        except Exception as e:
+            if replica.healthy:
+                logger.warning("read replica %s unhealthy: %s", replica.engine.url, e)
+            replica.healthy = False
+            replica.last_error = str(e)
+            return
+        if not replica.healthy:
+            logger.info("read replica %s healthy again", replica.engine.url)
+        replica.healthy = True
+        replica.last_error = None
+
+    async def check_all(self):
+        await asyncio.gather(*(self.check(replica) for replica in self.replicas))
+
+    async def _health_loop(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    def start(self):
+        if self.replicas and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def status(self) -> List[dict]:
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "healthy": replica.healthy,
+                "last_error": replica.last_error,
+            }
+            for replica in self.replicas
+        ]
+
+read_router = ReadReplicaRouter(
+    [url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    check_interval=settings.REPLICA_HEALTH_CHECK_SECONDS,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+)
+
+def _replica_gauges():
+    gauge = Gauge("diveapp_db_replica_healthy", "Réplica de lectura sana (1) o fuera de rotación (0)", ("replica",))
+    for status in read_router.status():
+        gauge.set(int(status["healthy"]), replica=status["url"])
+    return [gauge] if read_router.replicas else []
+
+registry.add_collector(_replica_gauges)
+
+def reads_from_primary(request: Request) -> bool:
+    """El cliente escribió hace menos de READ_YOUR_WRITES_SECONDS"""
     try:
+        return float(request.cookies.get(settings.READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+@asynccontextmanager
+async def read_session(request: Request):
+    """
+    Sesión de solo lectura
+    Réplica sana por round-robin, o el primario si no hay réplicas o el
+    cliente acaba de escribir (read-your-writes)
+    """
+    replica = None if reads_from_primary(request) else read_router.choose()
+    factory = replica.sessionmaker if replica is not None else AsyncSessionLocal
+    async with factory() as db:
         yield db
-    finally:
-        db.close()
+
+async def get_read_db(request: Request):
+    """
+    Dependency de sesión de solo lectura (ver read_session)
+    Se cierra antes de enviar la respuesta: las StreamingResponse que leen
+    mientras envían deben abrir su propia sesión con read_session
+    """
+    async with read_session(request) as db:
+        yield db
+
+def is_replica_session(db: AsyncSession) -> bool:
+    return bool(db.sync_session.info.get("replica"))
+
+class ReadYourWritesMiddleware:
+    """
+    Middleware ASGI: si la request hizo commit en el primario, pone una
+    cookie para que las lecturas del cliente vayan al primario un tiempo
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        tracker = _WriteTracker()
+        token = _write_tracker.set(tracker)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and tracker.wrote:
+                window = settings.READ_YOUR_WRITES_SECONDS
+                cookie = (
+                    f"{settings.READ_YOUR_WRITES_COOKIE}={time.time() + window:.0f}; "
+                    f"Max-Age={window}; Path=/; HttpOnly; SameSite=Lax"
+                )
+                headers = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode("latin-1"))]
+                message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _write_tracker.reset(token)
 
 # Función para verificar conexión de base de datos
 def check_database_connection():
@@ -0,0 +1,154 @@
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Iterable, List, Optional
+from app.core.config import settings
+
+# Orden día/mes para fechas numéricas ambiguas (01/02/2025)
+DATE_ORDERS = ("dmy", "mdy")
+
+MONTH_ABBREVIATIONS = {
+    name: number
+    for number, name in enumerate(
+        ("jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"), start=1
+    )
+}
+
+# Un solo regex por familia de formatos: el match decide el formato sin
+# probar strptime uno a uno
+_YMD = re.compile(r"(\d{4})([-/])(\d{1,2})\2(\d{1,2})")                   # 2025-01-15, 2025/01/15
+_NUMERIC = re.compile(r"(\d{1,2})([-/])(\d{1,2})\2(\d{4})")               # 15/01/2025, 01-15-2025
+_DMY_ONLY = re.compile(r"(\d{1,2})(?:\.|\s+)(\d{1,2})(?:\.|\s+)(\d{4})")  # 15.01.2025, 15 01 2025
+_MONTH_NAME = re.compile(r"(\d{1,2})([-/])([A-Za-z]{3})\2(\d{4})")        # 15-Jan-2025, 15/Jan/2025
+
+SUPPORTED_FORMATS = "DD/MM/YYYY, MM/DD/YYYY, YYYY-MM-DD, DD-MM-YYYY, DD.MM.YYYY, DD-Mon-YYYY, etc."
+
+def _unparseable(date_str: str) -> ValueError:
+    return ValueError(f"Could not parse date '{date_str}'. Supported formats: {SUPPORTED_FORMATS}")
+
+def _resolve_order(order: Optional[str]) -> str:
+    order = order or settings.DATE_ORDER
+    if order not in DATE_ORDERS:
+        raise ValueError(f"Unknown date order '{order}'. Use one of: {', '.join(DATE_ORDERS)}")
+    return order
+
+@lru_cache(maxsize=4096)
+def _parse(date_str: str, order: str) -> datetime:
+    match = _YMD.fullmatch(date_str)
+    if match:
+        return datetime(int(match[1]), int(match[3]), int(match[4]))
+
+    match = _NUMERIC.fullmatch(date_str)
+    if match:
+        first, second, year = int(match[1]), int(match[3]), int(match[4])
+        day, month = (first, second) if order == "dmy" else (second, first)
+        try:
+            return datetime(year, month, day)
+        except ValueError:
+            # Solo una interpretación es válida (15/01 o 01/15)
+            return datetime(year, day, month)
+
+    match = _DMY_ONLY.fullmatch(date_str)
+    if match:
+        return datetime(int(match[3]), int(match[2]), int(match[1]))
+
+    match = _MONTH_NAME.fullmatch(date_str)
+    if match and match[3].lower() in MONTH_ABBREVIATIONS:
+        return datetime(int(match[4]), MONTH_ABBREVIATIONS[match[3].lower()], int(match[1]))
+
+    raise _unparseable(date_str)
+
+def parse_flexible_date(date_str: str, order: Optional[str] = None) -> datetime:
+    """
+    Parsear fecha en múltiples formatos comunes
+    order ("dmy" | "mdy") decide las fechas ambiguas como 01/02/2025;
+    por defecto settings.DATE_ORDER
+    """
+    order = _resolve_order(order)
+    try:
+        return _parse(date_str, order)
+    except ValueError:
+        # Fecha imposible (31/02/2025) o formato desconocido
+        raise _unparseable(date_str) from None
+
+# Familias en el orden en que _parse las prueba
+_FAMILIES = (("ymd", _YMD), ("numeric", _NUMERIC), ("dmy", _DMY_ONLY), ("month_name", _MONTH_NAME))
+
+def _classify(values: Iterable[str]) -> dict:
+    """
+    Agrupar valores distintos por familia: {familia: [(valor, match)]}
+    Se prueba primero la familia del valor anterior (una columna suele
+    tener un solo formato), así casi cada valor cuesta un único regex
+    """
+    groups = {"invalid": []}
+    families = list(_FAMILIES)
+    for value in values:
+        for index, (family, pattern) in enumerate(families):
+            match = pattern.fullmatch(value)
+            if match:
+                groups.setdefault(family, []).append((value, match))
+                if index:
+                    families.insert(0, families.pop(index))
+                break
+        else:
+            groups["invalid"].append((value, None))
+    return groups
+
+def _column_order(matches: list, order: str) -> str:
+    """
+    Orden día/mes de toda la columna numérica: el pedido salvo que algún
+    valor lo haga imposible (mes > 12) y el otro orden valga para todos
+    """
+    firsts = [int(match[1]) for _, match in matches]
+    seconds = [int(match[3]) for _, match in matches]
+    dmy_fits, mdy_fits = max(seconds, default=0) <= 12, max(firsts, default=0) <= 12
+    if order == "dmy" and not dmy_fits and mdy_fits:
+        return "mdy"
+    if order == "mdy" and not mdy_fits and dmy_fits:
+        return "dmy"
+    return order
+
+def _family_parts(family: str, match, order: str) -> tuple:
+    """(año, mes, día) de un match de la familia"""
+    if family == "ymd":
+        return int(match[1]), int(match[3]), int(match[4])
+    if family == "numeric":
+        first, second = int(match[1]), int(match[3])
+        return (int(match[4]),) + ((second, first) if order == "dmy" else (first, second))
+    if family == "dmy":
+        return int(match[3]), int(match[2]), int(match[1])
+    return int(match[4]), MONTH_ABBREVIATIONS.get(match[3].lower(), 0), int(match[1])
+
+def _build(family: str, match, order: str) -> Optional[datetime]:
+    if match is None:
+        return None
+    try:
+        return datetime(*_family_parts(family, match, order))
+    except ValueError:
+        if family != "numeric":
+            return None
+    # Columna mezclada: solo la otra interpretación es válida (15/01 o 01/15)
+    try:
+        return datetime(*_family_parts(family, match, "mdy" if order == "dmy" else "dmy"))
+    except ValueError:
+        return None
+
+def parse_dates(values: Iterable[Optional[str]], order: Optional[str] = None, errors: str = "raise") -> List[Optional[datetime]]:
+    """
+    Parsear una columna de fechas
+    Los valores distintos se agrupan por familia de formato y cada familia
+    se parsea en una pasada; en las numéricas (01/02/2025) el orden
+    día/mes se decide una vez para toda la columna. Los vacíos devuelven
+    None; errors="coerce" devuelve None en lugar de lanzar ValueError.
+    """
+    order = _resolve_order(order)
+    values = list(values)
+    distinct = dict.fromkeys(value for value in values if value)
+    parsed = {}
+    for family, matches in _classify(distinct).items():
+        family_order = _column_order(matches, order) if family == "numeric" else order
+        for value, match in matches:
+            parsed[value] = _build(family, match, family_order)
+            if parsed[value] is None and errors != "coerce":
+                raise _unparseable(value)
+    return [parsed[value] if value else None for value in values]
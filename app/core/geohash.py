@@ -0,0 +1,113 @@
+import math
+from typing import List, Optional, Set, Tuple
+
+# Geohash estándar: base32 sin a, i, l, o
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {char: index for index, char in enumerate(BASE32)}
+
+# Precisión guardada en dive_logs.geohash (~4.8 m x 4.8 m)
+STORED_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+
+def encode(lat: float, lng: float, precision: int = STORED_PRECISION) -> str:
+    """Geohash de un punto (bits alternos lng/lat, 5 bits por carácter)"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lng_range, lng) if even else (lat_range, lat)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+def geohash_for(lat: Optional[float], lng: Optional[float]) -> Optional[str]:
+    """Geohash almacenado para un dive (None sin coordenadas)"""
+    if lat is None or lng is None:
+        return None
+    return encode(lat, lng)
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(alto, ancho) en grados de una celda de la precisión dada"""
+    lat_bits = 5 * precision // 2
+    lng_bits = 5 * precision - lat_bits
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> Tuple[float, float, float, float]:
+    """
+    (min_lat, max_lat, min_lng, max_lng) que contiene el círculo
+    Las longitudes pueden salir de [-180, 180] si cruza el antimeridiano;
+    cerca de los polos cubre todas las longitudes
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - delta_lat, lat + delta_lat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), -180.0, 180.0
+    # Máxima extensión en longitud del círculo (no en la latitud del centro)
+    ratio = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return min_lat, max_lat, -180.0, 180.0
+    delta_lng = math.degrees(math.asin(ratio))
+    return min_lat, max_lat, lng - delta_lng, lng + delta_lng
+
+def _normalize_lng(lng: float) -> float:
+    return (lng + 180.0) % 360.0 - 180.0
+
+def covering_prefixes(box: Tuple[float, float, float, float], max_cells: int = 32) -> Set[str]:
+    """
+    Prefijos de geohash cuyas celdas cubren la bounding box
+    Usa la mayor precisión que no supere max_cells celdas
+    """
+    min_lat, max_lat, min_lng, max_lng = box
+    for precision in range(STORED_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        columns = min(math.floor(max_lng / width) - math.floor(min_lng / width) + 1, round(360 / width))
+        if rows * columns > max_cells and precision > 1:
+            continue
+        prefixes = set()
+        # Un punto por celda: esquinas inferiores de la rejilla más los bordes
+        lat_points = [min_lat + row * height for row in range(rows)] + [max_lat]
+        lng_points = [min_lng + column * width for column in range(columns)] + [max_lng]
+        for point_lat in lat_points:
+            for point_lng in lng_points:
+                prefixes.add(encode(min(max(point_lat, -90.0), 90.0 - 1e-9), _normalize_lng(point_lng), precision))
+        return prefixes
+    return set(BASE32)
+
+def prefix_upper_bound(prefix: str) -> Optional[str]:
+    """
+    Menor cadena mayor que todas las que empiezan por prefix (en el
+    alfabeto geohash); None si no hay cota (prefijo de solo "z")
+    """
+    while prefix:
+        index = _DECODE[prefix[-1]]
+        if index + 1 < len(BASE32):
+            return prefix[:-1] + BASE32[index + 1]
+        prefix = prefix[:-1]
+    return None
+
+def merge_prefixes(prefixes: Set[str]) -> List[Tuple[str, Optional[str]]]:
+    """Rangos [inicio, fin) de geohash contiguos a partir de los prefijos"""
+    ranges: List[Tuple[str, Optional[str]]] = []
+    for prefix in sorted(prefixes):
+        upper = prefix_upper_bound(prefix)
+        if ranges and ranges[-1][1] == prefix:
+            ranges[-1] = (ranges[-1][0], upper)
+        else:
+            ranges.append((prefix, upper))
+    return ranges
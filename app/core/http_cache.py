@@ -0,0 +1,63 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from fastapi import Request, Response
+
+def make_etag(*parts) -> str:
+    """ETag débil a partir de las partes que identifican la representación"""
+    digest = hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()[:24]
+    return f'W/"{digest}"'
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite devuelve datetimes naive: se asumen en UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+def http_date(value: datetime) -> str:
+    return format_datetime(_as_utc(value).replace(microsecond=0), usegmt=True)
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Comparación débil: se ignora el prefijo W/
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Evaluar If-None-Match / If-Modified-Since (RFC 9110)
+    If-None-Match tiene prioridad cuando está presente
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag is not None and _etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return _as_utc(last_modified).replace(microsecond=0) <= _as_utc(since)
+    return False
+
+def set_cache_headers(response: Response, etag: Optional[str], last_modified: Optional[datetime]) -> Response:
+    """Añadir ETag / Last-Modified; el cliente debe revalidar siempre"""
+    if etag is not None:
+        response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def not_modified(etag: Optional[str], last_modified: Optional[datetime]) -> Response:
+    """Respuesta 304 sin cuerpo"""
+    return set_cache_headers(Response(status_code=304), etag, last_modified)
@@ -0,0 +1,334 @@
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Buckets por defecto (segundos), los mismos que prometheus_client
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Contador monótono con etiquetas"""
+    type_name = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(Counter):
+    """Valor que sube y baja"""
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    """Histograma acumulativo con buckets fijos"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Por etiqueta: [conteo por bucket..., +Inf], suma
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+# Colector: devuelve métricas calculadas en el momento del scrape
+Collector = Callable[[], Iterable[_Metric]]
+
+class Registry:
+    """Registro de métricas renderizable en formato de texto Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric '{metric.name}' already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            for metric in collector():
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+# Métricas HTTP
+http_requests_total = registry.counter(
+    "diveapp_http_requests_total", "Requests HTTP por ruta, método y estado", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "diveapp_http_request_duration_seconds", "Latencia de requests HTTP por ruta", ("method", "route")
+)
+http_requests_in_flight = registry.gauge(
+    "diveapp_http_requests_in_flight", "Requests HTTP en curso"
+)
+
+# Métricas de base de datos
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+db_query_duration = registry.histogram(
+    "diveapp_db_query_duration_seconds", "Duración de cada sentencia SQL", buckets=DB_BUCKETS
+)
+db_request_time = registry.histogram(
+    "diveapp_db_request_time_seconds", "Tiempo total en base de datos por request", ("route",), buckets=DB_BUCKETS
+)
+db_request_queries = registry.histogram(
+    "diveapp_db_request_queries", "Número de sentencias SQL por request", ("route",),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+)
+db_pool_checkout_wait = registry.histogram(
+    "diveapp_db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool", buckets=DB_BUCKETS
+)
+
+db_pool_overflow_events = registry.counter(
+    "diveapp_db_pool_overflow_events_total", "Conexiones abiertas por encima de pool_size"
+)
+db_pool_timeouts = registry.counter(
+    "diveapp_db_pool_timeouts_total", "Checkouts que agotaron pool_timeout"
+)
+
+class RequestStats:
+    """Contadores de una request (DB y pool), compartidos vía contextvar"""
+    __slots__ = ("db_time", "query_count", "pool_wait")
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.query_count = 0
+        self.pool_wait = 0.0
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("diveapp_request_stats", default=None)
+
+def start_request_stats() -> RequestStats:
+    stats = RequestStats()
+    _request_stats.set(stats)
+    return stats
+
+def current_request_stats() -> Optional[RequestStats]:
+    return _request_stats.get()
+
+def record_query(seconds: float):
+    """Llamado desde los eventos de cursor del engine"""
+    db_query_duration.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.db_time += seconds
+        stats.query_count += 1
+
+def record_pool_wait(seconds: float):
+    """Llamado por el pool al entregar una conexión"""
+    db_pool_checkout_wait.observe(seconds)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.pool_wait += seconds
+
+def server_timing(total: float, stats: RequestStats) -> str:
+    """Valor de la cabecera Server-Timing (milisegundos)"""
+    return (
+        f"app;dur={total * 1000:.1f}, "
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries", '
+        f"pool;dur={stats.pool_wait * 1000:.1f}"
+    )
+
+def route_label(scope: dict) -> str:
+    """Plantilla de la ruta (/dive-logs/{dive_id}) para acotar la cardinalidad"""
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+def pool_gauges(pool) -> List[_Metric]:
+    """Estado actual de un pool de SQLAlchemy (QueuePool)"""
+    if not hasattr(pool, "checkedout"):
+        # NullPool / StaticPool: sin conexiones reutilizadas
+        return []
+    gauges = []
+    for name, documentation, value in (
+        ("diveapp_db_pool_size", "Tamaño configurado del pool", pool.size()),
+        ("diveapp_db_pool_checked_out", "Conexiones en uso", pool.checkedout()),
+        ("diveapp_db_pool_checked_in", "Conexiones libres en el pool", pool.checkedin()),
+        ("diveapp_db_pool_overflow", "Conexiones por encima de pool_size", max(pool.overflow(), 0)),
+    ):
+        gauge = Gauge(name, documentation)
+        gauge.set(value)
+        gauges.append(gauge)
+    return gauges
+
+def _timing_gauges(name: str, documentation: str, snapshots: Dict[str, dict]) -> List[Gauge]:
+    """Gauges count/total/max a partir de snapshots de _Timing"""
+    gauges = []
+    for field in ("count", "total_seconds", "max_seconds"):
+        gauge = Gauge(f"{name}_{field}", f"{documentation} ({field})", ("phase",))
+        for phase, snapshot in snapshots.items():
+            gauge.set(snapshot[field], phase=phase)
+        gauges.append(gauge)
+    return gauges
+
+def collect_password_hasher() -> List[_Metric]:
+    from app.core.passwords import password_hasher
+    metrics = password_hasher.metrics()
+    gauges = []
+    for field in ("pending", "rejected", "rehashed"):
+        gauge = Gauge(f"diveapp_password_hasher_{field}", f"Password hasher: {field}")
+        gauge.set(metrics[field])
+        gauges.append(gauge)
+    return gauges + _timing_gauges(
+        "diveapp_password_hasher", "Tiempos del password hasher",
+        {"queue_wait": metrics["queue_wait"], "hash": metrics["hash_time"]},
+    )
+
+def collect_caches() -> List[_Metric]:
+    from app.core.response_cache import response_cache
+    from app.core.security import token_cache, user_cache
+    gauges = {
+        field: Gauge(f"diveapp_cache_{field}", f"Caché: {field}", ("cache",))
+        for field in ("hits", "misses", "evictions", "size", "hit_ratio")
+    }
+    for name, cache in (("user", user_cache), ("token", token_cache)):
+        stats = cache.stats()
+        for field, gauge in gauges.items():
+            gauge.set(stats[field], cache=name)
+    response = Gauge("diveapp_response_cache_lookups", "Caché de respuestas por namespace", ("namespace", "result"))
+    for namespace, stats in response_cache.stats().items():
+        for result in ("hits", "misses", "coalesced", "errors"):
+            response.set(stats[result], namespace=namespace, result=result)
+    from app.services.dive_sites import site_catalog
+    from app.services.sightings import species_catalog
+    catalog = Gauge("diveapp_site_catalog_entries", "Entradas en memoria de los catálogos", ("kind",))
+    for kind, value in {**site_catalog.stats(), **species_catalog.stats()}.items():
+        catalog.set(value, kind=kind)
+    return list(gauges.values()) + [response, catalog]
+
+registry.add_collector(collect_password_hasher)
+registry.add_collector(collect_caches)
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI: latencia por ruta, requests en curso, tiempo y número
+    de queries por request y cabecera Server-Timing opcional
+    """
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = start_request_stats()
+        started = time.perf_counter()
+        status_code = 500
+        http_requests_in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    headers = list(message.get("headers", []))
+                    value = server_timing(time.perf_counter() - started, stats)
+                    headers.append((b"server-timing", value.encode("latin-1")))
+                    message = dict(message, headers=headers)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = route_label(scope)
+            http_requests_total.inc(method=scope["method"], route=route, status=status_code)
+            http_request_duration.observe(elapsed, method=scope["method"], route=route)
+            db_request_time.observe(stats.db_time, route=route)
+            db_request_queries.observe(stats.query_count, route=route)
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.core.config import settings
+
+# Password hashing - bcrypt tarda ~200-300 ms de CPU por hash
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Funciones a nivel de módulo para que sean picklables con ProcessPoolExecutor.
+# Devuelven los tiempos de inicio/fin medidos dentro del worker.
+def _hash_job(password: str) -> Tuple[str, float, float]:
+    started = time.monotonic()
+    hashed = pwd_context.hash(password)
+    return hashed, started, time.monotonic()
+
+def _verify_and_update_job(password: str, hashed_password: str) -> Tuple[Tuple[bool, Optional[str]], float, float]:
+    started = time.monotonic()
+    result = pwd_context.verify_and_update(password, hashed_password)
+    return result, started, time.monotonic()
+
+class _Timing:
+    """Acumulador simple de tiempos (count/total/max) en segundos"""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "total_seconds": round(self.total, 6),
+            "avg_seconds": round(self.total / self.count, 6) if self.count else 0.0,
+            "max_seconds": round(self.max, 6),
+        }
+
+class PasswordHasher:
+    """
+    Servicio de hashing de passwords fuera del event loop
+    Ejecuta bcrypt en un pool acotado de threads o procesos y rechaza
+    con 503 cuando la cola de trabajos pendientes está llena
+    """
+
+    def __init__(self, executor_type: str = "thread", max_workers: int = 2, max_queue: int = 32):
+        self.executor_type = executor_type
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.queue_wait = _Timing()
+        self.hash_time = _Timing()
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_type == "process":
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.max_workers,
+                            thread_name_prefix="password-hasher",
+                        )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        # Rechazo rápido si ya hay demasiados trabajos en cola o ejecutándose
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service busy, retry shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self._pending += 1
+
+        submitted = time.monotonic()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+        self.queue_wait.observe(max(started - submitted, 0.0))
+        self.hash_time.observe(finished - started)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash password en el pool"""
+        return await self._run(_hash_job, password)
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        Verificar password en el pool
+        Si el hash usa un esquema o número de rondas obsoleto (needs_update)
+        devuelve también el nuevo hash para guardarlo
+        """
+        valid, new_hash = await self._run(_verify_and_update_job, password, hashed_password)
+        if valid and new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def metrics(self) -> dict:
+        """Métricas de espera en cola vs tiempo de hash"""
+        return {
+            "executor": self.executor_type,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "pending": self._pending,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "queue_wait": self.queue_wait.snapshot(),
+            "hash_time": self.hash_time.snapshot(),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+# Instancia global del servicio
+password_hasher = PasswordHasher(
+    executor_type=settings.PASSWORD_HASH_EXECUTOR,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,223 @@
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Set
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+from app.core.metrics import route_label
+
+logger = logging.getLogger(__name__)
+
+# Máximo de sentencias SQL por endpoint ("módulo:función")
+# Los tests los comprueban con el fixture query_budget y el middleware
+# avisa en el log cuando una request los supera. Medidos en el peor caso
+# (tests/test_query_budgets.py): usuario fuera de caché y, en las altas,
+# país, sitio y especies nuevos (5 sentencias de catálogo) más el
+# SAVEPOINT/RELEASE que protege la reserva del dive_number
+QUERY_BUDGETS: Dict[str, int] = {
+    # app/api/v1/dive_logs.py (incluye la carga del usuario autenticado)
+    "app.api.v1.dive_logs:create_dive_log": 14,
+    "app.api.v1.dive_logs:get_user_dive_logs": 4,
+    "app.api.v1.dive_logs:get_dive_log_detail": 4,
+    "app.api.v1.dive_logs:update_dive_log": 12,
+    "app.api.v1.dive_logs:delete_dive_log": 11,
+    "app.api.v1.dive_logs:get_dive_stats": 11,
+    "app.api.v1.dive_logs:get_gas_stats": 2,
+    "app.api.v1.dive_logs:get_dive_site_stats": 3,
+    "app.api.v1.dive_logs:search_user_dive_logs": 6,
+    "app.api.v1.dive_logs:export_user_dive_logs": 2,
+    "app.api.v1.dive_logs:upload_dive_profile": 10,
+    "app.api.v1.dive_logs:get_dive_profile": 2,
+    # app/api/v1/species.py
+    "app.api.v1.species:list_species": 2,
+    "app.api.v1.species:get_site_seasonality": 3,
+    "app.api.v1.species:get_species_sightings": 3,
+    # app/api/v1/auth.py
+    "app.api.v1.auth:register_user": 5,
+    "app.api.v1.auth:login_user": 3,
+    "app.api.v1.auth:get_current_user_profile": 1,
+    # Endpoints legacy de app/main.py
+    "app.main:register_user_simple": 5,
+    "app.main:login_user_simple": 3,
+    "app.main:create_dive_log": 14,
+    "app.main:get_user_dive_logs": 4,
+}
+
+_WHITESPACE = re.compile(r"\s+")
+_BEGIN = re.compile(r"\s*BEGIN\b", re.IGNORECASE)
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Placeholders de los distintos drivers: ?, %s, %(name)s, $1, :name
+_PLACEHOLDER = re.compile(r"\?|%s|%\(\w+\)s|\$\d+|(?<!:):\w+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def statement_shape(statement: str) -> str:
+    """
+    Forma normalizada de una sentencia: sin literales ni placeholders
+    Dos queries que solo difieren en los parámetros tienen la misma forma
+    """
+    shape = _STRING_LITERAL.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    shape = _PLACEHOLDER_LIST.sub("(?)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+class QueryRecorder:
+    """Sentencias ejecutadas dentro de un bloque (request o test)"""
+
+    def __init__(self):
+        self.statements: List[str] = []
+        self.total_time = 0.0
+
+    def record(self, statement: str, seconds: float):
+        # El BEGIN explícito de SQLite no cuenta: asyncpg/psycopg2 no lo
+        # envían como sentencia y los presupuestos deben valer en ambos
+        if _BEGIN.match(statement):
+            return
+        self.statements.append(statement_shape(statement))
+        self.total_time += seconds
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """Formas ejecutadas al menos threshold veces (posible N+1)"""
+        return {shape: n for shape, n in Counter(self.statements).items() if n >= threshold}
+
+class RequestAudit(QueryRecorder):
+    """Auditoría de una request HTTP"""
+
+    def __init__(self, scope: dict):
+        super().__init__()
+        self.scope = scope
+
+    @property
+    def route(self) -> str:
+        # El router rellena scope["route"] después de crear la auditoría
+        return route_label(self.scope)
+
+    @property
+    def endpoint(self) -> Optional[str]:
+        endpoint = self.scope.get("endpoint")
+        if endpoint is None:
+            return None
+        return f"{endpoint.__module__}:{endpoint.__name__}"
+
+_current_audit: ContextVar[Optional[RequestAudit]] = ContextVar("diveapp_query_audit", default=None)
+
+# Recorders globales (fixture de pytest): el TestClient ejecuta la app en
+# otro thread, así que no comparten contextvars con el test
+_global_recorders: Set[QueryRecorder] = set()
+
+_installed: Set[int] = set()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("audit_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["audit_started"].pop()
+    audit = _current_audit.get()
+    if audit is not None:
+        audit.record(statement, elapsed)
+    for recorder in tuple(_global_recorders):
+        recorder.record(statement, elapsed)
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+    if elapsed >= threshold:
+        logger.warning(
+            "slow query (%.1f ms) route=%s: %s",
+            elapsed * 1000, audit.route if audit is not None else "-", _WHITESPACE.sub(" ", statement)[:500],
+        )
+
+def _handle_error(context):
+    started = context.connection.info.get("audit_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+def install_query_auditor(engine: Engine):
+    """Registrar los eventos del auditor en un engine (idempotente)"""
+    if id(engine) in _installed:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+    _installed.add(id(engine))
+
+def report_request(audit: RequestAudit):
+    """Avisar de N+1 y de presupuestos superados al terminar la request"""
+    for shape, count in audit.repeated(settings.QUERY_AUDIT_REPEAT_THRESHOLD).items():
+        logger.warning("possible N+1 route=%s: %d x %s", audit.route, count, shape[:300])
+    budget = QUERY_BUDGETS.get(audit.endpoint) if audit.endpoint else None
+    if budget is not None and audit.count > budget:
+        logger.warning(
+            "query budget exceeded route=%s: %d queries (budget %d)", audit.route, audit.count, budget
+        )
+
+class QueryAuditMiddleware:
+    """Middleware ASGI que audita las sentencias de cada request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        audit = RequestAudit(scope)
+        token = _current_audit.set(audit)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_audit.reset(token)
+            report_request(audit)
+
+class QueryBudgetExceeded(AssertionError):
+    """Un bloque ejecutó más sentencias de las permitidas"""
+
+@contextmanager
+def assert_max_queries(max_queries: int, allow_repeats: bool = False) -> Iterator[QueryRecorder]:
+    """
+    Fallar si el bloque ejecuta más de max_queries sentencias
+    Con allow_repeats=False también falla si detecta un posible N+1
+    """
+    from app.core.database import async_engine
+    install_query_auditor(async_engine.sync_engine)
+    recorder = QueryRecorder()
+    _global_recorders.add(recorder)
+    try:
+        yield recorder
+    finally:
+        _global_recorders.discard(recorder)
+    if recorder.count > max_queries:
+        raise QueryBudgetExceeded(
+            f"{recorder.count} queries (budget {max_queries}):\n" + "\n".join(recorder.statements)
+        )
+    repeated = recorder.repeated(settings.QUERY_AUDIT_REPEAT_THRESHOLD)
+    if repeated and not allow_repeats:
+        raise QueryBudgetExceeded(
+            "possible N+1:\n" + "\n".join(f"{count} x {shape}" for shape, count in repeated.items())
+        )
+
+try:
+    import pytest
+except ImportError:  # pragma: no cover - pytest solo en desarrollo
+    pytest = None
+
+if pytest is not None:
+    @pytest.fixture
+    def query_budget():
+        """
+        Fixture: with query_budget("app.api.v1.dive_logs:get_user_dive_logs"): ...
+        Acepta un endpoint de QUERY_BUDGETS o un número máximo de queries.
+        Activar con pytest_plugins = ["app.core.query_audit"] en conftest.py
+        """
+        def budget(endpoint_or_max, allow_repeats: bool = False):
+            if isinstance(endpoint_or_max, int):
+                return assert_max_queries(endpoint_or_max, allow_repeats)
+            return assert_max_queries(QUERY_BUDGETS[endpoint_or_max], allow_repeats)
+        return budget
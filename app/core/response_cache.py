@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional
+from urllib.parse import quote
+from fastapi import HTTPException, Request, Response
+from app.core.cache import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+from app.core.config import settings
+from app.core.http_cache import is_not_modified, not_modified
+
+logger = logging.getLogger(__name__)
+
+# Cabeceras de la respuesta original que se guardan junto al cuerpo
+CACHED_HEADERS = ("etag", "last-modified", "cache-control", "x-next-cursor")
+
+# Las generaciones por usuario viven más que cualquier entrada cacheada
+GENERATION_TTL_SECONDS = 30 * 24 * 3600
+
+class ResponseCache:
+    """
+    Caché de respuestas de lectura por usuario
+    - Clave: usuario + generación + namespace + parámetros de la consulta
+    - Invalidación: cualquier escritura incrementa la generación del usuario,
+      las entradas antiguas dejan de ser alcanzables y expiran por TTL
+    - Single-flight: una sola petición calcula cada clave a la vez (en el
+      proceso con un future compartido y entre procesos con un lock SET NX)
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 300.0, lock_ttl: float = 5.0, lock_wait: float = 2.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.lock_wait = lock_wait
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        )
+
+    @staticmethod
+    def _generation_key(user_id: int) -> str:
+        return f"gen:{user_id}"
+
+    async def generation(self, user_id: int) -> str:
+        key = self._generation_key(user_id)
+        value = await self.backend.get(key)
+        if value is None:
+            # Generación inicial basada en el reloj: nunca coincide con una
+            # generación anterior aunque la clave se haya perdido
+            await self.backend.add(key, str(time.time_ns() // 1_000_000), GENERATION_TTL_SECONDS)
+            value = await self.backend.get(key)
+        return value
+
+    async def invalidate_user(self, user_id: int):
+        """Invalidar todas las respuestas cacheadas del usuario"""
+        key = self._generation_key(user_id)
+        try:
+            if not await self.backend.add(key, str(time.time_ns() // 1_000_000), GENERATION_TTL_SECONDS):
+                await self.backend.incr(key)
+        except Exception:
+            logger.exception("response cache invalidation failed for user %s", user_id)
+
+    def _key(self, user_id: int, generation: str, namespace: str, params: dict) -> str:
+        # Valores escapados: texto libre (búsquedas) no puede simular otro parámetro
+        query = "&".join(f"{name}={quote(str(params[name]))}" for name in sorted(params) if params[name] is not None)
+        return f"resp:{user_id}:{generation}:{namespace}:{query}"
+
+    async def _wait_for_other_process(self, key: str) -> Optional[str]:
+        deadline = time.monotonic() + self.lock_wait
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+            value = await self.backend.get(key)
+            if value is not None:
+                return value
+        return None
+
+    async def get_or_compute(
+        self,
+        key: str,
+        namespace: str,
+        compute: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Valor cacheado o calculado una sola vez por clave
+        compute() devuelve None si el resultado no debe cachearse
+        """
+        metrics = self.metrics[namespace]
+        value = await self.backend.get(key)
+        if value is not None:
+            metrics["hits"] += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            metrics["coalesced"] += 1
+            return await asyncio.shield(inflight)
+
+        metrics["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        lock_key = f"lock:{key}"
+        locked = False
+        try:
+            locked = await self.backend.add(lock_key, "1", self.lock_ttl)
+            if not locked:
+                # Otro proceso lo está calculando: esperar su resultado
+                value = await self._wait_for_other_process(key)
+                if value is not None:
+                    metrics["coalesced"] += 1
+                    future.set_result(value)
+                    return value
+            value = await compute()
+            if value is not None:
+                await self.backend.set(key, value, self.ttl)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            # Evitar "exception was never retrieved" si nadie esperaba
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            # También si compute() falla (404, 400...): si no, las peticiones
+            # iguales esperarían lock_wait hasta que expire el lock
+            if locked:
+                await self._release(lock_key)
+
+    async def _release(self, lock_key: str):
+        try:
+            await self.backend.delete(lock_key)
+        except Exception:
+            logger.exception("response cache lock release failed for %s", lock_key)
+
+    async def respond(
+        self,
+        request: Request,
+        user_id: int,
+        namespace: str,
+        params: dict,
+        build: Callable[[], Awaitable[Response]],
+        store: bool = True
+    ) -> Response:
+        """
+        Servir una respuesta de lectura desde la caché
+        build() genera la respuesta real; solo se cachean las 200.
+        Con store=False (lectura desde una réplica, posiblemente con lag)
+        se sirven aciertos pero no se guarda el resultado.
+        Las peticiones condicionales se resuelven contra el ETag cacheado.
+        """
+        built: Optional[Response] = None
+        started = False
+
+        async def compute() -> Optional[str]:
+            nonlocal built, started
+            started = True
+            built = await build()
+            if built.status_code != 200 or not store:
+                return None
+            headers = {name: built.headers[name] for name in CACHED_HEADERS if name in built.headers}
+            return json.dumps({"headers": headers, "body": built.body.decode("utf-8")})
+
+        try:
+            generation = await self.generation(user_id)
+            entry = await self.get_or_compute(self._key(user_id, generation, namespace, params), namespace, compute)
+        except Exception as e:
+            # Errores del propio handler (404, 400...) se propagan tal cual
+            if started or isinstance(e, HTTPException):
+                raise
+            # Caché caída: servir sin caché
+            self.metrics[namespace]["errors"] += 1
+            logger.exception("response cache unavailable")
+            return await build()
+
+        if entry is None:
+            return built if built is not None else await build()
+        if built is not None:
+            built.headers["X-Cache"] = "MISS"
+            return built
+
+        cached = json.loads(entry)
+        headers = cached["headers"]
+        last_modified = parsedate_to_datetime(headers["last-modified"]) if "last-modified" in headers else None
+        if is_not_modified(request, headers.get("etag"), last_modified):
+            return not_modified(headers.get("etag"), last_modified)
+        response = Response(content=cached["body"], media_type="application/json", headers=headers)
+        response.headers["X-Cache"] = "HIT"
+        return response
+
+    def stats(self) -> dict:
+        """Hits/misses y ratio de aciertos por namespace"""
+        result = {}
+        for namespace, counters in self.metrics.items():
+            lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+            result[namespace] = dict(
+                counters,
+                hit_ratio=round((counters["hits"] + counters["coalesced"]) / lookups, 4) if lookups else 0.0,
+            )
+        return result
+
+    async def close(self):
+        await self.backend.close()
+
+class NullResponseCache(ResponseCache):
+    """Caché desactivada: siempre construye la respuesta"""
+
+    def __init__(self):
+        super().__init__(backend=MemoryCacheBackend(maxsize=0))
+
+    async def invalidate_user(self, user_id: int):
+        return None
+
+    async def respond(self, request, user_id, namespace, params, build, store=True) -> Response:
+        return await build()
+
+def create_response_cache() -> ResponseCache:
+    """Caché según CACHE_BACKEND: none | memory | redis"""
+    if settings.CACHE_BACKEND == "redis":
+        backend = RedisCacheBackend(settings.REDIS_URL)
+    elif settings.CACHE_BACKEND == "memory":
+        backend = MemoryCacheBackend(maxsize=settings.CACHE_MAX_ENTRIES, ttl=settings.CACHE_TTL_SECONDS)
+    else:
+        return NullResponseCache()
+    return ResponseCache(backend, ttl=settings.CACHE_TTL_SECONDS)
+
+response_cache = create_response_cache()
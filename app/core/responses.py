@@ -0,0 +1,81 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Iterable, Optional, Union
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: se usa json de la librería estándar
+    orjson = None
+
+def _default(value: Any):
+    """Tipos que no son JSON nativo (orjson ya resuelve datetime por su cuenta)"""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    if hasattr(value, "tolist"):  # arrays/escalares de NumPy
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def std_dumps(content: Any) -> bytes:
+    return json.dumps(
+        content,
+        default=_default,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+def orjson_dumps(content: Any) -> bytes:
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+    )
+
+class StdJSONResponse(JSONResponse):
+    """JSONResponse con soporte de datetime/Pydantic usando json estándar"""
+
+    def render(self, content: Any) -> bytes:
+        return std_dumps(content)
+
+class ORJSONFastResponse(JSONResponse):
+    """JSONResponse codificada con orjson (datetimes y NumPy nativos)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson_dumps(content)
+
+def get_response_class():
+    """Clase de respuesta por defecto según RESPONSE_JSON_ENCODER"""
+    if settings.RESPONSE_JSON_ENCODER == "orjson" and orjson is not None:
+        return ORJSONFastResponse
+    return StdJSONResponse
+
+DefaultJSONResponse = get_response_class()
+
+# Mismo codificador que DefaultJSONResponse, para cuerpos en streaming (NDJSON)
+json_dumps = orjson_dumps if DefaultJSONResponse is ORJSONFastResponse else std_dumps
+
+def model_response(
+    model: Union[BaseModel, Iterable[BaseModel]],
+    status_code: int = 200,
+    headers: Optional[dict] = None
+) -> JSONResponse:
+    """
+    Respuesta desde modelos ya validados con model_dump
+    Devolver un Response evita que FastAPI vuelva a validar con
+    response_model y a pasar por jsonable_encoder
+    """
+    if isinstance(model, BaseModel):
+        content = model.model_dump()
+    else:
+        content = [item.model_dump() for item in model]
+    return DefaultJSONResponse(content, status_code=status_code, headers=headers)
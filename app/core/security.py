@@ -1,27 +1,62 @@
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import object_session
+from app.core.cache import TTLCache
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_db, get_read_db, on_commit
+from app.core.passwords import pwd_context, password_hasher
 from app.models.user import User
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT token scheme
 security = HTTPBearer()
 
+# Cache de usuarios autenticados (clave: email del "sub" del token).
+# Guarda instancias User desacopladas de la sesión; cada request las
+# incorpora a su propia sesión con merge(load=False), sin ir a Postgres.
+# Cache por proceso: los cambios se invalidan tras el commit solo en este
+# worker; en los demás el TTL acota la desactualización.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+# Cache de payloads JWT ya verificados (clave: token) para no recalcular el HMAC
+token_cache = TTLCache(maxsize=settings.TOKEN_CACHE_SIZE, ttl=settings.TOKEN_CACHE_TTL_SECONDS)
+
+def invalidate_user(session, *emails: Optional[str]):
+    """
+    Invalidar usuarios cacheados (actualizados, desactivados o borrados)
+    tras el commit: antes, otra request podría volver a cachear la fila
+    anterior. Sin sesión se invalida en el acto
+    """
+    emails = [email for email in emails if email]
+
+    def invalidate():
+        for email in emails:
+            user_cache.invalidate(email)
+
+    if session is None:
+        invalidate()
+    elif emails:
+        on_commit(session, invalidate)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    # Cualquier flush del ORM que modifique un User invalida su entrada,
+    # incluido el email anterior si cambió
+    invalidate_user(object_session(target), target.email, *(inspect(target).attrs.email.history.deleted or ()))
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verificar password"""
+    """Verificar password (síncrono - no usar desde el event loop)"""
     return pwd_context.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    """Hash password"""
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    """Hash password en el pool de hashing"""
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crear JWT token"""
@@ -35,32 +70,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verificar JWT token y retornar email"""
+def decode_token(token: str) -> Optional[dict]:
+    """Decodificar y verificar JWT token, cacheando el payload hasta su expiración"""
+    payload = token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp") is None or payload["exp"] > time.time():
+            return payload
+        token_cache.invalidate(token)
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
     except JWTError:
         return None
+    
+    ttl = settings.TOKEN_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, payload["exp"] - time.time())
+    token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """Verificar JWT token y retornar email"""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+    return email
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
+    """Buscar usuario por email"""
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
     """Autenticar usuario"""
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_by_email(db, email)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+    if not valid:
         return None
+    if new_hash:
+        # Rehash transparente: se guarda con el commit del llamador
+        user.hashed_password = new_hash
     return user
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Obtener usuario actual desde JWT token"""
-    
+async def _user_from_credentials(credentials: HTTPAuthorizationCredentials, db: AsyncSession) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -75,14 +132,42 @@ def get_current_user(
     except Exception:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    cached_user = user_cache.get(email)
+    if cached_user is not None:
+        # Adjuntar a la sesión del request sin SELECT
+        return await db.merge(cached_user, load=False)
+    
+    user = await get_user_by_email(db, email)
     if user is None:
         raise credentials_exception
     
-    return user
+    # Cachear una copia desacoplada y devolver la instancia de esta sesión
+    db.expunge(user)
+    user_cache.set(email, user)
+    return await db.merge(user, load=False)
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """Obtener usuario actual desde JWT token"""
+    return await _user_from_credentials(credentials, db)
+
+async def get_current_user_read(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_read_db)
+) -> User:
+    """Como get_current_user pero en la sesión de lectura (réplica)"""
+    return await _user_from_credentials(credentials, db)
+
+async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Obtener usuario actual activo"""
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+async def get_current_active_user_read(current_user: User = Depends(get_current_user_read)) -> User:
+    """Usuario actual activo para endpoints de solo lectura"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
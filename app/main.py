@@ -1,15 +1,21 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.core.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, text
+from app.api.v1 import auth, dive_logs, species
+from app.core.database import ReadYourWritesMiddleware, get_db, get_read_db, read_router
 from app.core.config import settings
+from app.core.dates import parse_flexible_date
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.query_audit import QueryAuditMiddleware
+from app.core.responses import DefaultJSONResponse
 
 # Create FastAPI instance
 app = FastAPI(
     title="DiveApp API",
     description="API para buceo - Sin geoalchemy2",
     version="1.0.0",
+    default_response_class=DefaultJSONResponse,
 )
 
 # Add CORS middleware
@@ -21,6 +27,40 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Latencias por ruta, tiempo de DB por request y Server-Timing opcional
+app.add_middleware(MetricsMiddleware, server_timing=settings.SERVER_TIMING_ENABLED)
+
+# Lecturas del primario tras escribir (réplicas de lectura)
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Auditoría de queries por request (QUERY_AUDIT_ENABLED=true en desarrollo/CI)
+if settings.QUERY_AUDIT_ENABLED:
+    app.add_middleware(QueryAuditMiddleware)
+
+# API autenticada (Bearer JWT de /api/v1/auth/login), registrada antes que
+# los endpoints legacy: GET /api/v1/dive-logs/{id} es el detalle del router
+app.include_router(auth.router, prefix=f"{settings.API_V1_STR}/auth", tags=["auth"])
+app.include_router(dive_logs.router, prefix=f"{settings.API_V1_STR}/dive-logs", tags=["dive-logs"])
+app.include_router(species.router, prefix=f"{settings.API_V1_STR}/species", tags=["species"])
+
+@app.on_event("startup")
+async def start_read_replicas():
+    read_router.start()
+
+@app.on_event("shutdown")
+async def shutdown_read_replicas():
+    await read_router.close()
+
+@app.on_event("shutdown")
+async def shutdown_password_hasher():
+    from app.core.passwords import password_hasher
+    password_hasher.shutdown()
+
+@app.on_event("shutdown")
+async def shutdown_response_cache():
+    from app.core.response_cache import response_cache
+    await response_cache.close()
+
 @app.get("/")
 async def root():
     return {
@@ -33,13 +73,18 @@ async def root():
 async def health():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato de texto Prometheus"""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/api/v1/test-db")
-async def test_database_working(db: Session = Depends(get_db)):
+async def test_database_working(db: AsyncSession = Depends(get_db)):
     """
     Test de base de datos funcionando
     """
     try:
-        result = db.execute(text("SELECT 1 as test_value, current_timestamp as timestamp"))
+        result = await db.execute(text("SELECT 1 as test_value, current_timestamp as timestamp"))
         row = result.fetchone()
         
         return {
@@ -86,18 +131,18 @@ async def recreate_tables():
     try:
         from app.models.user import User
         from app.models.dive_log import DiveLog
-        from app.core.database import Base, engine
-        
-        # Eliminar tablas existentes
-        Base.metadata.drop_all(bind=engine)
-        
-        # Crear tablas nuevas
-        Base.metadata.create_all(bind=engine)
-        
-        # Verificar tablas creadas
+        from app.core.database import Base, async_engine
         from sqlalchemy import inspect
-        inspector = inspect(engine)
-        tables = inspector.get_table_names()
+        
+        async with async_engine.begin() as conn:
+            # Eliminar tablas existentes
+            await conn.run_sync(Base.metadata.drop_all)
+            
+            # Crear tablas nuevas
+            await conn.run_sync(Base.metadata.create_all)
+            
+            # Verificar tablas creadas
+            tables = await conn.run_sync(lambda sync_conn: inspect(sync_conn).get_table_names())
         
         return {
             "message": "✅ Tablas recreadas exitosamente",
@@ -120,29 +165,29 @@ async def register_user_simple(
     username: str,
     password: str,
     full_name: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Registro básico de usuario (sin validación compleja por ahora)
     """
     try:
         from app.models.user import User
-        from passlib.context import CryptContext
-        
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        from app.core.passwords import password_hasher
         
         # Verificar si email ya existe
-        existing_user = db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).where(User.email == email))
+        existing_user = result.scalars().first()
         if existing_user:
             raise HTTPException(status_code=400, detail="Email already registered")
         
         # Verificar si username ya existe
-        existing_username = db.query(User).filter(User.username == username).first()
+        result = await db.execute(select(User).where(User.username == username))
+        existing_username = result.scalars().first()
         if existing_username:
             raise HTTPException(status_code=400, detail="Username already taken")
         
         # Crear usuario
-        hashed_password = pwd_context.hash(password)
+        hashed_password = await password_hasher.hash(password)
         
         new_user = User(
             email=email,
@@ -153,8 +198,8 @@ async def register_user_simple(
         )
         
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
         
         return {
             "message": "✅ Usuario registrado exitosamente",
@@ -173,30 +218,33 @@ async def register_user_simple(
 async def login_user_simple(
     email: str,
     password: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Login básico de usuario
     """
     try:
         from app.models.user import User
-        from passlib.context import CryptContext
-        
-        pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        from app.core.passwords import password_hasher
         
         # Buscar usuario
-        user = db.query(User).filter(User.email == email).first()
+        result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
         if not user:
             raise HTTPException(status_code=401, detail="Invalid email or password")
         
         # Verificar password
-        if not pwd_context.verify(password, user.hashed_password):
+        valid, new_hash = await password_hasher.verify_and_update(password, user.hashed_password)
+        if not valid:
             raise HTTPException(status_code=401, detail="Invalid email or password")
+        if new_hash:
+            # Rehash transparente (esquema o rondas obsoletas)
+            user.hashed_password = new_hash
         
         # Actualizar last_login
         from datetime import datetime
         user.last_login = datetime.utcnow()
-        db.commit()
+        await db.commit()
         
         return {
             "message": "✅ Login exitoso",
@@ -212,35 +260,6 @@ async def login_user_simple(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Login error: {str(e)}")
 
-def parse_flexible_date(date_str: str):
-    """
-    Parsear fecha en múltiples formatos comunes
-    """
-    from datetime import datetime
-    
-    # Formatos comunes a probar
-    formats = [
-        "%Y-%m-%d",      # 2025-01-15 (ISO)
-        "%d/%m/%Y",      # 15/01/2025 (día/mes/año)
-        "%m/%d/%Y",      # 01/15/2025 (mes/día/año)
-        "%d-%m-%Y",      # 15-01-2025
-        "%m-%d-%Y",      # 01-15-2025
-        "%d.%m.%Y",      # 15.01.2025
-        "%Y/%m/%d",      # 2025/01/15
-        "%d %m %Y",      # 15 01 2025
-        "%d-%b-%Y",      # 15-Jan-2025
-        "%d/%b/%Y",      # 15/Jan/2025
-    ]
-    
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str, fmt)
-        except ValueError:
-            continue
-    
-    # Si ningún formato funciona, lanzar error
-    raise ValueError(f"Could not parse date '{date_str}'. Supported formats: DD/MM/YYYY, MM/DD/YYYY, YYYY-MM-DD, DD-MM-YYYY, etc.")
-
 @app.post("/api/v1/dive-logs")
 async def create_dive_log(
     user_id: int,
@@ -250,10 +269,12 @@ async def create_dive_log(
     dive_time: str = "10:00",  # formato: "14:30" (opcional)
     country: str = None,
     notes: str = None,
+    marine_life: str = None,  # "tortuga, manta" o array JSON
     dive_duration: int = None,  # en minutos
     water_temperature: float = None,
     visibility: float = None,
-    db: Session = Depends(get_db)
+    date_order: str = Query(None, description="dmy | mdy para fechas ambiguas como 01/02/2025"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Crear nuevo registro de buceo
@@ -262,20 +283,21 @@ async def create_dive_log(
     try:
         from app.models.dive_log import DiveLog
         from app.models.user import User
+        from app.services.dive_numbers import add_dive_log
+        from app.services.dive_sites import site_catalog
+        from app.services.sightings import apply_sighting_delta, sighting_snapshot, species_catalog
+        from app.services.user_stats import apply_dive_delta, dive_snapshot
+        from app.core.response_cache import response_cache
         from datetime import datetime, time
         
         # Verificar que el usuario existe
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Calcular siguiente dive number
-        last_dive = db.query(DiveLog).filter(DiveLog.user_id == user_id).order_by(DiveLog.dive_number.desc()).first()
-        next_dive_number = 1 if not last_dive else last_dive.dive_number + 1
-        
         # Parsear fecha con formato flexible
         try:
-            parsed_date = parse_flexible_date(dive_date)
+            parsed_date = parse_flexible_date(dive_date, date_order)
             
             # Parsear hora
             try:
@@ -292,27 +314,26 @@ async def create_dive_log(
         
         # Crear dive log
         new_dive = DiveLog(
-            user_id=user_id,
-            dive_number=next_dive_number,
             dive_site_name=dive_site_name,
             dive_date=dive_datetime,
             max_depth=max_depth,
             country=country,
             notes=notes,
+            marine_life=marine_life,
             dive_duration=dive_duration,
             water_temperature=water_temperature,
             visibility=visibility
         )
         
-        db.add(new_dive)
-        db.commit()
-        db.refresh(new_dive)
+        await site_catalog.assign(db, new_dive)
+        species_ids = await species_catalog.resolve(db, new_dive.marine_life)
         
-        # Actualizar total_dives del usuario
-        user.total_dives = next_dive_number
-        if max_depth and (not user.max_depth_achieved or max_depth > user.max_depth_achieved):
-            user.max_depth_achieved = max_depth
-        db.commit()
+        # dive_number, total_dives y max_depth_achieved en una sola transacción
+        await add_dive_log(db, user, new_dive)
+        await apply_dive_delta(db, user.id, None, dive_snapshot(new_dive))
+        await apply_sighting_delta(db, new_dive.id, None, sighting_snapshot(new_dive, species_ids))
+        await db.commit()
+        await response_cache.invalidate_user(user.id)
         
         return {
             "message": "✅ Dive log creado exitosamente",
@@ -333,22 +354,58 @@ async def create_dive_log(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating dive log: {str(e)}")
 
-@app.get("/api/v1/dive-logs/{user_id}")
-async def get_user_dive_logs(user_id: int, db: Session = Depends(get_db)):
+# Antes en /api/v1/dive-logs/{user_id}, ruta que ahora es el detalle autenticado
+@app.get("/api/v1/users/{user_id}/dive-logs")
+async def get_user_dive_logs(
+    user_id: int,
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=settings.DIVE_LOGS_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
     """
-    Obtener todos los dive logs de un usuario
+    Obtener los dive logs de un usuario (paginados por cursor)
+    La siguiente página se pide con ?cursor=<next_cursor>
     """
     try:
         from app.models.dive_log import DiveLog
         from app.models.user import User
+        from app.models.user_stats import UserDiveStats
+        from app.services.pagination import InvalidCursorError, paginate_dive_logs, split_page
         
         # Verificar usuario
-        user = db.query(User).filter(User.id == user_id).first()
+        user = await db.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         
-        # Obtener dive logs
-        dive_logs = db.query(DiveLog).filter(DiveLog.user_id == user_id).order_by(DiveLog.dive_date.desc()).all()
+        # Obtener página de dive logs
+        # Solo las columnas de la respuesta, como tuplas (sin instancias ORM)
+        columns = select(
+            DiveLog.id,
+            DiveLog.dive_number,
+            DiveLog.dive_site_name,
+            DiveLog.dive_date,
+            DiveLog.max_depth,
+            DiveLog.country,
+            DiveLog.notes,
+            DiveLog.dive_duration,
+            DiveLog.water_temperature,
+            DiveLog.visibility
+        ).where(DiveLog.user_id == user_id)
+        try:
+            query = paginate_dive_logs(columns, cursor, limit)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        result = await db.execute(query)
+        dive_logs, next_cursor = split_page(result.all(), limit)
+        
+        # Total desde las estadísticas materializadas (sin COUNT sobre dive_logs)
+        stats = await db.get(UserDiveStats, user_id)
+        if stats is not None:
+            total_dives_count = stats.dive_count
+        else:
+            total_dives_count = await db.scalar(
+                select(func.count(DiveLog.id)).where(DiveLog.user_id == user_id)
+            )
         
         return {
             "message": "✅ Dive logs obtenidos",
@@ -360,27 +417,25 @@ async def get_user_dive_logs(user_id: int, db: Session = Depends(get_db)):
             },
             "dive_logs": [
                 {
-                    "id": dive.id,
-                    "dive_number": dive.dive_number,
-                    "dive_site_name": dive.dive_site_name,
-                    "dive_date": str(dive.dive_date),
-                    "max_depth": dive.max_depth,
-                    "country": dive.country,
-                    "notes": dive.notes,
-                    "dive_duration": dive.dive_duration,
-                    "water_temperature": dive.water_temperature,
-                    "visibility": dive.visibility
+                    "id": dive_id,
+                    "dive_number": dive_number,
+                    "dive_site_name": dive_site_name,
+                    "dive_date": str(dive_date),
+                    "max_depth": max_depth,
+                    "country": country,
+                    "notes": notes,
+                    "dive_duration": dive_duration,
+                    "water_temperature": water_temperature,
+                    "visibility": visibility
                 }
-                for dive in dive_logs
+                for (dive_id, dive_number, dive_site_name, dive_date, max_depth, country,
+                     notes, dive_duration, water_temperature, visibility) in dive_logs
             ],
-            "total_dives_count": len(dive_logs)
+            "total_dives_count": total_dives_count,
+            "next_cursor": next_cursor
         }
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting dive logs: {str(e)}")
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,6 +1,11 @@
 # Importar todos los modelos para que SQLAlchemy los reconozca
 from .user import User
 from .dive_log import DiveLog
+from .user_stats import UserDiveStats, UserCountryStats
+from .dive_site import Country, DiveSite
+from .species import Species, DiveSighting, SpeciesSiteMonthStats
+from .dive_profile import DiveProfile
 
 # Esto asegura que los modelos estén disponibles cuando se importe este módulo
-__all__ = ["User", "DiveLog"]
\ No newline at end of file
+__all__ = ["User", "DiveLog", "UserDiveStats", "UserCountryStats", "Country", "DiveSite",
+           "Species", "DiveSighting", "SpeciesSiteMonthStats", "DiveProfile"]
\ No newline at end of file
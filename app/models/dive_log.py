@@ -1,11 +1,30 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Float, ForeignKey, Boolean, UniqueConstraint, Index, event, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 # from geoalchemy2 import Geography  # COMENTADO temporalmente por problemas NumPy
 from app.core.database import Base
+from app.core.geohash import geohash_for
+
+# Documento de búsqueda full-text (Postgres): sitio/país/región pesan más que
+# la vida marina y esta más que las notas. Configuración 'simple' (sin
+# stemming) porque las notas mezclan idiomas; el índice GIN y las consultas
+# usan esta misma expresión literal para que el planner la reconozca
+SEARCH_CONFIG = "simple"
+SEARCH_VECTOR_SQL = " || ".join(
+    f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+    for column, weight in (
+        ("dive_site_name", "A"),
+        ("country", "A"),
+        ("region", "A"),
+        ("marine_life", "B"),
+        ("notes", "C"),
+    )
+)
 
 class DiveLog(Base):
     __tablename__ = "dive_logs"
+    # Traer created_at/updated_at con RETURNING en el mismo INSERT/UPDATE
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     dive_number = Column(Integer, nullable=False)  # Sequential dive number for user
@@ -24,9 +43,13 @@ class DiveLog(Base):
     # location = Geography(geometry_type='POINT', srid=4326, nullable=True)  # COMENTADO
     location_lat = Column(Float, nullable=True)  # Latitud simple
     location_lng = Column(Float, nullable=True)  # Longitud simple
+    geohash = Column(String(12), nullable=True)  # calculado de lat/lng al escribir (búsquedas por cercanía)
     dive_site_name = Column(String, nullable=False)
     country = Column(String, nullable=True)
     region = Column(String, nullable=True)
+    # Catálogo canónico (asignados al escribir desde los textos de arriba)
+    site_id = Column(Integer, ForeignKey("dive_sites.id"), nullable=True)
+    country_id = Column(Integer, ForeignKey("countries.id"), nullable=True)
     
     # Technical data
     max_depth = Column(Float, nullable=False)  # in meters
@@ -65,9 +88,39 @@ class DiveLog(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # Constraints e índices
+    __table_args__ = (
+        # dive_number es secuencial por usuario (asignado desde users.total_dives)
+        UniqueConstraint("user_id", "dive_number", name="uq_dive_logs_user_dive_number"),
+        # Listados paginados por keyset sobre (dive_date, id)
+        Index("ix_dive_logs_user_date_id", user_id, dive_date.desc(), id.desc()),
+        # Agrupaciones por país del usuario y por sitio entre usuarios
+        Index("ix_dive_logs_user_country_id", user_id, country_id),
+        Index("ix_dive_logs_site_id", site_id),
+        # Búsquedas por cercanía: rangos de geohash (globales y por usuario)
+        Index("ix_dive_logs_geohash", geohash),
+        Index("ix_dive_logs_user_geohash", user_id, geohash),
+        # Búsqueda full-text (solo Postgres; en SQLite hay un índice invertido en memoria)
+        Index("ix_dive_logs_search", text(f"({SEARCH_VECTOR_SQL})"), postgresql_using="gin")
+            .ddl_if(dialect="postgresql"),
+    )
+    
     # Relationships
     user = relationship("User", back_populates="dive_logs")
     # operator = relationship("Operator", back_populates="dive_logs")  # COMENTADO por ahora
     
     def __repr__(self):
-        return f"<DiveLog(id={self.id}, site='{self.dive_site_name}', depth={self.max_depth}m)>"
\ No newline at end of file
+        return f"<DiveLog(id={self.id}, site='{self.dive_site_name}', depth={self.max_depth}m)>"
+
+@event.listens_for(DiveLog, "before_insert")
+@event.listens_for(DiveLog, "before_update")
+def _set_geohash(mapper, connection, target):
+    # Los inserts masivos (Core) lo calculan en add_dive_logs_bulk
+    target.geohash = geohash_for(target.location_lat, target.location_lng)
+
+@event.listens_for(DiveLog, "before_insert")
+def _unset_updated_at(mapper, connection, target):
+    # Valor explícito: sin él eager_defaults relee updated_at con un SELECT
+    # aparte tras el INSERT (solo tiene default en UPDATE)
+    if "updated_at" not in target.__dict__:
+        target.updated_at = None
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, LargeBinary
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class DiveProfile(Base):
+    """
+    Perfil del ordenador de buceo de un dive, empaquetado
+    Cada serie es un array int16 little-endian de deltas entre muestras
+    consecutivas comprimido con zlib (ver app/services/profiles.py):
+    profundidad en cm, temperatura en décimas de grado y tiempo en décimas
+    de segundo (solo si el muestreo no es a intervalo fijo)
+    """
+    __tablename__ = "dive_profiles"
+
+    dive_log_id = Column(Integer, ForeignKey("dive_logs.id", ondelete="CASCADE"), primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+    interval_seconds = Column(Float, nullable=True)  # None si hay time_data
+    depth_data = Column(LargeBinary, nullable=False)
+    temperature_data = Column(LargeBinary, nullable=True)
+    time_data = Column(LargeBinary, nullable=True)
+
+    # Resultados del análisis (calculados al subir el perfil)
+    duration_seconds = Column(Float, nullable=False)
+    max_depth = Column(Float, nullable=False)
+    avg_depth = Column(Float, nullable=False)  # media ponderada por tiempo
+    max_ascent_rate = Column(Float, nullable=True)  # m/min
+    ascent_violations = Column(Integer, nullable=False, default=0)
+    safety_stop_seconds = Column(Float, nullable=False, default=0)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<DiveProfile(dive_log_id={self.dive_log_id}, samples={self.sample_count})>"
@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class Country(Base):
+    """País canónico (normalized_name es la clave de deduplicación)"""
+    __tablename__ = "countries"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)  # primera grafía vista o alias canónico
+    normalized_name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Country(id={self.id}, name='{self.name}')>"
+
+class DiveSite(Base):
+    """Sitio de buceo canónico, único por nombre normalizado dentro de su país"""
+    __tablename__ = "dive_sites"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)
+    normalized_name = Column(String, nullable=False)
+    country_id = Column(Integer, ForeignKey("countries.id"), nullable=False)
+    region = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("country_id", "normalized_name", name="uq_dive_sites_country_name"),
+    )
+
+    def __repr__(self):
+        return f"<DiveSite(id={self.id}, name='{self.name}', country_id={self.country_id})>"
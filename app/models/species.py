@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class Species(Base):
+    """Diccionario de especies (nombres internados por nombre normalizado)"""
+    __tablename__ = "species"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False)  # primera grafía vista
+    normalized_name = Column(String, nullable=False, unique=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    def __repr__(self):
+        return f"<Species(id={self.id}, name='{self.name}')>"
+
+class DiveSighting(Base):
+    """Especie vista en un dive (extraída de dive_logs.marine_life al escribir)"""
+    __tablename__ = "dive_sightings"
+
+    dive_log_id = Column(Integer, ForeignKey("dive_logs.id", ondelete="CASCADE"), primary_key=True)
+    species_id = Column(Integer, ForeignKey("species.id"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_dive_sightings_species", species_id),
+    )
+
+class SpeciesSiteMonthStats(Base):
+    """Avistamientos precalculados por especie, sitio y mes del año (1-12)"""
+    __tablename__ = "species_site_month_stats"
+
+    species_id = Column(Integer, ForeignKey("species.id"), primary_key=True)
+    site_id = Column(Integer, ForeignKey("dive_sites.id"), primary_key=True)
+    month = Column(Integer, primary_key=True)
+    sighting_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Mapas de calor por sitio (especie x mes)
+        Index("ix_species_site_month_stats_site", site_id, month),
+    )
+
+    def __repr__(self):
+        return f"<SpeciesSiteMonthStats(species_id={self.species_id}, site_id={self.site_id}, month={self.month})>"
@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class UserDiveStats(Base):
+    """Estadísticas de buceo materializadas por usuario (actualizadas por deltas)"""
+    __tablename__ = "user_dive_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    dive_count = Column(Integer, nullable=False, default=0)
+    total_minutes = Column(Integer, nullable=False, default=0)
+    depth_sum = Column(Float, nullable=False, default=0)  # suma de avg_depth
+    depth_count = Column(Integer, nullable=False, default=0)  # dives con avg_depth
+    max_depth = Column(Float, nullable=True)  # in meters
+
+    # Versión de los dive logs del usuario (+1 en cada escritura) para ETags
+    version = Column(Integer, nullable=False, default=0, server_default="0")
+
+    # Timestamps (Last-Modified de los listados y estadísticas)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<UserDiveStats(user_id={self.user_id}, dives={self.dive_count})>"
+
+class UserCountryStats(Base):
+    """Número de inmersiones por país y usuario"""
+    __tablename__ = "user_country_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    country_id = Column(Integer, ForeignKey("countries.id"), primary_key=True)  # país "Unknown" si no tiene
+    dive_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserCountryStats(user_id={self.user_id}, country_id={self.country_id}, dives={self.dive_count})>"
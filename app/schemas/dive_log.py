@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Optional
 from datetime import datetime
 
 # Schema para crear dive log
@@ -18,8 +18,8 @@ class DiveLogCreate(BaseModel):
     # Ubicación
     country: Optional[str] = None
     region: Optional[str] = None
-    # location_lat: Optional[float] = None  # Por ahora sin GPS
-    # location_lng: Optional[float] = None
+    location_lat: Optional[float] = Field(None, ge=-90, le=90)
+    location_lng: Optional[float] = Field(None, ge=-180, le=180)
     
     # Equipo
     suit_type: Optional[str] = None
@@ -63,6 +63,10 @@ class DiveLogResponse(BaseModel):
     
     country: Optional[str] = None
     region: Optional[str] = None
+    site_id: Optional[int] = None  # catálogo canónico (/dive-logs/sites/{site_id})
+    country_id: Optional[int] = None
+    location_lat: Optional[float] = None
+    location_lng: Optional[float] = None
     
     suit_type: Optional[str] = None
     gas_mix: Optional[str] = None
@@ -97,6 +101,16 @@ class DiveLogUpdate(BaseModel):
     dive_date: Optional[datetime] = None
     max_depth: Optional[float] = None
     dive_duration: Optional[int] = None
+    location_lat: Optional[float] = Field(None, ge=-90, le=90)
+    location_lng: Optional[float] = Field(None, ge=-180, le=180)
     notes: Optional[str] = None
     rating: Optional[int] = None
-    marine_life: Optional[str] = None
\ No newline at end of file
+    marine_life: Optional[str] = None
+
+# Schema para subir el perfil del ordenador de buceo
+class DiveProfileUpload(BaseModel):
+    depths: List[float]  # en metros, una muestra por instante
+    # Intervalo fijo entre muestras o instantes (segundos desde el inicio) de cada una
+    interval_seconds: Optional[float] = Field(None, gt=0)
+    times: Optional[List[float]] = None
+    temperatures: Optional[List[Optional[float]]] = None  # en Celsius
@@ -0,0 +1,251 @@
+import codecs
+import csv
+import json
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.dates import SUPPORTED_FORMATS, parse_dates
+from app.models.user import User
+from app.schemas.dive_log import DiveLogCreate
+from app.services.dive_numbers import add_dive_logs_bulk
+from app.services.dive_sites import site_catalog
+from app.services.sightings import add_sightings_bulk, species_catalog
+from app.services.user_stats import add_dives_to_stats
+
+IMPORT_FORMATS = ("csv", "ndjson")
+
+class ImportFormatError(ValueError):
+    """Error que invalida el archivo completo (no una fila concreta)"""
+
+async def iter_lines(chunks: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[str]:
+    """
+    Dividir un stream de bytes en líneas UTF-8 (con su salto de línea)
+    Solo mantiene en memoria la línea en curso
+    """
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if len(buffer) > max_line_bytes:
+            raise ImportFormatError(f"Line exceeds {max_line_bytes} bytes")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+async def iter_csv_rows(lines: AsyncIterator[str], max_line_bytes: int) -> AsyncIterator[dict]:
+    """
+    Filas CSV como dicts usando la primera fila como cabecera
+    Un registro puede ocupar varias líneas si tiene campos entre comillas
+    """
+    header: Optional[List[str]] = None
+    record = ""
+    async for line in lines:
+        record += line
+        # Registro incompleto mientras haya comillas sin cerrar
+        if record.count('"') % 2:
+            if len(record) > max_line_bytes:
+                raise ImportFormatError(f"Record exceeds {max_line_bytes} bytes")
+            continue
+        if not record.strip():
+            record = ""
+            continue
+        values = next(csv.reader(record.splitlines(keepends=True)))
+        record = ""
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield dict(zip(header, values))
+    if record.strip():
+        raise ImportFormatError("Unterminated quoted field at end of file")
+
+async def iter_ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[object]:
+    """Una fila JSON por línea; las líneas vacías se ignoran"""
+    async for line in lines:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield e
+
+def parse_dive_dates(values: List[object], date_order: Optional[str] = None) -> List[object]:
+    """
+    Fechas de un lote de filas: ISO (con hora) directamente y el resto como
+    una columna con parse_dates, que decide el orden día/mes una sola vez.
+    Devuelve por fila la fecha, None si venía vacía o el ValueError
+    """
+    parsed: List[object] = []
+    pending = {}
+    for index, value in enumerate(values):
+        if value is None or isinstance(value, datetime):
+            parsed.append(value)
+            continue
+        value = str(value).strip()
+        try:
+            # ISO con hora ("2025-01-15T10:30:00")
+            parsed.append(datetime.fromisoformat(value))
+        except ValueError:
+            parsed.append(None)
+            pending[index] = value
+    if pending:
+        dates = parse_dates(pending.values(), date_order, errors="coerce")
+        for (index, value), dive_date in zip(pending.items(), dates):
+            parsed[index] = dive_date if dive_date is not None else ValueError(
+                f"Could not parse date '{value}'. Supported formats: {SUPPORTED_FORMATS}"
+            )
+    return parsed
+
+def _normalize_row(raw: dict) -> dict:
+    return {
+        key.strip(): (value.strip() or None) if isinstance(value, str) else value
+        for key, value in raw.items()
+        if key
+    }
+
+def _validate_row(row: dict, dive_date) -> dict:
+    if isinstance(dive_date, ValueError):
+        raise dive_date
+    if dive_date is not None:
+        row["dive_date"] = dive_date
+        dive_time = row.pop("dive_time", None)
+        if dive_time:
+            hour, minute = map(int, str(dive_time).split(":")[:2])
+            row["dive_date"] = row["dive_date"].replace(hour=hour, minute=minute)
+    return DiveLogCreate.model_validate(row).model_dump()
+
+def validate_rows(raws: List[dict], date_order: Optional[str] = None) -> List[object]:
+    """
+    Normalizar y validar un lote de filas contra DiveLogCreate
+    Devuelve por fila el dict de columnas listo para insertar o la
+    excepción (ValidationError o ValueError) que la invalida
+    """
+    rows = [_normalize_row(raw) for raw in raws]
+    dates = parse_dive_dates([row.get("dive_date") for row in rows], date_order)
+    results: List[object] = []
+    for row, dive_date in zip(rows, dates):
+        try:
+            results.append(_validate_row(row, dive_date))
+        except ValueError as e:
+            results.append(e)
+    return results
+
+class DiveLogImporter:
+    """
+    Importación masiva de dive logs en streaming
+    Valida por lotes (las fechas de cada lote como una columna), inserta en
+    lotes de tamaño fijo y acumula un informe de errores acotado: la memoria
+    no depende del tamaño del archivo
+    """
+
+    def __init__(self, db: AsyncSession, user: User, date_order: Optional[str] = None):
+        self.db = db
+        self.user = user
+        self.date_order = date_order
+        self.batch_size = settings.IMPORT_BATCH_SIZE
+        self.max_errors = settings.IMPORT_MAX_ERRORS
+        self.imported = 0
+        self.failed = 0
+        self.first_dive_number: Optional[int] = None
+        self.last_dive_number: Optional[int] = None
+        self.errors: List[dict] = []
+        self.aborted: Optional[str] = None
+        self._batch: List[dict] = []
+        # (número de fila, fila cruda) pendientes de validar
+        self._pending: List[tuple] = []
+
+    def _record_error(self, row_number: int, errors: list):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    async def _flush(self):
+        if not self._batch:
+            return
+        # IDs canónicos de sitio, país y especies (las altas van en esta misma transacción)
+        await site_catalog.assign_rows(self.db, self._batch)
+        species = [await species_catalog.resolve(self.db, row.get("marine_life")) for row in self._batch]
+        first, last = await add_dive_logs_bulk(self.db, self.user, self._batch)
+        await add_dives_to_stats(self.db, self.user.id, self._batch)
+        await add_sightings_bulk(self.db, self.user.id, first, last, self._batch, species)
+        await self.db.commit()
+        if self.first_dive_number is None:
+            self.first_dive_number = first
+        self.last_dive_number = last
+        self.imported += len(self._batch)
+        self._batch = []
+
+    async def run(self, rows: AsyncIterator[object]) -> dict:
+        try:
+            await self._consume(rows)
+        except ImportFormatError as e:
+            # Los lotes anteriores ya están confirmados; se informa dónde se cortó
+            self.aborted = str(e)
+        self._validate_pending()
+        await self._flush()
+        return self.report()
+
+    async def _consume(self, rows: AsyncIterator[object]):
+        row_number = 0
+        async for raw in rows:
+            row_number += 1
+            self._pending.append((row_number, raw))
+            if len(self._pending) >= self.batch_size:
+                self._validate_pending()
+                if len(self._batch) >= self.batch_size:
+                    await self._flush()
+
+    def _validate_pending(self):
+        pending = [(row_number, raw) for row_number, raw in self._pending if isinstance(raw, dict)]
+        results = dict(zip(
+            (row_number for row_number, _ in pending),
+            validate_rows([raw for _, raw in pending], self.date_order),
+        ))
+        for row_number, raw in self._pending:
+            if isinstance(raw, Exception):
+                self._record_error(row_number, [f"Invalid JSON: {raw}"])
+            elif not isinstance(raw, dict):
+                self._record_error(row_number, ["Row must be an object"])
+            elif isinstance(results[row_number], ValidationError):
+                self._record_error(row_number, [
+                    {"field": ".".join(str(part) for part in err["loc"]), "message": err["msg"]}
+                    for err in results[row_number].errors()
+                ])
+            elif isinstance(results[row_number], Exception):
+                self._record_error(row_number, [str(results[row_number])])
+            else:
+                self._batch.append(results[row_number])
+        self._pending = []
+
+    def report(self) -> dict:
+        return {
+            "imported": self.imported,
+            "failed": self.failed,
+            "first_dive_number": self.first_dive_number,
+            "last_dive_number": self.last_dive_number,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+            "aborted": self.aborted,
+        }
+
+async def import_dive_logs(
+    db: AsyncSession,
+    user: User,
+    chunks: AsyncIterator[bytes],
+    format: str,
+    date_order: Optional[str] = None
+) -> dict:
+    """Importar dive logs desde un stream CSV o NDJSON"""
+    lines = iter_lines(chunks, settings.IMPORT_MAX_LINE_BYTES)
+    if format == "csv":
+        rows = iter_csv_rows(lines, settings.IMPORT_MAX_LINE_BYTES)
+    elif format == "ndjson":
+        rows = iter_ndjson_rows(lines)
+    else:
+        raise ImportFormatError(f"Unsupported format '{format}'. Use one of: {', '.join(IMPORT_FORMATS)}")
+    return await DiveLogImporter(db, user, date_order).run(rows)
@@ -0,0 +1,120 @@
+from typing import List, Optional, Tuple
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.geohash import geohash_for
+from app.core.security import invalidate_user
+from app.models.dive_log import DiveLog
+from app.models.user import User
+
+# Reintentos cuando el contador y los dive_number existentes no coinciden
+MAX_ALLOCATION_RETRIES = 3
+
+users_table = User.__table__
+dive_logs_table = DiveLog.__table__
+
+async def allocate_dive_numbers(
+    db: AsyncSession,
+    user: User,
+    count: int = 1,
+    max_depth: Optional[float] = None
+) -> int:
+    """
+    Reservar `count` dive numbers consecutivos para el usuario
+    Un solo UPDATE ... RETURNING sobre users: incrementa total_dives y
+    actualiza max_depth_achieved en la misma sentencia. El lock de fila
+    serializa inserciones concurrentes del mismo usuario.
+    Devuelve el último número reservado (el primero es last - count + 1).
+    """
+    values = {"total_dives": func.coalesce(users_table.c.total_dives, 0) + count}
+    if max_depth is not None:
+        values["max_depth_achieved"] = case(
+            (users_table.c.max_depth_achieved.is_(None), max_depth),
+            (users_table.c.max_depth_achieved < max_depth, max_depth),
+            else_=users_table.c.max_depth_achieved,
+        )
+
+    result = await db.execute(
+        update(users_table)
+        .where(users_table.c.id == user.id)
+        .values(**values)
+        .returning(users_table.c.total_dives, users_table.c.max_depth_achieved)
+    )
+    total_dives, max_depth_achieved = result.one()
+
+    # Mantener coherente la instancia de la sesión sin marcarla como modificada
+    set_committed_value(user, "total_dives", total_dives)
+    set_committed_value(user, "max_depth_achieved", max_depth_achieved)
+    invalidate_user(db, user.email)
+    return total_dives
+
+async def resync_dive_counter(db: AsyncSession, user: User):
+    """
+    Alinear total_dives con el mayor dive_number existente
+    (datos antiguos en los que el contador quedó por detrás)
+    Dentro de la transacción actual: el llamador hace el commit
+    """
+    max_number = (
+        select(func.coalesce(func.max(dive_logs_table.c.dive_number), 0))
+        .where(dive_logs_table.c.user_id == user.id)
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(users_table)
+        .where(users_table.c.id == user.id)
+        .values(total_dives=case(
+            (func.coalesce(users_table.c.total_dives, 0) < max_number, max_number),
+            else_=users_table.c.total_dives,
+        ))
+    )
+
+async def add_dive_log(db: AsyncSession, user: User, dive_log: DiveLog) -> DiveLog:
+    """
+    Insertar dive log con dive_number atómico dentro de la transacción actual
+    Si el INSERT choca con la restricción única (user_id, dive_number) se
+    deshace solo su SAVEPOINT (lo ya hecho en la transacción se conserva),
+    se resincroniza el contador y se reintenta. El llamador hace el commit.
+    """
+    for attempt in range(MAX_ALLOCATION_RETRIES):
+        try:
+            async with db.begin_nested():
+                dive_log.dive_number = await allocate_dive_numbers(db, user, 1, dive_log.max_depth)
+                dive_log.user_id = user.id
+                db.add(dive_log)
+                await db.flush()
+            return dive_log
+        except IntegrityError:
+            if attempt == MAX_ALLOCATION_RETRIES - 1:
+                raise
+            await resync_dive_counter(db, user)
+    return dive_log
+
+async def add_dive_logs_bulk(db: AsyncSession, user: User, rows: List[dict]) -> Tuple[int, int]:
+    """
+    Insertar un lote de dive logs (dicts de columnas) con un solo executemany
+    Reserva el bloque de dive numbers con un único UPDATE ... RETURNING y los
+    asigna en orden. El llamador hace el commit.
+    Devuelve (primer, último) dive_number asignado.
+    """
+    if not rows:
+        return 0, 0
+    deepest = max((row["max_depth"] for row in rows if row.get("max_depth") is not None), default=None)
+    for attempt in range(MAX_ALLOCATION_RETRIES):
+        try:
+            # Como add_dive_log: un conflicto deshace solo este SAVEPOINT
+            async with db.begin_nested():
+                last = await allocate_dive_numbers(db, user, len(rows), deepest)
+                first = last - len(rows) + 1
+                for offset, row in enumerate(rows):
+                    row["user_id"] = user.id
+                    row["dive_number"] = first + offset
+                    # Core insert: sin el evento before_insert del modelo
+                    row["geohash"] = geohash_for(row.get("location_lat"), row.get("location_lng"))
+                await db.execute(insert(DiveLog), rows)
+            return first, last
+        except IntegrityError:
+            if attempt == MAX_ALLOCATION_RETRIES - 1:
+                raise
+            await resync_dive_counter(db, user)
+    return 0, 0
@@ -0,0 +1,249 @@
+import difflib
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import on_commit, transaction_info
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country, DiveSite
+
+UNKNOWN_COUNTRY = "Unknown"
+
+# Similitud mínima (difflib) para considerar dos nombres el mismo sitio
+SITE_MATCH_CUTOFF = 0.88
+
+# Grafías habituales -> nombre normalizado canónico
+COUNTRY_ALIASES = {
+    "usa": "united states",
+    "us": "united states",
+    "united states of america": "united states",
+    "eeuu": "united states",
+    "ee uu": "united states",
+    "u s a": "united states",
+    "estados unidos": "united states",
+    "uk": "united kingdom",
+    "reino unido": "united kingdom",
+    "great britain": "united kingdom",
+    "espana": "spain",
+    "egipto": "egypt",
+    "filipinas": "philippines",
+    "tailandia": "thailand",
+    "maldivas": "maldives",
+    "brasil": "brazil",
+    "francia": "france",
+    "italia": "italy",
+    "grecia": "greece",
+    "croacia": "croatia",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_DIGITS = re.compile(r"\d+")
+
+def normalize_name(name: Optional[str]) -> str:
+    """Minúsculas, sin acentos ni puntuación y con espacios colapsados"""
+    if not name:
+        return ""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return _NON_ALNUM.sub(" ", ascii_name.lower()).strip()
+
+def normalize_country(name: Optional[str]) -> str:
+    normalized = normalize_name(name) or normalize_name(UNKNOWN_COUNTRY)
+    return COUNTRY_ALIASES.get(normalized, normalized)
+
+def best_match(normalized: str, candidates: Iterable[str], cutoff: float = SITE_MATCH_CUTOFF) -> Optional[str]:
+    """
+    Candidato más parecido por encima del umbral (o None)
+    Los números deben coincidir: "wreck 2" y "wreck 12" son sitios distintos
+    """
+    digits = _DIGITS.findall(normalized)
+    candidates = [candidate for candidate in candidates if _DIGITS.findall(candidate) == digits]
+    matches = difflib.get_close_matches(normalized, candidates, n=1, cutoff=cutoff)
+    return matches[0] if matches else None
+
+def _insert_for(bind):
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+class SiteCatalog:
+    """
+    Caché en memoria del catálogo canónico de países y sitios
+    Resuelve nombres libres a IDs: coincidencia exacta del nombre normalizado,
+    después difflib dentro del mismo país y, si no hay candidato, crea el
+    sitio. Las altas van en la sesión del llamador (ON CONFLICT DO NOTHING,
+    sin una segunda conexión del pool) y solo pasan a la caché
+    compartida tras el commit; hasta entonces las ve únicamente esa transacción.
+    """
+
+    def __init__(self, cutoff: float = SITE_MATCH_CUTOFF):
+        self.cutoff = cutoff
+        self._countries: Dict[str, int] = {}
+        # country_id -> nombre normalizado (o variante ya resuelta) -> site_id
+        self._sites: Dict[int, Dict[str, int]] = {}
+        self._canonical: Dict[int, Set[str]] = {}
+
+    def clear(self):
+        self._countries.clear()
+        self._sites.clear()
+        self._canonical.clear()
+
+    def stats(self) -> dict:
+        return {
+            "countries": len(self._countries),
+            "sites": sum(len(names) for names in self._canonical.values()),
+            "variants": sum(len(names) for names in self._sites.values()),
+        }
+
+    def _pending(self, db: AsyncSession) -> dict:
+        """Altas de la transacción actual, aún sin confirmar"""
+        info = transaction_info(db)
+        pending = info.get("site_catalog")
+        if pending is None:
+            pending = info["site_catalog"] = {"countries": {}, "sites": {}}
+            on_commit(db, lambda: self._publish(pending))
+        return pending
+
+    def _publish(self, pending: dict):
+        self._countries.update(pending["countries"])
+        for country_id, sites in pending["sites"].items():
+            self._sites.setdefault(country_id, {}).update(sites)
+            self._canonical.setdefault(country_id, set()).update(sites)
+
+    async def _load_countries(self, db: AsyncSession, pending: dict):
+        rows = await db.execute(select(Country.id, Country.normalized_name))
+        created = set(pending["countries"].values())
+        self._countries.update({name: country_id for country_id, name in rows if country_id not in created})
+
+    async def _load_sites(self, db: AsyncSession, country_id: int, pending: dict):
+        rows = await db.execute(
+            select(DiveSite.id, DiveSite.normalized_name).where(DiveSite.country_id == country_id)
+        )
+        created = set(pending["sites"].get(country_id, {}).values())
+        sites = self._sites.setdefault(country_id, {})
+        canonical = self._canonical.setdefault(country_id, set())
+        for site_id, name in rows:
+            if site_id not in created:
+                sites[name] = site_id
+                canonical.add(name)
+
+    def _match_site(self, country_id: int, normalized: str, pending: Optional[dict] = None) -> Optional[int]:
+        sites = self._sites.get(country_id, {})
+        created = pending["sites"].get(country_id, {}) if pending else {}
+        if normalized in sites:
+            return sites[normalized]
+        if normalized in created:
+            return created[normalized]
+        match = best_match(normalized, self._canonical.get(country_id, set()) | set(created), self.cutoff)
+        if match is None:
+            return None
+        if match in created:
+            return created[match]
+        # Recordar la variante: la próxima vez es un acceso directo
+        sites[normalized] = sites[match]
+        return sites[match]
+
+    async def _insert(self, db: AsyncSession, table, values: dict, conflict: List[str], lookup) -> int:
+        """
+        Alta con ON CONFLICT DO NOTHING RETURNING id; si otra transacción ya
+        la creó no devuelve fila y se busca. El conflicto nunca lanza error,
+        así que no hace falta un SAVEPOINT (dos sentencias más por alta)
+        """
+        insert = _insert_for(db.get_bind())
+        result = await db.execute(
+            insert(table).values(**values).on_conflict_do_nothing(index_elements=conflict).returning(table.c.id)
+        )
+        created = result.scalar()
+        if created is not None:
+            return created
+        return (await db.execute(select(table.c.id).where(lookup))).scalar_one()
+
+    async def country_id(self, db: AsyncSession, name: Optional[str]) -> int:
+        normalized = normalize_country(name)
+        if normalized in self._countries:
+            return self._countries[normalized]
+        pending = self._pending(db)
+        if normalized in pending["countries"]:
+            return pending["countries"][normalized]
+        await self._load_countries(db, pending)
+        if normalized in self._countries:
+            return self._countries[normalized]
+        # Un alias se guarda con el nombre canónico, no con la grafía recibida
+        aliased = normalize_name(name) != normalized and name
+        display = normalized.title() if aliased else (name or UNKNOWN_COUNTRY).strip()
+        country_id = pending["countries"][normalized] = await self._insert(
+            db,
+            Country.__table__,
+            {"name": display, "normalized_name": normalized},
+            ["normalized_name"],
+            Country.normalized_name == normalized,
+        )
+        return country_id
+
+    async def find_country_id(self, db: AsyncSession, name: Optional[str]) -> Optional[int]:
+        """ID de un país existente (filtros de búsqueda); no crea nada"""
+        normalized = normalize_country(name)
+        if normalized not in self._countries:
+            result = await db.execute(select(Country.id).where(Country.normalized_name == normalized))
+            country_id = result.scalar()
+            if country_id is None:
+                return None
+            self._countries[normalized] = country_id
+        return self._countries[normalized]
+
+    async def site_id(
+        self,
+        db: AsyncSession,
+        name: Optional[str],
+        country_id: int,
+        region: Optional[str] = None
+    ) -> Optional[int]:
+        normalized = normalize_name(name)
+        if not normalized:
+            return None
+        pending = self._pending(db)
+        if country_id in self._sites or country_id in pending["sites"]:
+            site_id = self._match_site(country_id, normalized, pending)
+            if site_id is not None:
+                return site_id
+        # Recargar el país: otra transacción puede haber creado el sitio
+        await self._load_sites(db, country_id, pending)
+        site_id = self._match_site(country_id, normalized, pending)
+        if site_id is not None:
+            return site_id
+        site_id = pending["sites"].setdefault(country_id, {})[normalized] = await self._insert(
+            db,
+            DiveSite.__table__,
+            {"name": name.strip(), "normalized_name": normalized, "country_id": country_id, "region": region},
+            ["country_id", "normalized_name"],
+            (DiveSite.country_id == country_id) & (DiveSite.normalized_name == normalized),
+        )
+        return site_id
+
+    async def resolve(
+        self,
+        db: AsyncSession,
+        site_name: Optional[str],
+        country: Optional[str],
+        region: Optional[str] = None
+    ) -> Tuple[Optional[int], int]:
+        """(site_id, country_id) canónicos de un dive"""
+        country_id = await self.country_id(db, country)
+        return await self.site_id(db, site_name, country_id, region), country_id
+
+    async def assign(self, db: AsyncSession, dive_log: DiveLog):
+        """Rellenar site_id/country_id de un dive log antes de escribirlo (en su transacción)"""
+        dive_log.site_id, dive_log.country_id = await self.resolve(
+            db, dive_log.dive_site_name, dive_log.country, dive_log.region
+        )
+
+    async def assign_rows(self, db: AsyncSession, rows: List[dict]):
+        """Igual que assign para los dicts de una importación por lotes"""
+        for row in rows:
+            row["site_id"], row["country_id"] = await self.resolve(
+                db, row.get("dive_site_name"), row.get("country"), row.get("region")
+            )
+
+site_catalog = SiteCatalog()
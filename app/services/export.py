@@ -0,0 +1,172 @@
+import csv
+import io
+import zlib
+from datetime import date, datetime
+from typing import AsyncIterator, List, Sequence
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.responses import json_dumps
+from app.models.dive_log import DiveLog
+from app.schemas.dive_log import DiveLogCreate
+from app.services.projection import schema_fields
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow es opcional: sin él no hay exportación Parquet
+    pa = pq = None
+
+EXPORT_FORMATS = ("csv", "ndjson", "parquet")
+
+# Mismas columnas que acepta la importación (más IDs y fechas de registro):
+# un CSV/NDJSON exportado se puede volver a importar tal cual
+EXPORT_FIELDS = (
+    ("id", "dive_number")
+    + schema_fields(DiveLogCreate)
+    + ("site_id", "country_id", "created_at", "updated_at")
+)
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+GZIP_LEVEL = 6
+
+class ExportFormatError(ValueError):
+    """Formato no soportado (o no disponible en este despliegue)"""
+
+def check_format(format: str):
+    if format not in EXPORT_FORMATS:
+        raise ExportFormatError(f"Unsupported format '{format}'")
+    if format == "parquet" and pa is None:
+        raise ExportFormatError("Parquet export requires pyarrow")
+
+def export_filename(user_id: int, format: str, gzip: bool) -> str:
+    # Parquet comprime por columnas: gzip cambia el códec interno, no el archivo
+    suffix = ".gz" if gzip and format != "parquet" else ""
+    return f"dive-logs-{user_id}.{format}{suffix}"
+
+async def iter_batches(db: AsyncSession, user_id: int, batch_size: int) -> AsyncIterator[Sequence[tuple]]:
+    """
+    Dives del usuario en lotes de batch_size filas
+    Cursor del servidor (stream + yield_per): nunca se carga el logbook entero
+    """
+    result = await db.stream(
+        select(*(getattr(DiveLog, field) for field in EXPORT_FIELDS))
+        .where(DiveLog.user_id == user_id)
+        .order_by(DiveLog.dive_number, DiveLog.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions():
+        yield partition
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+async def csv_chunks(batches: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_csv_value(value) for value in row] for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+async def ndjson_chunks(batches: AsyncIterator[Sequence[tuple]]) -> AsyncIterator[bytes]:
+    async for rows in batches:
+        yield b"".join(json_dumps(dict(zip(EXPORT_FIELDS, row))) + b"\n" for row in rows)
+
+def _arrow_type(column):
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp("us", tz="UTC" if column.type.timezone else None)
+    return pa.string()
+
+def arrow_schema():
+    return pa.schema([(field, _arrow_type(DiveLog.__table__.c[field])) for field in EXPORT_FIELDS])
+
+class _ChunkSink(io.RawIOBase):
+    """Archivo de solo escritura que acumula bytes hasta que se vacían con drain()"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+async def parquet_chunks(batches: AsyncIterator[Sequence[tuple]], compression: str = "snappy") -> AsyncIterator[bytes]:
+    """Un row group por lote; cada row group se envía en cuanto se escribe"""
+    schema = arrow_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        async for rows in batches:
+            columns = zip(*rows)
+            table = pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = GZIP_LEVEL) -> AsyncIterator[bytes]:
+    """Comprimir al vuelo en formato gzip (wbits=31)"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+async def export_dive_logs(
+    db: AsyncSession,
+    user_id: int,
+    format: str,
+    gzip: bool = False,
+    batch_size: int = None
+) -> AsyncIterator[bytes]:
+    """
+    Logbook completo del usuario como stream de bytes
+    Memoria constante: como mucho un lote de filas y su codificación a la vez
+    """
+    check_format(format)
+    batches = iter_batches(db, user_id, batch_size or settings.EXPORT_BATCH_SIZE)
+    if format == "parquet":
+        chunks = parquet_chunks(batches, "gzip" if gzip else "snappy")
+    else:
+        chunks = csv_chunks(batches) if format == "csv" else ndjson_chunks(batches)
+        if gzip:
+            chunks = gzip_chunks(chunks)
+    async for chunk in chunks:
+        if chunk:
+            yield chunk
@@ -0,0 +1,182 @@
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.dive_log import DiveLog
+
+# Percentiles de los desgloses por mezcla y traje
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Dives de la media móvil de RMV
+ROLLING_WINDOW = 10
+
+# RMV plausible (L/min): fuera de este rango son errores de datos (presiones o botella mal anotadas)
+MIN_RMV = 3.0
+MAX_RMV = 80.0
+
+DEFAULT_GAS_MIX = "Air"
+UNKNOWN_SUIT = "Unknown"
+
+@dataclass
+class GasColumns:
+    """Columnas de consumo de los dives de un usuario, en orden cronológico"""
+    ids: np.ndarray
+    dive_dates: np.ndarray  # datetimes (object)
+    tank_volume: np.ndarray  # L
+    start_pressure: np.ndarray  # bar
+    end_pressure: np.ndarray  # bar
+    dive_duration: np.ndarray  # min
+    avg_depth: np.ndarray  # m
+    gas_mix: np.ndarray  # str (object)
+    suit_type: np.ndarray  # str (object)
+
+    def __len__(self) -> int:
+        return self.ids.size
+
+GAS_COLUMNS = (
+    DiveLog.id,
+    DiveLog.dive_date,
+    DiveLog.tank_volume,
+    DiveLog.start_pressure,
+    DiveLog.end_pressure,
+    DiveLog.dive_duration,
+    DiveLog.avg_depth,
+    DiveLog.gas_mix,
+    DiveLog.suit_type,
+)
+
+def columns_from_rows(rows: Sequence[tuple]) -> GasColumns:
+    """Filas de GAS_COLUMNS -> arrays (una sola transposición, sin objetos ORM)"""
+    if rows:
+        ids, dates, tank, start, end, duration, depth, gas_mix, suit_type = zip(*rows)
+    else:
+        ids = dates = tank = start = end = duration = depth = gas_mix = suit_type = ()
+    return GasColumns(
+        ids=np.asarray(ids, dtype=np.int64),
+        dive_dates=np.asarray(dates, dtype=object),
+        tank_volume=np.asarray(tank, dtype=np.float64),
+        start_pressure=np.asarray(start, dtype=np.float64),
+        end_pressure=np.asarray(end, dtype=np.float64),
+        dive_duration=np.asarray(duration, dtype=np.float64),
+        avg_depth=np.asarray(depth, dtype=np.float64),
+        gas_mix=np.asarray([value or DEFAULT_GAS_MIX for value in gas_mix], dtype=object),
+        suit_type=np.asarray([value or UNKNOWN_SUIT for value in suit_type], dtype=object),
+    )
+
+async def load_gas_columns(db: AsyncSession, user_id: int) -> GasColumns:
+    """Dives del usuario con todos los datos necesarios para calcular el consumo"""
+    result = await db.execute(
+        select(*GAS_COLUMNS)
+        .where(
+            DiveLog.user_id == user_id,
+            DiveLog.tank_volume.isnot(None),
+            DiveLog.start_pressure.isnot(None),
+            DiveLog.end_pressure.isnot(None),
+            DiveLog.dive_duration.isnot(None),
+            DiveLog.avg_depth.isnot(None),
+        )
+        .order_by(DiveLog.dive_date, DiveLog.id)
+    )
+    return columns_from_rows(result.all())
+
+def consumption(columns: GasColumns):
+    """
+    SAC (bar/min en superficie) y RMV (L/min) de cada dive
+    SAC = (inicio - fin) / duración / presión ambiente media (avg_depth/10 + 1)
+    RMV = SAC * volumen de la botella
+    Devuelve (sac, rmv, válidos)
+    """
+    used = columns.start_pressure - columns.end_pressure
+    ambient = columns.avg_depth / 10.0 + 1.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sac = used / columns.dive_duration / ambient
+    rmv = sac * columns.tank_volume
+    valid = (
+        (columns.dive_duration > 0)
+        & (used > 0)
+        & (columns.tank_volume > 0)
+        & (columns.avg_depth >= 0)
+        & np.isfinite(rmv)
+        & (rmv >= MIN_RMV)
+        & (rmv <= MAX_RMV)
+    )
+    return sac, rmv, valid
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Media móvil con cumsum (los primeros valores usan la media acumulada)"""
+    if values.size == 0:
+        return values
+    cumsum = np.cumsum(np.insert(values, 0, 0.0))
+    head = min(window - 1, values.size)
+    expanding = cumsum[1:head + 1] / np.arange(1, head + 1)
+    full = (cumsum[window:] - cumsum[:-window]) / window
+    return np.concatenate((expanding, full))
+
+def summarize(values: np.ndarray) -> dict:
+    if values.size == 0:
+        return {"count": 0, "mean": None, **{f"p{p}": None for p in PERCENTILES}}
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": round(float(values.mean()), 2),
+        **{f"p{p}": round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+    }
+
+def grouped_summary(values: np.ndarray, labels: np.ndarray, key: str) -> List[dict]:
+    """Percentiles por grupo: un argsort y np.split, sin filtrar por grupo"""
+    if values.size == 0:
+        return []
+    names, inverse = np.unique(labels.astype(str), return_inverse=True)
+    ordered = values[np.argsort(inverse, kind="stable")]
+    groups = np.split(ordered, np.cumsum(np.bincount(inverse, minlength=names.size))[:-1])
+    breakdown = [{key: str(name), **summarize(group)} for name, group in zip(names, groups)]
+    return sorted(breakdown, key=lambda entry: (-entry["count"], entry[key]))
+
+def compute_gas_analytics(
+    columns: GasColumns,
+    window: int = ROLLING_WINDOW,
+    series_points: Optional[int] = 100
+) -> dict:
+    """
+    Consumo de gas en una pasada vectorizada sobre los arrays del usuario
+    series_points=None omite la serie por dive (resumen para /stats/summary)
+    """
+    sac, rmv, valid = consumption(columns)
+    sac, rmv = sac[valid], rmv[valid]
+    analytics = {
+        "dives": len(columns),
+        "dives_with_consumption": int(valid.sum()),
+        "sac_bar_min": summarize(sac),
+        "rmv_l_min": summarize(rmv),
+        "by_gas_mix": grouped_summary(rmv, columns.gas_mix[valid], "gas_mix"),
+        "by_suit_type": grouped_summary(rmv, columns.suit_type[valid], "suit_type"),
+    }
+
+    rolling = rolling_mean(rmv, window)
+    # Pendiente de la recta de RMV: L/min de cambio cada 100 dives
+    slope = float(np.polyfit(np.arange(rmv.size), rmv, 1)[0]) * 100 if rmv.size >= 2 else None
+    analytics["trend"] = {
+        "window": window,
+        "current_rolling_rmv": round(float(rolling[-1]), 2) if rolling.size else None,
+        "rmv_change_per_100_dives": round(slope, 2) if slope is not None else None,
+    }
+
+    if series_points is not None:
+        tail = slice(max(rmv.size - series_points, 0), None)
+        analytics["series"] = {
+            "dive_id": columns.ids[valid][tail].tolist(),
+            "dive_date": [value.isoformat() for value in columns.dive_dates[valid][tail]],
+            "sac": np.round(sac[tail], 2).tolist(),
+            "rmv": np.round(rmv[tail], 2).tolist(),
+            "rolling_rmv": np.round(rolling[tail], 2).tolist(),
+        }
+    return analytics
+
+async def get_gas_analytics(
+    db: AsyncSession,
+    user_id: int,
+    window: int = ROLLING_WINDOW,
+    series_points: Optional[int] = 100
+) -> dict:
+    return compute_gas_analytics(await load_gas_columns(db, user_id), window, series_points)
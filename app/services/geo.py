@@ -0,0 +1,145 @@
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import and_, case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.geohash import EARTH_RADIUS_KM, bounding_box, covering_prefixes, merge_prefixes
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country, DiveSite
+from app.schemas.dive_log import DiveLogSummary
+from app.services.projection import schema_fields
+
+# Radio máximo de búsqueda: por encima la prefiltración ya no acota nada útil
+MAX_RADIUS_KM = 500.0
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distancia de gran círculo desde (lat, lng) a cada candidato, vectorizada"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearby_filter(lat: float, lng: float, radius_km: float):
+    """
+    Prefiltro indexable: rangos de geohash que cubren la bounding box
+    más la propia bounding box sobre lat/lng
+    """
+    box = bounding_box(lat, lng, radius_km)
+    min_lat, max_lat, min_lng, max_lng = box
+
+    geohash_ranges = []
+    for start, end in merge_prefixes(covering_prefixes(box)):
+        condition = DiveLog.geohash >= start
+        if end is not None:
+            condition = and_(condition, DiveLog.geohash < end)
+        geohash_ranges.append(condition)
+
+    if min_lng < -180:
+        lng_condition = or_(DiveLog.location_lng >= min_lng + 360, DiveLog.location_lng <= max_lng)
+    elif max_lng > 180:
+        lng_condition = or_(DiveLog.location_lng >= min_lng, DiveLog.location_lng <= max_lng - 360)
+    else:
+        lng_condition = DiveLog.location_lng.between(min_lng, max_lng)
+
+    return and_(or_(*geohash_ranges), DiveLog.location_lat.between(min_lat, max_lat), lng_condition)
+
+def _within_radius(rows, lat: float, lng: float, radius_km: float, lat_index: int, lng_index: int):
+    """Filtrar y ordenar por distancia exacta; devuelve (fila, distancia)"""
+    if not rows:
+        return []
+    coordinates = np.array([(row[lat_index], row[lng_index]) for row in rows], dtype=np.float64)
+    distances = haversine_km(lat, lng, coordinates[:, 0], coordinates[:, 1])
+    inside = np.flatnonzero(distances <= radius_km)
+    ordered = inside[np.argsort(distances[inside], kind="stable")]
+    return [(rows[index], float(distances[index])) for index in ordered]
+
+def _site_lng(lng: float, lng_east: float, lng_span: float) -> float:
+    """
+    Longitud media de un sitio. Un sitio que abarca más de 180° en realidad
+    cruza el antimeridiano: la media directa (179.9 y -179.9 -> 0) caería
+    en el lado opuesto del planeta, la de [0, 360) no
+    """
+    if lng_span <= 180:
+        return lng
+    return (lng_east + 180) % 360 - 180
+
+async def find_nearby_dives(
+    db: AsyncSession,
+    user_id: int,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    limit: int = 50
+) -> List[dict]:
+    """Dives del usuario a menos de radius_km de (lat, lng), del más cercano al más lejano"""
+    fields = schema_fields(DiveLogSummary)
+    columns = [getattr(DiveLog, name) for name in fields] + [DiveLog.location_lat, DiveLog.location_lng]
+    result = await db.execute(
+        select(*columns).where(DiveLog.user_id == user_id, nearby_filter(lat, lng, radius_km))
+    )
+    rows = result.all()
+    lat_index = len(fields)
+    nearby = _within_radius(rows, lat, lng, radius_km, lat_index, lat_index + 1)[:limit]
+    return [
+        dict(
+            zip(fields, row),
+            location_lat=row[lat_index],
+            location_lng=row[lat_index + 1],
+            distance_km=round(distance, 3),
+        )
+        for row, distance in nearby
+    ]
+
+async def find_nearby_sites(
+    db: AsyncSession,
+    lat: float,
+    lng: float,
+    radius_km: float,
+    limit: int = 50,
+    user_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Sitios del catálogo a menos de radius_km
+    Agrupa por site_id en SQL y calcula la distancia sobre la posición media del sitio
+    """
+    grouped = (
+        select(
+            DiveLog.site_id,
+            func.avg(DiveLog.location_lat).label("lat"),
+            func.avg(DiveLog.location_lng).label("lng"),
+            # Media en [0, 360): la que vale si el sitio cruza el antimeridiano
+            func.avg(case((DiveLog.location_lng < 0, DiveLog.location_lng + 360), else_=DiveLog.location_lng))
+            .label("lng_east"),
+            (func.max(DiveLog.location_lng) - func.min(DiveLog.location_lng)).label("lng_span"),
+            func.count(DiveLog.id).label("dive_count"),
+        )
+        .where(DiveLog.site_id.isnot(None), nearby_filter(lat, lng, radius_km))
+        .group_by(DiveLog.site_id)
+    )
+    if user_id is not None:
+        grouped = grouped.where(DiveLog.user_id == user_id)
+    grouped = grouped.subquery()
+    query = (
+        select(
+            grouped.c.site_id, DiveSite.name, Country.name, grouped.c.lat,
+            grouped.c.lng, grouped.c.lng_east, grouped.c.lng_span, grouped.c.dive_count,
+        )
+        .join(DiveSite, DiveSite.id == grouped.c.site_id)
+        .join(Country, Country.id == DiveSite.country_id)
+    )
+    rows = [
+        (site_id, name, country, site_lat, _site_lng(lng, lng_east, lng_span), dive_count)
+        for site_id, name, country, site_lat, lng, lng_east, lng_span, dive_count in await db.execute(query)
+    ]
+    nearby = _within_radius(rows, lat, lng, radius_km, 3, 4)[:limit]
+    return [
+        {
+            "site_id": site_id,
+            "dive_site_name": name,
+            "country": country,
+            "location_lat": site_lat,
+            "location_lng": site_lng,
+            "dive_count": dive_count,
+            "distance_km": round(distance, 3),
+        }
+        for (site_id, name, country, site_lat, site_lng, dive_count), distance in nearby
+    ]
@@ -0,0 +1,42 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import desc, tuple_
+from sqlalchemy.sql import Select
+from app.models.dive_log import DiveLog
+
+class InvalidCursorError(ValueError):
+    """Cursor de paginación mal formado"""
+
+def encode_cursor(dive_date: datetime, dive_id: int) -> str:
+    """Cursor opaco con la posición (dive_date, id) del último elemento"""
+    raw = json.dumps([dive_date.isoformat(), dive_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        dive_date, dive_id = json.loads(raw)
+        return datetime.fromisoformat(dive_date), int(dive_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+def paginate_dive_logs(query: Select, cursor: Optional[str], limit: int) -> Select:
+    """
+    Paginación por keyset sobre (dive_date DESC, id DESC)
+    Usa el índice (user_id, dive_date DESC, id DESC): el coste no depende
+    de la profundidad de la página y las páginas no se desplazan al insertar.
+    Pide limit + 1 filas para saber si hay página siguiente.
+    """
+    if cursor:
+        dive_date, dive_id = decode_cursor(cursor)
+        query = query.where(tuple_(DiveLog.dive_date, DiveLog.id) < tuple_(dive_date, dive_id))
+    return query.order_by(desc(DiveLog.dive_date), desc(DiveLog.id)).limit(limit + 1)
+
+def split_page(rows: list, limit: int, key=lambda row: (row.dive_date, row.id)) -> Tuple[list, Optional[str]]:
+    """Separar la fila extra y calcular el cursor de la página siguiente"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
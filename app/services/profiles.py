@@ -0,0 +1,310 @@
+import asyncio
+import math
+import sys
+import zlib
+from dataclasses import dataclass
+from typing import List, Optional
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models.dive_log import DiveLog
+from app.models.dive_profile import DiveProfile
+from app.schemas.dive_log import DiveProfileUpload
+
+# Escalas de cuantización a enteros antes del delta-encoding
+DEPTH_SCALE = 100  # cm
+TEMPERATURE_SCALE = 10  # décimas de grado
+TIME_SCALE = 10  # décimas de segundo
+
+# Mayor salto entre muestras que cabe en un delta int16 de time_data
+MAX_SAMPLE_GAP_SECONDS = 32767 / TIME_SCALE
+
+MAX_PROFILE_DEPTH = 350.0  # m: por encima es un error del archivo
+
+# Parada de seguridad: tiempo continuo entre 3 y 6 m después del punto más profundo
+SAFETY_STOP_MIN_DEPTH = 3.0
+SAFETY_STOP_MAX_DEPTH = 6.0
+SAFETY_STOP_SECONDS = 180
+
+# Ventana mínima para medir la velocidad de ascenso (filtra el ruido del sensor)
+ASCENT_WINDOW_SECONDS = 10.0
+
+DEFAULT_CHART_POINTS = 500
+
+class ProfileError(ValueError):
+    """Perfil de buceo inválido"""
+
+@dataclass
+class ProfileSeries:
+    times: np.ndarray  # segundos desde el inicio
+    depths: np.ndarray  # metros
+    temperatures: Optional[np.ndarray] = None  # Celsius
+    interval_seconds: Optional[float] = None
+
+@dataclass
+class ProfileAnalysis:
+    duration_seconds: float
+    max_depth: float
+    avg_depth: float
+    max_ascent_rate: Optional[float]
+    ascent_violations: int
+    safety_stop_seconds: float
+
+    @property
+    def safety_stop(self) -> bool:
+        return self.safety_stop_seconds >= SAFETY_STOP_SECONDS
+
+    @property
+    def safety_stop_minutes(self) -> Optional[int]:
+        """Minutos para dive_logs.safety_stop_time (None por debajo de un minuto)"""
+        return round(self.safety_stop_seconds / 60) if self.safety_stop_seconds >= 60 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "duration_seconds": round(self.duration_seconds, 1),
+            "max_depth": round(self.max_depth, 2),
+            "avg_depth": round(self.avg_depth, 2),
+            "max_ascent_rate": round(self.max_ascent_rate, 1) if self.max_ascent_rate is not None else None,
+            "ascent_violations": self.ascent_violations,
+            "safety_stop": self.safety_stop,
+            "safety_stop_seconds": round(self.safety_stop_seconds, 1),
+        }
+
+def encode_series(values: np.ndarray, scale: int) -> bytes:
+    """Cuantizar, codificar como deltas int16 y comprimir"""
+    deltas = np.diff(np.rint(values * scale).astype(np.int64), prepend=0)
+    if deltas.size and (deltas.min() < -32768 or deltas.max() > 32767):
+        raise ProfileError("Sample-to-sample change too large to store")
+    return zlib.compress(deltas.astype("<i2").tobytes(), 6)
+
+def _quantize(values: np.ndarray, scale: int) -> np.ndarray:
+    return np.rint(values * scale) / scale
+
+def decode_series(data: bytes, scale: int) -> np.ndarray:
+    deltas = np.frombuffer(zlib.decompress(data), dtype="<i2")
+    return np.cumsum(deltas, dtype=np.int64) / scale
+
+def _fill_gaps(values: np.ndarray) -> Optional[np.ndarray]:
+    """Interpolar muestras sin temperatura (muchos ordenadores la miden cada N muestras)"""
+    valid = ~np.isnan(values)
+    if not valid.any():
+        return None
+    if valid.all():
+        return values
+    indexes = np.arange(values.size)
+    return np.interp(indexes, indexes[valid], values[valid])
+
+def build_series(upload: DiveProfileUpload) -> ProfileSeries:
+    """Validar el perfil subido y convertirlo a arrays"""
+    count = len(upload.depths)
+    if count < 2:
+        raise ProfileError("A profile needs at least 2 samples")
+    if count > settings.PROFILE_MAX_SAMPLES:
+        raise ProfileError(f"Too many samples (max {settings.PROFILE_MAX_SAMPLES})")
+    if (upload.interval_seconds is None) == (upload.times is None):
+        raise ProfileError("Send either interval_seconds or times")
+
+    depths = np.asarray(upload.depths, dtype=np.float64)
+    if not np.isfinite(depths).all() or depths.max() > MAX_PROFILE_DEPTH:
+        raise ProfileError("Invalid depth samples")
+    # Lecturas ligeramente negativas en superficie
+    depths = np.clip(depths, 0.0, None)
+
+    if upload.times is not None:
+        if len(upload.times) != count:
+            raise ProfileError("times and depths must have the same length")
+        times = np.asarray(upload.times, dtype=np.float64)
+        ticks = np.rint(times * TIME_SCALE)
+        steps = np.diff(ticks)
+        if not np.isfinite(times).all() or times[0] < 0 or (steps <= 0).any():
+            raise ProfileError("times must be increasing (0.1 s resolution)")
+        if steps.max() > MAX_SAMPLE_GAP_SECONDS * TIME_SCALE:
+            raise ProfileError(f"Gap between samples too large (max {MAX_SAMPLE_GAP_SECONDS:g} s)")
+        # Segundos desde la primera muestra: time_data solo guarda deltas
+        times = (ticks - ticks[0]) / TIME_SCALE
+    else:
+        times = np.arange(count, dtype=np.float64) * upload.interval_seconds
+
+    temperatures = None
+    if upload.temperatures is not None:
+        if len(upload.temperatures) != count:
+            raise ProfileError("temperatures and depths must have the same length")
+        temperatures = _fill_gaps(np.array(
+            [np.nan if value is None else value for value in upload.temperatures], dtype=np.float64
+        ))
+
+    # Misma resolución que lo guardado: el análisis coincide con un reanálisis posterior
+    depths = _quantize(depths, DEPTH_SCALE)
+    if temperatures is not None:
+        temperatures = _quantize(temperatures, TEMPERATURE_SCALE)
+    return ProfileSeries(times, depths, temperatures, upload.interval_seconds)
+
+def _runs(mask: np.ndarray):
+    """(inicios, finales) [start, end) de los tramos consecutivos a True"""
+    changes = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(changes == 1), np.flatnonzero(changes == -1)
+
+def analyze(series: ProfileSeries) -> ProfileAnalysis:
+    """Profundidad media, velocidad de ascenso y parada de seguridad, vectorizado"""
+    times, depths = series.times, series.depths
+    duration = float(times[-1] - times[0])
+    avg_depth = float(np.trapz(depths, times) / duration) if duration > 0 else float(depths.mean())
+
+    # Velocidad de ascenso (m/min, positiva subiendo) sobre ventanas de al menos ASCENT_WINDOW_SECONDS
+    step = max(1, math.ceil(ASCENT_WINDOW_SECONDS / float(np.median(np.diff(times)))))
+    max_ascent_rate = None
+    violations = 0
+    if depths.size > step:
+        rates = (depths[:-step] - depths[step:]) / (times[step:] - times[:-step]) * 60
+        max_ascent_rate = max(float(rates.max()), 0.0)
+        violations = len(_runs(rates > settings.MAX_ASCENT_RATE)[0])
+
+    # Tramo continuo más largo en la franja de la parada, después del punto más profundo
+    in_band = (depths >= SAFETY_STOP_MIN_DEPTH) & (depths <= SAFETY_STOP_MAX_DEPTH)
+    in_band[:int(np.argmax(depths))] = False
+    starts, ends = _runs(in_band)
+    safety_stop_seconds = 0.0
+    if starts.size:
+        # Hasta la primera muestra fuera de la franja (o la última del perfil)
+        stop_durations = times[np.minimum(ends, times.size - 1)] - times[starts]
+        safety_stop_seconds = float(stop_durations.max())
+
+    return ProfileAnalysis(
+        duration_seconds=duration,
+        max_depth=float(depths.max()),
+        avg_depth=avg_depth,
+        max_ascent_rate=max_ascent_rate,
+        ascent_violations=violations,
+        safety_stop_seconds=safety_stop_seconds,
+    )
+
+def pack(series: ProfileSeries, analysis: ProfileAnalysis) -> dict:
+    """Columnas de DiveProfile para una serie analizada"""
+    return {
+        "sample_count": int(series.depths.size),
+        "interval_seconds": series.interval_seconds,
+        "depth_data": encode_series(series.depths, DEPTH_SCALE),
+        "temperature_data": (
+            encode_series(series.temperatures, TEMPERATURE_SCALE) if series.temperatures is not None else None
+        ),
+        "time_data": encode_series(series.times, TIME_SCALE) if series.interval_seconds is None else None,
+        "duration_seconds": analysis.duration_seconds,
+        "max_depth": analysis.max_depth,
+        "avg_depth": analysis.avg_depth,
+        "max_ascent_rate": analysis.max_ascent_rate,
+        "ascent_violations": analysis.ascent_violations,
+        "safety_stop_seconds": analysis.safety_stop_seconds,
+    }
+
+def unpack(profile: DiveProfile) -> ProfileSeries:
+    depths = decode_series(profile.depth_data, DEPTH_SCALE)
+    if profile.time_data is not None:
+        times = decode_series(profile.time_data, TIME_SCALE)
+    else:
+        times = np.arange(depths.size, dtype=np.float64) * profile.interval_seconds
+    temperatures = (
+        decode_series(profile.temperature_data, TEMPERATURE_SCALE) if profile.temperature_data is not None else None
+    )
+    return ProfileSeries(times, depths, temperatures, profile.interval_seconds)
+
+def apply_analysis(dive_log: DiveLog, series: ProfileSeries, analysis: ProfileAnalysis):
+    """
+    Rellenar el dive log con los datos medidos por el ordenador
+    Profundidades y parada de seguridad se sobrescriben; duración y
+    temperatura solo si el usuario no las había indicado
+    """
+    dive_log.max_depth = round(analysis.max_depth, 1)
+    dive_log.avg_depth = round(analysis.avg_depth, 1)
+    dive_log.safety_stop = analysis.safety_stop
+    dive_log.safety_stop_time = analysis.safety_stop_minutes
+    if dive_log.dive_duration is None:
+        dive_log.dive_duration = round(analysis.duration_seconds / 60)
+    if dive_log.water_temperature is None and series.temperatures is not None:
+        dive_log.water_temperature = round(float(series.temperatures.min()), 1)
+
+def downsample(series: ProfileSeries, points: int = DEFAULT_CHART_POINTS) -> dict:
+    """
+    Serie reducida a `points` tramos para gráficas, en columnas
+    Cada tramo conserva la profundidad máxima y mínima (no se pierden picos)
+    """
+    count = series.depths.size
+    edges = np.unique(np.linspace(0, count, min(points, count) + 1).astype(np.int64))
+    starts = edges[:-1]
+    chart = {
+        "time": np.round(series.times[starts], 1).tolist(),
+        "depth": np.round(np.maximum.reduceat(series.depths, starts), 2).tolist(),
+        "min_depth": np.round(np.minimum.reduceat(series.depths, starts), 2).tolist(),
+    }
+    if series.temperatures is not None:
+        means = np.add.reduceat(series.temperatures, starts) / np.diff(edges)
+        chart["temperature"] = np.round(means, 1).tolist()
+    return chart
+
+async def save_profile(db: AsyncSession, dive_log: DiveLog, upload: DiveProfileUpload) -> ProfileAnalysis:
+    """Crear o sustituir el perfil de un dive y actualizar el dive log (sin commit)"""
+    series = build_series(upload)
+    analysis = analyze(series)
+    values = pack(series, analysis)
+    profile = await db.get(DiveProfile, dive_log.id)
+    if profile is None:
+        db.add(DiveProfile(dive_log_id=dive_log.id, **values))
+    else:
+        for field, value in values.items():
+            setattr(profile, field, value)
+    apply_analysis(dive_log, series, analysis)
+    return analysis
+
+async def get_profile(db: AsyncSession, user_id: int, dive_id: int) -> Optional[DiveProfile]:
+    result = await db.execute(
+        select(DiveProfile)
+        .join(DiveLog, DiveLog.id == DiveProfile.dive_log_id)
+        .where(DiveProfile.dive_log_id == dive_id, DiveLog.user_id == user_id)
+    )
+    return result.scalars().first()
+
+async def reanalyze_profiles(db: AsyncSession, batch_size: int = 500) -> int:
+    """
+    Recalcular el análisis de todos los perfiles guardados y rellenar
+    de nuevo safety_stop/safety_stop_time (p. ej. tras cambiar umbrales)
+    Las profundidades del dive log no se tocan: no cambian las estadísticas
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        result = await db.execute(
+            select(DiveProfile, DiveLog)
+            .join(DiveLog, DiveLog.id == DiveProfile.dive_log_id)
+            .where(DiveProfile.dive_log_id > last_id)
+            .order_by(DiveProfile.dive_log_id)
+            .limit(batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            break
+        for profile, dive_log in rows:
+            analysis = analyze(unpack(profile))
+            profile.max_ascent_rate = analysis.max_ascent_rate
+            profile.ascent_violations = analysis.ascent_violations
+            profile.safety_stop_seconds = analysis.safety_stop_seconds
+            dive_log.safety_stop = analysis.safety_stop
+            dive_log.safety_stop_time = analysis.safety_stop_minutes
+        await db.commit()
+        updated += len(rows)
+        last_id = rows[-1][0].dive_log_id
+        db.expunge_all()
+    return updated
+
+async def _main(argv: List[str]) -> int:
+    from app.core.database import AsyncSessionLocal
+
+    if argv != ["reanalyze"]:
+        print("Uso: python -m app.services.profiles reanalyze")
+        return 2
+    async with AsyncSessionLocal() as db:
+        updated = await reanalyze_profiles(db)
+    print(f"✅ {updated} perfiles analizados")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
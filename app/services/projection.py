@@ -0,0 +1,24 @@
+from functools import lru_cache
+from typing import Iterable, List, Tuple, Type
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.sql import Select
+
+@lru_cache(maxsize=None)
+def schema_fields(schema: Type[BaseModel]) -> Tuple[str, ...]:
+    """Campos de un schema de respuesta, en orden de declaración"""
+    return tuple(schema.model_fields)
+
+def project(model, schema: Type[BaseModel]) -> Select:
+    """
+    SELECT solo de las columnas que necesita el schema de respuesta
+    Las filas salen como tuplas: sin identity map ni instancias ORM
+    """
+    return select(*(getattr(model, field) for field in schema_fields(schema)))
+
+def serialize_rows(rows: Iterable[tuple], fields: Tuple[str, ...]) -> List[dict]:
+    """
+    Filas (tuplas) -> dicts sin pasar por Pydantic
+    Los datetimes se dejan tal cual: la clase de respuesta los codifica
+    """
+    return [dict(zip(fields, row)) for row in rows]
@@ -0,0 +1,224 @@
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import date, datetime, time
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, desc, func, literal_column, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.dive_log import SEARCH_CONFIG, SEARCH_VECTOR_SQL, DiveLog
+from app.schemas.dive_log import DiveLogSummary
+from app.services.dive_sites import site_catalog
+from app.services.projection import schema_fields
+from app.services.user_stats import get_dive_log_version
+
+# Términos por consulta (cada uno es un AND más con expansión por prefijo)
+MAX_SEARCH_TERMS = 8
+
+# Candidatos de la primera consulta con filtros (el tramo crece x4 si no llega)
+SEARCH_FETCH_CHUNK = 500
+
+# Pesos por campo, los mismos que usa ts_rank por defecto para A/B/C
+FIELD_WEIGHTS = {
+    "dive_site_name": 1.0,
+    "country": 1.0,
+    "region": 1.0,
+    "marine_life": 0.4,
+    "notes": 0.2,
+}
+
+_WORD = re.compile(r"\w+")
+
+search_vector = literal_column(f"({SEARCH_VECTOR_SQL})")
+_config = literal_column(f"'{SEARCH_CONFIG}'::regconfig")
+
+def search_terms(query: str) -> List[str]:
+    """Palabras de la consulta en minúsculas, sin repetir y acotadas"""
+    terms = []
+    for term in _WORD.findall(query.lower()):
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_SEARCH_TERMS]
+
+def tsquery_text(terms: List[str]) -> str:
+    """'coral:* & shark:*': todos los términos, cada uno como prefijo"""
+    return " & ".join(f"{term}:*" for term in terms)
+
+class InvertedIndex:
+    """
+    Índice invertido en memoria de los dives de un usuario (fallback SQLite)
+    término -> {dive_id: puntuación}; los términos ordenados permiten
+    expandir prefijos con bisect. Guarda la fecha de cada dive para ordenar
+    los empates sin ir a la base de datos
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.terms: List[str] = []
+        self.dates: Dict[int, float] = {}
+        self.size = 0  # entradas (término, dive): la medida de su memoria
+
+    @classmethod
+    def build(cls, rows) -> "InvertedIndex":
+        index = cls()
+        for row in rows:
+            index.dates[row.id] = row.dive_date.timestamp()
+            for field, weight in FIELD_WEIGHTS.items():
+                value = getattr(row, field)
+                if not value:
+                    continue
+                for term in _WORD.findall(value.lower()):
+                    postings = index.postings[term]
+                    postings[row.id] = postings.get(row.id, 0.0) + weight
+        index.terms = sorted(index.postings)
+        index.size = sum(len(postings) for postings in index.postings.values())
+        return index
+
+    def ranked(self, scores: Dict[int, float], limit: Optional[int] = None) -> List[int]:
+        """IDs por puntuación, fecha e id descendentes (el orden de Postgres)"""
+        dates = self.dates
+        keys = [(-score, -dates[dive_id], -dive_id) for dive_id, score in scores.items()]
+        if limit is not None and limit < len(keys):
+            keys = heapq.nsmallest(limit, keys)
+        else:
+            keys.sort()
+        return [-key[2] for key in keys]
+
+    def _expand(self, prefix: str) -> List[str]:
+        start = bisect_left(self.terms, prefix)
+        expanded = []
+        for term in self.terms[start:]:
+            if not term.startswith(prefix):
+                break
+            expanded.append(term)
+        return expanded
+
+    def search(self, terms: List[str]) -> Dict[int, float]:
+        """dive_id -> puntuación de los dives que contienen todos los términos"""
+        scores: Optional[Dict[int, float]] = None
+        for prefix in terms:
+            matches: Dict[int, float] = {}
+            for term in self._expand(prefix):
+                for dive_id, score in self.postings[term].items():
+                    matches[dive_id] = max(matches.get(dive_id, 0.0), score)
+            if scores is None:
+                scores = matches
+            else:
+                scores = {dive_id: scores[dive_id] + score for dive_id, score in matches.items() if dive_id in scores}
+            if not scores:
+                return {}
+        return scores or {}
+
+# user_id -> (versión de los dive logs, índice), acotado por número de
+# usuarios y por entradas totales (SEARCH_INDEX_CACHE_MAX_POSTINGS)
+_indexes = TTLCache(
+    maxsize=settings.SEARCH_INDEX_CACHE_SIZE,
+    ttl=settings.SEARCH_INDEX_CACHE_TTL_SECONDS,
+    maxweight=settings.SEARCH_INDEX_CACHE_MAX_POSTINGS,
+)
+
+async def _user_index(db: AsyncSession, user_id: int) -> InvertedIndex:
+    version = await get_dive_log_version(db, user_id)
+    key = (version.version, version.updated_at) if version is not None else None
+    cached = _indexes.get(user_id)
+    if cached is not None and key is not None and cached[0] == key:
+        return cached[1]
+    result = await db.execute(
+        select(DiveLog.id, DiveLog.dive_date, *(getattr(DiveLog, field) for field in FIELD_WEIGHTS))
+        .where(DiveLog.user_id == user_id)
+    )
+    index = InvertedIndex.build(result.all())
+    if key is not None:
+        # Un índice mayor que todo el presupuesto no se guarda: se reconstruye
+        _indexes.set(user_id, (key, index), weight=index.size)
+    return index
+
+async def _filters(
+    db: AsyncSession,
+    user_id: int,
+    min_depth: Optional[float],
+    max_depth: Optional[float],
+    date_from: Optional[date],
+    date_to: Optional[date],
+    country: Optional[str]
+) -> Optional[list]:
+    """Condiciones SQL de los filtros; None si ningún dive puede cumplirlos"""
+    conditions = [DiveLog.user_id == user_id]
+    if min_depth is not None:
+        conditions.append(DiveLog.max_depth >= min_depth)
+    if max_depth is not None:
+        conditions.append(DiveLog.max_depth <= max_depth)
+    if date_from is not None:
+        conditions.append(DiveLog.dive_date >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        conditions.append(DiveLog.dive_date <= datetime.combine(date_to, time.max))
+    if country:
+        country_id = await site_catalog.find_country_id(db, country)
+        if country_id is None:
+            return None
+        conditions.append(DiveLog.country_id == country_id)
+    return conditions
+
+async def search_dive_logs(
+    db: AsyncSession,
+    user_id: int,
+    query: str,
+    limit: int = 20,
+    offset: int = 0,
+    min_depth: Optional[float] = None,
+    max_depth: Optional[float] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    country: Optional[str] = None
+) -> List[dict]:
+    """
+    Búsqueda full-text en los dives del usuario, ordenada por relevancia
+    Postgres: tsvector + índice GIN; SQLite: índice invertido en memoria
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+    conditions = await _filters(db, user_id, min_depth, max_depth, date_from, date_to, country)
+    if conditions is None:
+        return []
+    fields = schema_fields(DiveLogSummary)
+    columns = [getattr(DiveLog, name) for name in fields]
+
+    if db.get_bind().dialect.name == "postgresql":
+        tsquery = func.to_tsquery(_config, tsquery_text(terms))
+        rank = func.ts_rank(search_vector, tsquery).label("rank")
+        result = await db.execute(
+            select(*columns, rank)
+            .where(*conditions, search_vector.op("@@")(tsquery))
+            .order_by(desc(rank), desc(DiveLog.dive_date), desc(DiveLog.id))
+            .offset(offset)
+            .limit(limit)
+        )
+        return [dict(zip(fields, row[:-1]), rank=round(float(row[-1]), 4)) for row in result]
+
+    index = await _user_index(db, user_id)
+    scores = index.search(terms)
+    if not scores:
+        return []
+    # Por orden de relevancia, en tramos acotados: IN(...) nunca lleva todos
+    # los aciertos y los filtros se aplican en SQL solo a los candidatos
+    wanted = offset + limit
+    # Sin filtros todos los candidatos del índice (versionado) son del usuario
+    chunk = wanted if len(conditions) == 1 else max(wanted, SEARCH_FETCH_CHUNK)
+    ranked = index.ranked(scores, chunk)
+    query = select(*columns).where(*conditions, DiveLog.id.in_(bindparam("ids", expanding=True)))
+    rows = []
+    start = 0
+    while start < len(scores) and len(rows) < wanted:
+        if len(ranked) < min(start + chunk, len(scores)):
+            # Los filtros descartaron el primer tramo: orden completo
+            ranked = index.ranked(scores)
+        ids = ranked[start:start + chunk]
+        result = await db.execute(query, {"ids": ids})
+        by_id = {row.id: row for row in result}
+        rows.extend(by_id[dive_id] for dive_id in ids if dive_id in by_id)
+        start += chunk
+        chunk *= 4
+    return [dict(zip(fields, row), rank=round(scores[row.id], 4)) for row in rows[offset:wanted]]
@@ -0,0 +1,303 @@
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, desc, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import on_commit, transaction_info
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country, DiveSite
+from app.models.species import DiveSighting, Species, SpeciesSiteMonthStats
+from app.services.dive_sites import normalize_name
+
+# Especies distintas que se guardan por dive (el resto del texto se ignora)
+MAX_SPECIES_PER_DIVE = 50
+
+# Filas por UPSERT multi-fila (límite de parámetros de asyncpg/SQLite)
+UPSERT_CHUNK = 1000
+
+_SEPARATORS = re.compile(r"[,;|\n]+")
+
+sightings_table = DiveSighting.__table__
+month_stats_table = SpeciesSiteMonthStats.__table__
+
+def parse_species(marine_life: Optional[str]) -> List[str]:
+    """
+    Nombres de especie de dive_logs.marine_life
+    Acepta un array JSON (de textos u objetos con "name"/"species") o texto
+    separado por comas, punto y coma o líneas; sin duplicados normalizados
+    """
+    if not marine_life or not marine_life.strip():
+        return []
+    text = marine_life.strip()
+    names = None
+    if text.startswith("["):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if isinstance(items, list):
+            names = []
+            for item in items:
+                if isinstance(item, dict):
+                    item = item.get("name") or item.get("species")
+                if isinstance(item, str):
+                    names.append(item)
+    if names is None:
+        names = _SEPARATORS.split(text)
+
+    species = {}
+    for name in names:
+        name = name.strip()
+        normalized = normalize_name(name)
+        if normalized and normalized not in species:
+            species[normalized] = name
+    return list(species.values())[:MAX_SPECIES_PER_DIVE]
+
+def _insert_for(bind):
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+class SpeciesCatalog:
+    """
+    Diccionario de especies internado en memoria: nombre normalizado -> id
+    Como el catálogo de sitios, las especies nuevas se crean en la sesión del
+    llamador (un INSERT ... ON CONFLICT DO NOTHING RETURNING y un SELECT de
+    las que ya existían) y pasan a la caché compartida solo tras el commit
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+
+    def clear(self):
+        self._ids.clear()
+
+    def stats(self) -> dict:
+        return {"species": len(self._ids)}
+
+    def _pending(self, db: AsyncSession) -> Dict[str, int]:
+        """Especies creadas por la transacción actual, aún sin confirmar"""
+        info = transaction_info(db)
+        pending = info.get("species_catalog")
+        if pending is None:
+            pending = info["species_catalog"] = {}
+            on_commit(db, lambda: self._ids.update(pending))
+        return pending
+
+    async def resolve(self, db: AsyncSession, marine_life: Optional[str]) -> List[int]:
+        """IDs de las especies de un texto marine_life, en orden de aparición"""
+        names = {normalize_name(name): name for name in parse_species(marine_life)}
+        missing = [normalized for normalized in names if normalized not in self._ids]
+        if not missing:
+            return [self._ids[normalized] for normalized in names]
+        pending = self._pending(db)
+        missing = [normalized for normalized in missing if normalized not in pending]
+        if missing:
+            # RETURNING solo trae las que se crean; las que otra transacción
+            # creó antes (conflicto, sin error ni SAVEPOINT) se buscan después
+            insert = _insert_for(db.get_bind())
+            rows = await db.execute(
+                insert(Species.__table__)
+                .values([{"name": names[normalized], "normalized_name": normalized} for normalized in missing])
+                .on_conflict_do_nothing(index_elements=["normalized_name"])
+                .returning(Species.__table__.c.id, Species.__table__.c.normalized_name)
+            )
+            pending.update({normalized: species_id for species_id, normalized in rows})
+            existing = [normalized for normalized in missing if normalized not in pending]
+            if existing:
+                rows = await db.execute(
+                    select(Species.id, Species.normalized_name).where(Species.normalized_name.in_(existing))
+                )
+                pending.update({normalized: species_id for species_id, normalized in rows})
+        return [self._ids.get(normalized) or pending[normalized] for normalized in names]
+
+species_catalog = SpeciesCatalog()
+
+def sighting_snapshot(dive_log, species_ids: Iterable[int]) -> dict:
+    """Valores de un dive que afectan a los avistamientos (instancia o fila)"""
+    get = dive_log.get if isinstance(dive_log, dict) else lambda field: getattr(dive_log, field)
+    dive_date = get("dive_date")
+    return {
+        "species_ids": tuple(species_ids),
+        "site_id": get("site_id"),
+        "month": dive_date.month if dive_date is not None else None,
+    }
+
+async def load_sighting_snapshot(db: AsyncSession, dive_log: DiveLog) -> dict:
+    """Snapshot actual de un dive ya guardado (especies desde dive_sightings)"""
+    result = await db.execute(
+        select(DiveSighting.species_id).where(DiveSighting.dive_log_id == dive_log.id)
+    )
+    return sighting_snapshot(dive_log, result.scalars())
+
+def _month_counts(snapshot: Optional[dict], sign: int) -> Counter:
+    counts = Counter()
+    if snapshot is None or snapshot["site_id"] is None or snapshot["month"] is None:
+        return counts
+    for species_id in snapshot["species_ids"]:
+        counts[(species_id, snapshot["site_id"], snapshot["month"])] += sign
+    return counts
+
+async def _apply_month_counts(db: AsyncSession, counts: Counter):
+    """
+    Sumar los deltas con UPSERTs multi-fila, también los negativos: la fila
+    ya existe y el conflicto la actualiza, sin un UPDATE por especie
+    """
+    deltas = [
+        {"species_id": species_id, "site_id": site_id, "month": month, "sighting_count": delta}
+        for (species_id, site_id, month), delta in counts.items()
+    ]
+    insert = _insert_for(db.get_bind())
+    for start in range(0, len(deltas), UPSERT_CHUNK):
+        stmt = insert(month_stats_table).values(deltas[start:start + UPSERT_CHUNK])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[month_stats_table.c.species_id, month_stats_table.c.site_id, month_stats_table.c.month],
+            set_={"sighting_count": month_stats_table.c.sighting_count + stmt.excluded.sighting_count},
+        ))
+    decremented = {species_id for (species_id, _, _), delta in counts.items() if delta < 0}
+    if decremented:
+        await db.execute(
+            delete(month_stats_table).where(
+                month_stats_table.c.species_id.in_(decremented), month_stats_table.c.sighting_count <= 0
+            )
+        )
+
+async def apply_sighting_delta(db: AsyncSession, dive_log_id: int, old: Optional[dict], new: Optional[dict]):
+    """
+    Sincronizar dive_sightings y los agregados por sitio/mes con el cambio de un dive
+    old=None: creado, new=None: borrado. En la transacción del llamador.
+    """
+    old_species = set(old["species_ids"]) if old else set()
+    new_species = set(new["species_ids"]) if new else set()
+    removed, added = old_species - new_species, new_species - old_species
+    if removed:
+        await db.execute(
+            delete(sightings_table).where(
+                sightings_table.c.dive_log_id == dive_log_id, sightings_table.c.species_id.in_(removed)
+            )
+        )
+    if added:
+        await db.execute(
+            sightings_table.insert(),
+            [{"dive_log_id": dive_log_id, "species_id": species_id} for species_id in added],
+        )
+    counts = _month_counts(old, -1)
+    counts.update(_month_counts(new, 1))
+    await _apply_month_counts(db, Counter({key: delta for key, delta in counts.items() if delta}))
+
+async def add_sightings_bulk(
+    db: AsyncSession,
+    user_id: int,
+    first: int,
+    last: int,
+    rows: List[dict],
+    species: List[List[int]]
+):
+    """
+    Avistamientos de un lote recién insertado por add_dive_logs_bulk
+    Los IDs se recuperan por el rango de dive_number (una sola consulta)
+    """
+    if not any(species):
+        return
+    result = await db.execute(
+        select(DiveLog.dive_number, DiveLog.id)
+        .where(DiveLog.user_id == user_id, DiveLog.dive_number.between(first, last))
+    )
+    ids = dict(result.all())
+    values = []
+    counts = Counter()
+    for row, species_ids in zip(rows, species):
+        dive_log_id = ids[row["dive_number"]]
+        values.extend({"dive_log_id": dive_log_id, "species_id": species_id} for species_id in species_ids)
+        counts.update(_month_counts(sighting_snapshot(row, species_ids), 1))
+    if values:
+        await db.execute(sightings_table.insert(), values)
+    await _apply_month_counts(db, counts)
+
+async def rebuild_sighting_stats(db: AsyncSession):
+    """Recalcular species_site_month_stats desde dive_sightings (INSERT ... SELECT)"""
+    month = extract("month", DiveLog.dive_date)
+    await db.execute(delete(month_stats_table))
+    await db.execute(
+        month_stats_table.insert().from_select(
+            ["species_id", "site_id", "month", "sighting_count"],
+            select(DiveSighting.species_id, DiveLog.site_id, month, func.count())
+            .join(DiveLog, DiveLog.id == DiveSighting.dive_log_id)
+            .where(DiveLog.site_id.isnot(None))
+            .group_by(DiveSighting.species_id, DiveLog.site_id, month),
+        )
+    )
+    await db.commit()
+
+MONTHS = tuple(range(1, 13))
+
+def _heatmap_rows(result, key_fields) -> List[dict]:
+    """Filas (clave..., mes, avistamientos) -> una fila por clave con 12 contadores"""
+    rows: Dict[tuple, dict] = {}
+    for row in result:
+        key = tuple(getattr(row, field) for field in key_fields)
+        entry = rows.get(key)
+        if entry is None:
+            entry = rows[key] = dict(zip(key_fields, key), counts=[0] * 12, total=0)
+        entry["counts"][row.month - 1] += row.sightings
+        entry["total"] += row.sightings
+    return sorted(rows.values(), key=lambda entry: -entry["total"])
+
+async def find_species(db: AsyncSession, prefix: Optional[str] = None, limit: int = 20) -> List[dict]:
+    """Especies con su total de avistamientos (solo agregados), filtradas por prefijo"""
+    sightings = func.sum(SpeciesSiteMonthStats.sighting_count).label("sightings")
+    totals = (
+        select(SpeciesSiteMonthStats.species_id, sightings)
+        .group_by(SpeciesSiteMonthStats.species_id)
+        .subquery()
+    )
+    query = (
+        select(Species.id, Species.name, func.coalesce(totals.c.sightings, 0).label("sightings"))
+        .outerjoin(totals, totals.c.species_id == Species.id)
+    )
+    normalized = normalize_name(prefix)
+    if normalized:
+        query = query.where(Species.normalized_name.startswith(normalized, autoescape=True))
+    result = await db.execute(query.order_by(desc("sightings"), Species.name).limit(limit))
+    return [{"species_id": row.id, "name": row.name, "sightings": int(row.sightings)} for row in result]
+
+async def get_species(db: AsyncSession, species_id: int) -> Optional[Species]:
+    return await db.get(Species, species_id)
+
+async def species_seasonality(db: AsyncSession, species_id: int, limit: int = 20) -> dict:
+    """
+    Dónde y cuándo se ha visto una especie: mapa de calor sitio x mes
+    (sitios con más avistamientos primero) y total por mes
+    """
+    result = await db.execute(
+        select(
+            DiveSite.id.label("site_id"),
+            DiveSite.name.label("name"),
+            Country.name.label("country"),
+            SpeciesSiteMonthStats.month,
+            SpeciesSiteMonthStats.sighting_count.label("sightings"),
+        )
+        .join(DiveSite, DiveSite.id == SpeciesSiteMonthStats.site_id)
+        .join(Country, Country.id == DiveSite.country_id)
+        .where(SpeciesSiteMonthStats.species_id == species_id)
+    )
+    sites = _heatmap_rows(result, ("site_id", "name", "country"))
+    by_month = [sum(site["counts"][index] for site in sites) for index in range(12)]
+    return {"months": list(MONTHS), "by_month": by_month, "total": sum(by_month), "sites": sites[:limit]}
+
+async def site_seasonality(db: AsyncSession, site_id: int, limit: int = 50) -> dict:
+    """Mapa de calor especie x mes de un sitio del catálogo"""
+    result = await db.execute(
+        select(
+            Species.id.label("species_id"),
+            Species.name.label("name"),
+            SpeciesSiteMonthStats.month,
+            SpeciesSiteMonthStats.sighting_count.label("sightings"),
+        )
+        .join(Species, Species.id == SpeciesSiteMonthStats.species_id)
+        .where(SpeciesSiteMonthStats.site_id == site_id)
+    )
+    return {"months": list(MONTHS), "species": _heatmap_rows(result, ("species_id", "name"))[:limit]}
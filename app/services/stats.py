@@ -0,0 +1,196 @@
+from typing import Awaitable, Callable, Dict, Iterable, Optional
+from sqlalchemy import case, desc, extract, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country, DiveSite
+from app.services.dive_sites import UNKNOWN_COUNTRY
+from app.services.gas import get_gas_analytics
+
+# Secciones opcionales de estadísticas: nombre -> función async (db, user_id)
+StatsSection = Callable[[AsyncSession, int], Awaitable[object]]
+STATS_SECTIONS: Dict[str, StatsSection] = {}
+
+# Rangos de profundidad máxima (límite superior exclusivo, etiqueta)
+DEPTH_BUCKETS = [
+    (10, "0-10m"),
+    (18, "10-18m"),
+    (30, "18-30m"),
+    (40, "30-40m"),
+]
+DEPTH_BUCKET_OVERFLOW = "40m+"
+
+FAVORITE_LOCATIONS_LIMIT = 5
+
+def stats_section(name: str):
+    """Registrar una sección opcional para /stats/summary?include=<name>"""
+    def decorator(fn: StatsSection) -> StatsSection:
+        STATS_SECTIONS[name] = fn
+        return fn
+    return decorator
+
+async def get_summary_totals(db: AsyncSession, user_id: int) -> dict:
+    """Totales del usuario en una sola consulta agregada"""
+    result = await db.execute(
+        select(
+            func.count(DiveLog.id),
+            func.max(DiveLog.max_depth),
+            func.coalesce(func.sum(DiveLog.dive_duration), 0),
+            # AVG ignora NULLs y devuelve NULL si no hay valores (sin división por cero)
+            func.avg(DiveLog.avg_depth),
+        ).where(DiveLog.user_id == user_id)
+    )
+    total_dives, max_depth, total_time, avg_depth = result.one()
+    return {
+        "total_dives": total_dives,
+        "max_depth": max_depth or 0,
+        "total_time_minutes": int(total_time),
+        "average_depth": round(float(avg_depth), 1) if avg_depth is not None else 0,
+    }
+
+async def get_favorite_locations(db: AsyncSession, user_id: int, limit: int = FAVORITE_LOCATIONS_LIMIT) -> list:
+    """Países más buceados: GROUP BY sobre country_id y nombre del catálogo"""
+    dives = func.count(DiveLog.id).label("dives")
+    counts = (
+        select(DiveLog.country_id, dives)
+        .where(DiveLog.user_id == user_id)
+        .group_by(DiveLog.country_id)
+        .subquery()
+    )
+    country = func.coalesce(Country.name, UNKNOWN_COUNTRY).label("country")
+    result = await db.execute(
+        select(country, counts.c.dives)
+        .select_from(counts)
+        .outerjoin(Country, Country.id == counts.c.country_id)
+        .order_by(desc(counts.c.dives), country)
+        .limit(limit)
+    )
+    return [{"country": row.country, "dives": row.dives} for row in result]
+
+async def get_site_stats(db: AsyncSession, site_id: int) -> Optional[dict]:
+    """Agregados de un sitio del catálogo entre todos los usuarios"""
+    result = await db.execute(
+        select(DiveSite.id, DiveSite.name, DiveSite.region, Country.name.label("country"))
+        .join(Country, Country.id == DiveSite.country_id)
+        .where(DiveSite.id == site_id)
+    )
+    site = result.first()
+    if site is None:
+        return None
+    result = await db.execute(
+        select(
+            func.count(DiveLog.id),
+            func.count(func.distinct(DiveLog.user_id)),
+            func.avg(DiveLog.max_depth),
+            func.max(DiveLog.max_depth),
+            func.avg(DiveLog.water_temperature),
+            func.avg(DiveLog.visibility),
+            func.avg(DiveLog.rating),
+        ).where(DiveLog.site_id == site_id)
+    )
+    dives, divers, avg_max_depth, max_depth, avg_temp, avg_visibility, avg_rating = result.one()
+
+    def rounded(value):
+        return round(float(value), 1) if value is not None else None
+
+    return {
+        "site_id": site.id,
+        "name": site.name,
+        "country": site.country,
+        "region": site.region,
+        "dives": dives,
+        "divers": divers,
+        "average_max_depth": rounded(avg_max_depth),
+        "max_depth": max_depth,
+        "average_water_temperature": rounded(avg_temp),
+        "average_visibility": rounded(avg_visibility),
+        "average_rating": rounded(avg_rating),
+    }
+
+@stats_section("years")
+async def get_yearly_totals(db: AsyncSession, user_id: int) -> list:
+    """Inmersiones, minutos y profundidad máxima por año"""
+    year = extract("year", DiveLog.dive_date).label("year")
+    result = await db.execute(
+        select(
+            year,
+            func.count(DiveLog.id).label("dives"),
+            func.coalesce(func.sum(DiveLog.dive_duration), 0).label("total_time_minutes"),
+            func.max(DiveLog.max_depth).label("max_depth"),
+        )
+        .where(DiveLog.user_id == user_id)
+        .group_by(year)
+        .order_by(year)
+    )
+    return [
+        {
+            "year": int(row.year),
+            "dives": row.dives,
+            "total_time_minutes": int(row.total_time_minutes),
+            "max_depth": row.max_depth,
+        }
+        for row in result
+    ]
+
+@stats_section("depth_buckets")
+async def get_depth_buckets(db: AsyncSession, user_id: int) -> list:
+    """Histograma de profundidad máxima por rangos"""
+    bucket = case(
+        *[(DiveLog.max_depth < upper, label) for upper, label in DEPTH_BUCKETS],
+        else_=DEPTH_BUCKET_OVERFLOW,
+    ).label("bucket")
+    result = await db.execute(
+        select(bucket, func.count(DiveLog.id).label("dives"))
+        .where(DiveLog.user_id == user_id)
+        .group_by(bucket)
+    )
+    counts = {row.bucket: row.dives for row in result}
+    labels = [label for _, label in DEPTH_BUCKETS] + [DEPTH_BUCKET_OVERFLOW]
+    return [{"bucket": label, "dives": counts.get(label, 0)} for label in labels]
+
+@stats_section("gas_mix")
+async def get_gas_mix_breakdown(db: AsyncSession, user_id: int) -> list:
+    """Inmersiones por mezcla de gas"""
+    gas_mix = func.coalesce(DiveLog.gas_mix, "Air").label("gas_mix")
+    dives = func.count(DiveLog.id).label("dives")
+    result = await db.execute(
+        select(gas_mix, dives)
+        .where(DiveLog.user_id == user_id)
+        .group_by(gas_mix)
+        .order_by(desc(dives), gas_mix)
+    )
+    return [{"gas_mix": row.gas_mix, "dives": row.dives} for row in result]
+
+@stats_section("temperature")
+async def get_temperature_range(db: AsyncSession, user_id: int) -> dict:
+    """Rango de temperatura del agua"""
+    result = await db.execute(
+        select(
+            func.min(DiveLog.water_temperature),
+            func.max(DiveLog.water_temperature),
+            func.avg(DiveLog.water_temperature),
+            func.count(DiveLog.water_temperature),
+        ).where(DiveLog.user_id == user_id)
+    )
+    min_temp, max_temp, avg_temp, samples = result.one()
+    return {
+        "min": min_temp,
+        "max": max_temp,
+        "average": round(float(avg_temp), 1) if avg_temp is not None else None,
+        "dives_with_temperature": samples,
+    }
+
+@stats_section("gas")
+async def get_gas_consumption(db: AsyncSession, user_id: int) -> dict:
+    """SAC/RMV con percentiles por mezcla y traje (sin la serie por dive)"""
+    return await get_gas_analytics(db, user_id, series_points=None)
+
+async def compute_dive_stats(db: AsyncSession, user_id: int, include: Iterable[str] = ()) -> dict:
+    """
+    Estadísticas de buceo calculadas en SQL
+    `include` añade secciones registradas en STATS_SECTIONS
+    """
+    stats = await get_summary_totals(db, user_id)
+    stats["favorite_locations"] = await get_favorite_locations(db, user_id) if stats["total_dives"] else []
+    for name in include:
+        stats[name] = await STATS_SECTIONS[name](db, user_id)
+    return stats
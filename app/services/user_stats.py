@@ -0,0 +1,295 @@
+import asyncio
+import sys
+from collections import Counter
+from typing import Iterable, List, Optional
+from sqlalchemy import case, delete, desc, func, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country
+from app.models.user_stats import UserCountryStats, UserDiveStats
+
+# Columnas de DiveLog que afectan a las estadísticas materializadas
+# (country_id lo asigna el catálogo de sitios al escribir)
+STATS_FIELDS = ("max_depth", "dive_duration", "avg_depth", "country_id")
+
+stats_table = UserDiveStats.__table__
+country_table = UserCountryStats.__table__
+
+def dive_snapshot(dive_log: DiveLog) -> dict:
+    """Valores de un dive log relevantes para las estadísticas"""
+    return {field: getattr(dive_log, field) for field in STATS_FIELDS}
+
+def _insert_for(db: AsyncSession):
+    """INSERT con soporte ON CONFLICT según el dialecto de la sesión"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+def _greatest(current, candidate):
+    return case(
+        (current.is_(None), candidate),
+        (current < candidate, candidate),
+        else_=current,
+    )
+
+async def _add_country_counts(db: AsyncSession, user_id: int, counts: Counter):
+    insert = _insert_for(db)
+    for country_id, delta in counts.items():
+        if country_id is None:
+            # Dive sin país de catálogo (no debería quedar ninguno tras la migración 0007)
+            continue
+        if delta > 0:
+            stmt = insert(country_table).values(user_id=user_id, country_id=country_id, dive_count=delta)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[country_table.c.user_id, country_table.c.country_id],
+                set_={"dive_count": country_table.c.dive_count + stmt.excluded.dive_count},
+            )
+            await db.execute(stmt)
+        elif delta < 0:
+            await db.execute(
+                update(country_table)
+                .where(country_table.c.user_id == user_id, country_table.c.country_id == country_id)
+                .values(dive_count=country_table.c.dive_count + delta)
+            )
+    if any(delta < 0 for delta in counts.values()):
+        await db.execute(
+            delete(country_table).where(country_table.c.user_id == user_id, country_table.c.dive_count <= 0)
+        )
+
+async def add_dives_to_stats(db: AsyncSession, user_id: int, dives: List[dict]):
+    """
+    Sumar dives nuevos (snapshots o filas insertadas) a las estadísticas
+    Un solo UPSERT para los totales y uno por país
+    """
+    if not dives:
+        return
+    depths = [dive["avg_depth"] for dive in dives if dive.get("avg_depth") is not None]
+    max_depths = [dive["max_depth"] for dive in dives if dive.get("max_depth") is not None]
+    values = {
+        "user_id": user_id,
+        "dive_count": len(dives),
+        "total_minutes": sum(dive.get("dive_duration") or 0 for dive in dives),
+        "depth_sum": float(sum(depths)),
+        "depth_count": len(depths),
+        "max_depth": max(max_depths) if max_depths else None,
+        "version": 1,
+    }
+
+    insert = _insert_for(db)
+    stmt = insert(stats_table).values(**values)
+    set_ = {
+        column: stats_table.c[column] + stmt.excluded[column]
+        for column in ("dive_count", "total_minutes", "depth_sum", "depth_count")
+    }
+    if values["max_depth"] is not None:
+        set_["max_depth"] = _greatest(stats_table.c.max_depth, stmt.excluded.max_depth)
+    set_["version"] = stats_table.c.version + 1
+    set_["updated_at"] = func.now()
+    await db.execute(stmt.on_conflict_do_update(index_elements=[stats_table.c.user_id], set_=set_))
+
+    await _add_country_counts(db, user_id, Counter(dive.get("country_id") for dive in dives))
+
+async def apply_dive_delta(db: AsyncSession, user_id: int, old: Optional[dict], new: Optional[dict]):
+    """
+    Aplicar a las estadísticas el cambio de un dive log
+    old=None: creado, new=None: borrado, ambos: actualizado.
+    Se ejecuta en la transacción del llamador, después del cambio en dive_logs.
+    """
+    if old is None:
+        if new is not None:
+            await add_dives_to_stats(db, user_id, [new])
+        return
+
+    # El cambio en dive_logs debe estar en la base de datos antes de recalcular max_depth
+    await db.flush()
+
+    new_values = new or {}
+    values = {
+        "dive_count": stats_table.c.dive_count + (1 if new is not None else 0) - 1,
+        "total_minutes": stats_table.c.total_minutes
+            + (new_values.get("dive_duration") or 0) - (old.get("dive_duration") or 0),
+        "depth_sum": stats_table.c.depth_sum
+            + (new_values.get("avg_depth") or 0) - (old.get("avg_depth") or 0),
+        "depth_count": stats_table.c.depth_count
+            + (new_values.get("avg_depth") is not None) - (old.get("avg_depth") is not None),
+        "version": stats_table.c.version + 1,
+        "updated_at": func.now(),
+    }
+
+    old_max, new_max = old.get("max_depth"), new_values.get("max_depth")
+    if old_max is not None and (new_max is None or new_max < old_max):
+        # Puede haberse quitado el máximo: recalcular con el índice de usuario
+        values["max_depth"] = (
+            select(func.max(DiveLog.max_depth)).where(DiveLog.user_id == user_id).scalar_subquery()
+        )
+    elif new_max is not None:
+        values["max_depth"] = _greatest(stats_table.c.max_depth, literal(new_max))
+
+    await db.execute(update(stats_table).where(stats_table.c.user_id == user_id).values(**values))
+
+    counts = Counter()
+    counts[old.get("country_id")] -= 1
+    if new is not None:
+        counts[new.get("country_id")] += 1
+    # Mismo país: no hay nada que mover
+    counts = Counter({country_id: delta for country_id, delta in counts.items() if delta})
+    await _add_country_counts(db, user_id, counts)
+
+async def get_dive_log_version(db: AsyncSession, user_id: int):
+    """
+    (version, updated_at) de los dive logs del usuario con una lectura por PK
+    None si el usuario no tiene fila de estadísticas
+    """
+    result = await db.execute(
+        select(UserDiveStats.version, UserDiveStats.updated_at).where(UserDiveStats.user_id == user_id)
+    )
+    return result.first()
+
+async def read_dive_stats(db: AsyncSession, user_id: int, favorite_limit: int = 5) -> Optional[dict]:
+    """
+    Lectura O(1) de las estadísticas materializadas
+    Devuelve None si el usuario aún no tiene fila (sin dives o sin reconstruir)
+    """
+    stats = await db.get(UserDiveStats, user_id)
+    if stats is None:
+        return None
+    result = await db.execute(
+        select(Country.name.label("country"), UserCountryStats.dive_count)
+        .join(Country, Country.id == UserCountryStats.country_id)
+        .where(UserCountryStats.user_id == user_id, UserCountryStats.dive_count > 0)
+        .order_by(desc(UserCountryStats.dive_count), Country.name)
+        .limit(favorite_limit)
+    )
+    return {
+        "total_dives": stats.dive_count,
+        "max_depth": stats.max_depth or 0,
+        "total_time_minutes": stats.total_minutes,
+        "average_depth": round(stats.depth_sum / stats.depth_count, 1) if stats.depth_count else 0,
+        "favorite_locations": [{"country": row.country, "dives": row.dive_count} for row in result],
+    }
+
+def _aggregate_query(user_ids: Optional[Iterable[int]] = None):
+    query = select(
+        DiveLog.user_id,
+        func.count(DiveLog.id).label("dive_count"),
+        func.coalesce(func.sum(DiveLog.dive_duration), 0).label("total_minutes"),
+        func.coalesce(func.sum(DiveLog.avg_depth), 0).label("depth_sum"),
+        func.count(DiveLog.avg_depth).label("depth_count"),
+        func.max(DiveLog.max_depth).label("max_depth"),
+    ).group_by(DiveLog.user_id)
+    if user_ids is not None:
+        query = query.where(DiveLog.user_id.in_(list(user_ids)))
+    return query
+
+def _country_query(user_ids: Optional[Iterable[int]] = None):
+    query = select(
+        DiveLog.user_id,
+        DiveLog.country_id,
+        func.count(DiveLog.id).label("dive_count"),
+    ).where(DiveLog.country_id.isnot(None)).group_by(DiveLog.user_id, DiveLog.country_id)
+    if user_ids is not None:
+        query = query.where(DiveLog.user_id.in_(list(user_ids)))
+    return query
+
+async def rebuild_user_stats(db: AsyncSession, user_ids: Optional[Iterable[int]] = None):
+    """
+    Recalcular las estadísticas materializadas desde dive_logs
+    (todos los usuarios o solo `user_ids`) con INSERT ... SELECT
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    for table in (stats_table, country_table):
+        stmt = delete(table)
+        if user_ids is not None:
+            stmt = stmt.where(table.c.user_id.in_(user_ids))
+        await db.execute(stmt)
+
+    aggregate = _aggregate_query(user_ids).subquery()
+    await db.execute(
+        stats_table.insert().from_select(
+            ["user_id", "dive_count", "total_minutes", "depth_sum", "depth_count", "max_depth"],
+            select(
+                aggregate.c.user_id, aggregate.c.dive_count, aggregate.c.total_minutes,
+                aggregate.c.depth_sum, aggregate.c.depth_count, aggregate.c.max_depth,
+            ),
+        )
+    )
+    countries = _country_query(user_ids).subquery()
+    await db.execute(
+        country_table.insert().from_select(
+            ["user_id", "country_id", "dive_count"],
+            select(countries.c.user_id, countries.c.country_id, countries.c.dive_count),
+        )
+    )
+    await db.commit()
+
+async def check_user_stats(db: AsyncSession, user_ids: Optional[Iterable[int]] = None) -> List[dict]:
+    """
+    Comparar las estadísticas materializadas con las calculadas desde dive_logs
+    Devuelve la lista de diferencias (vacía si todo es consistente)
+    """
+    user_ids = list(user_ids) if user_ids is not None else None
+    mismatches = []
+
+    expected = {row.user_id: row for row in await db.execute(_aggregate_query(user_ids))}
+    stored_query = select(UserDiveStats)
+    if user_ids is not None:
+        stored_query = stored_query.where(UserDiveStats.user_id.in_(user_ids))
+    stored = {row.user_id: row for row in (await db.execute(stored_query)).scalars()}
+
+    for user_id in sorted(set(expected) | set(stored)):
+        exp, got = expected.get(user_id), stored.get(user_id)
+        for field in ("dive_count", "total_minutes", "depth_count", "depth_sum", "max_depth"):
+            exp_value = getattr(exp, field) if exp is not None else 0
+            got_value = getattr(got, field) if got is not None else 0
+            if field in ("depth_sum", "max_depth"):
+                equal = abs((exp_value or 0) - (got_value or 0)) < 1e-6
+            else:
+                equal = (exp_value or 0) == (got_value or 0)
+            if not equal:
+                mismatches.append({"user_id": user_id, "field": field, "expected": exp_value, "stored": got_value})
+
+    expected_countries = {
+        (row.user_id, row.country_id): row.dive_count for row in await db.execute(_country_query(user_ids))
+    }
+    stored_country_query = select(UserCountryStats).where(UserCountryStats.dive_count > 0)
+    if user_ids is not None:
+        stored_country_query = stored_country_query.where(UserCountryStats.user_id.in_(user_ids))
+    stored_countries = {
+        (row.user_id, row.country_id): row.dive_count
+        for row in (await db.execute(stored_country_query)).scalars()
+    }
+    for key in sorted(set(expected_countries) | set(stored_countries)):
+        if expected_countries.get(key, 0) != stored_countries.get(key, 0):
+            mismatches.append({
+                "user_id": key[0],
+                "field": f"country:{key[1]}",
+                "expected": expected_countries.get(key, 0),
+                "stored": stored_countries.get(key, 0),
+            })
+    return mismatches
+
+async def _main(argv: List[str]) -> int:
+    from app.core.database import AsyncSessionLocal
+
+    if not argv or argv[0] not in ("rebuild", "check"):
+        print("Uso: python -m app.services.user_stats {rebuild|check} [user_id ...]")
+        return 2
+    command, user_ids = argv[0], [int(arg) for arg in argv[1:]] or None
+
+    async with AsyncSessionLocal() as db:
+        if command == "rebuild":
+            await rebuild_user_stats(db, user_ids)
+            print("✅ Estadísticas reconstruidas")
+            return 0
+        mismatches = await check_user_stats(db, user_ids)
+        for mismatch in mismatches:
+            print(f"❌ user={mismatch['user_id']} {mismatch['field']}: "
+                  f"esperado={mismatch['expected']} guardado={mismatch['stored']}")
+        if not mismatches:
+            print("✅ Estadísticas consistentes")
+        return 1 if mismatches else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
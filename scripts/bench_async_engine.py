@@ -0,0 +1,142 @@
+"""
+Throughput con sesión síncrona vs AsyncSession bajo carga concurrente
+
+Monta una app FastAPI mínima con el mismo listado (primera página de
+DiveLogSummary) servido de dos formas: handler async con la Session
+síncrona de antes (bloquea el event loop en cada consulta) y con
+AsyncSession. Lanza N clientes concurrentes sobre cada una y mide
+requests/s y latencias.
+
+--latency-ms añade a cada consulta una espera en el lado del driver (una
+función SQL db_sleep), como el round trip de red hasta Postgres: con la
+Session síncrona esa espera bloquea todas las requests; con aiosqlite o
+asyncpg se solapa.
+
+    python scripts/bench_async_engine.py --dives 5000 --concurrency 50 --requests 1000
+    python scripts/bench_async_engine.py --latency-ms 0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from fastapi import Depends, FastAPI  # noqa: E402
+from sqlalchemy import create_engine, event, func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import AsyncAdaptedQueuePool  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.schemas.dive_log import DiveLogSummary  # noqa: E402
+from app.services.projection import project, schema_fields, serialize_rows  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+PAGE_SIZE = 50
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def _sleep_function(dbapi_connection, connection_record):
+    dbapi_connection.create_function("db_sleep", 1, lambda ms: time.sleep(ms / 1000) or 1)
+
+def build_app(async_engine, user_id: int, latency_ms: float, pool_size: int) -> FastAPI:
+    # Si el pool síncrono se agota, la espera de checkout bloquea el event
+    # loop y las sesiones abiertas nunca se liberan
+    sync_engine = create_engine(str(async_engine.url).replace("+aiosqlite", ""), pool_size=pool_size)
+    event.listen(sync_engine, "connect", _sleep_function)
+    SyncSession = sessionmaker(bind=sync_engine)
+    AsyncSessionBench = async_sessionmaker(async_engine, expire_on_commit=False)
+    fields = schema_fields(DiveLogSummary)
+    query = project(DiveLog, DiveLogSummary).where(DiveLog.user_id == user_id).order_by(
+        DiveLog.dive_date.desc(), DiveLog.id.desc()
+    ).limit(PAGE_SIZE)
+    # Un round trip más por request; sin latencia simulada no se ejecuta
+    round_trip = select(func.db_sleep(latency_ms)) if latency_ms else None
+
+    def get_sync_db():
+        db = SyncSession()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    async def get_async_db():
+        async with AsyncSessionBench() as db:
+            yield db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def list_sync(db: Session = Depends(get_sync_db)):
+        if round_trip is not None:
+            db.execute(round_trip)
+        return serialize_rows(db.execute(query).all(), fields)
+
+    @app.get("/async")
+    async def list_async(db: AsyncSession = Depends(get_async_db)):
+        if round_trip is not None:
+            await db.execute(round_trip)
+        return serialize_rows((await db.execute(query)).all(), fields)
+
+    app.state.sync_engine = sync_engine
+    return app
+
+async def load(app: FastAPI, path: str, concurrency: int, requests: int) -> dict:
+    latencies = []
+    remaining = iter(range(requests))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": _percentile(latencies, 0.95) * 1000,
+    }
+
+async def run(args):
+    # Los dos engines con pool de una conexión por cliente (aiosqlite usa
+    # NullPool por defecto: un hilo y una conexión nuevos por request)
+    async with temporary_engine(poolclass=AsyncAdaptedQueuePool, pool_size=args.concurrency) as engine:
+        event.listen(engine.sync_engine, "connect", _sleep_function)
+        user_id = (await seed_dives(engine, args.dives))[0]
+        app = build_app(engine, user_id, args.latency_ms, args.concurrency)
+        print(
+            f"{args.requests} requests, {args.concurrency} concurrentes, "
+            f"latencia simulada {args.latency_ms:g} ms por consulta"
+        )
+        try:
+            for path in ("/sync", "/async"):
+                await load(app, path, args.concurrency, min(args.requests, 50))  # calentar el pool
+                result = await load(app, path, args.concurrency, args.requests)
+                print(
+                    f"  {path:7} {result['rps']:8.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                    f"p95 {result['p95_ms']:7.1f} ms"
+                )
+        finally:
+            app.state.sync_engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dives", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Espera por consulta en el driver")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark del parseo de fechas de las importaciones
+
+Genera una columna de N fechas en un formato (o mezcladas) y compara el
+bucle de strptime original (diez formatos en orden), parse_flexible_date
+valor a valor y parse_dates sobre la columna entera. Sin caché LRU previa.
+
+    python scripts/bench_dates.py --rows 100000 --distinct 5000
+    python scripts/bench_dates.py --format mixed --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.dates import _parse, parse_dates, parse_flexible_date  # noqa: E402
+
+# Formatos del parser original de app/main.py, en su orden
+LEGACY_FORMATS = [
+    "%Y-%m-%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%m-%d-%Y",
+    "%d.%m.%Y", "%Y/%m/%d", "%d %m %Y", "%d-%b-%Y", "%d/%b/%Y",
+]
+
+COLUMN_FORMATS = {
+    "iso": "%Y-%m-%d",
+    "dmy": "%d/%m/%Y",
+    "dotted": "%d.%m.%Y",
+    "month_name": "%d-%b-%Y",
+}
+
+def legacy_parse(date_str: str) -> datetime:
+    for fmt in LEGACY_FORMATS:
+        try:
+            return datetime.strptime(date_str, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Could not parse date '{date_str}'")
+
+def synthetic_column(rows: int, distinct: int, format: str) -> list:
+    start = date(2000, 1, 1)
+    days = [start + timedelta(days=random.randint(0, 9000)) for _ in range(distinct)]
+    formats = list(COLUMN_FORMATS.values()) if format == "mixed" else [COLUMN_FORMATS[format]]
+    pool = [day.strftime(random.choice(formats)) for day in days]
+    return [random.choice(pool) for _ in range(rows)]
+
+def timed(fn, column: list, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        _parse.cache_clear()
+        started = time.perf_counter()
+        fn(column)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--distinct", type=int, default=5000, help="Fechas distintas en la columna")
+    parser.add_argument("--format", choices=sorted(COLUMN_FORMATS) + ["mixed"], default="dmy")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(42)
+    column = synthetic_column(args.rows, args.distinct, args.format)
+    expected = [legacy_parse(value) for value in column]
+    assert parse_dates(column, "dmy") == expected, "parse_dates no coincide con el parser original"
+
+    candidates = {
+        "strptime (original)": lambda values: [legacy_parse(value) for value in values],
+        "parse_flexible_date": lambda values: [parse_flexible_date(value, "dmy") for value in values],
+        "parse_dates": lambda values: parse_dates(values, "dmy"),
+    }
+    print(f"{args.rows} fechas ({args.distinct} distintas, formato {args.format}), mediana de {args.repeat}")
+    baseline = None
+    for name, fn in candidates.items():
+        seconds = timed(fn, column, args.repeat)
+        baseline = baseline or seconds
+        print(f"  {name:20} {seconds * 1000:9.1f} ms  {args.rows / seconds:12,.0f} fechas/s  x{baseline / seconds:5.1f}")
+
+if __name__ == "__main__":
+    main()
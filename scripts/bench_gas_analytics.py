@@ -0,0 +1,88 @@
+"""
+Benchmark del cálculo de consumo de gas (SAC/RMV)
+
+Genera N dives sintéticos como filas (lo que devuelve la consulta de
+load_gas_columns) y compara la pasada vectorizada de app.services.gas
+con un bucle por dive equivalente en Python puro.
+
+    python scripts/bench_gas_analytics.py --dives 100000 --repeat 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.gas import (  # noqa: E402
+    MAX_RMV, MIN_RMV, ROLLING_WINDOW, columns_from_rows, compute_gas_analytics,
+)
+
+GAS_MIXES = ["Air", "Nitrox 32%", "Nitrox 36%", None]
+SUITS = ["wetsuit", "drysuit", "shorty", None]
+
+def synthetic_rows(count: int) -> list:
+    start = datetime(2015, 1, 1)
+    rows = []
+    for index in range(count):
+        duration = random.randint(25, 70)
+        depth = round(random.uniform(5, 25), 1)
+        tank = random.choice([10.0, 12.0, 15.0])
+        rmv = random.gauss(16, 4)
+        used = rmv / tank * duration * (depth / 10 + 1)
+        start_pressure = 200
+        rows.append((
+            index + 1, start + timedelta(hours=index * 7), tank, start_pressure,
+            max(int(start_pressure - used), 0), duration, depth,
+            random.choice(GAS_MIXES), random.choice(SUITS),
+        ))
+    return rows
+
+def loop_baseline(rows: list, window: int = ROLLING_WINDOW) -> dict:
+    """Mismo cálculo dive a dive (referencia)"""
+    rmvs = []
+    groups = {}
+    for _, _, tank, start, end, duration, depth, gas_mix, suit_type in rows:
+        if not duration or start - end <= 0 or tank <= 0 or depth < 0:
+            continue
+        rmv = (start - end) / duration / (depth / 10 + 1) * tank
+        if not MIN_RMV <= rmv <= MAX_RMV:
+            continue
+        rmvs.append(rmv)
+        groups.setdefault(("gas_mix", gas_mix or "Air"), []).append(rmv)
+        groups.setdefault(("suit_type", suit_type or "Unknown"), []).append(rmv)
+    rolling = [statistics.fmean(rmvs[max(0, i - window + 1):i + 1]) for i in range(len(rmvs))]
+    breakdown = {key: statistics.quantiles(values, n=10) for key, values in groups.items() if len(values) > 1}
+    return {"count": len(rmvs), "rolling": rolling[-1] if rolling else None, "groups": breakdown}
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dives", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(42)
+    rows = synthetic_rows(args.dives)
+    vectorized = timed(lambda: compute_gas_analytics(columns_from_rows(rows)), args.repeat)
+    columns = columns_from_rows(rows)
+    compute_only = timed(lambda: compute_gas_analytics(columns), args.repeat)
+    baseline = timed(lambda: loop_baseline(rows), args.repeat)
+
+    print(f"{args.dives} dives (mediana de {args.repeat} ejecuciones)")
+    print(f"  vectorizado (filas -> arrays -> análisis): {vectorized:9.1f} ms")
+    print(f"  vectorizado (solo análisis):               {compute_only:9.1f} ms")
+    print(f"  bucle por dive:                            {baseline:9.1f} ms  (x{baseline / vectorized:.1f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark de búsqueda por cercanía con 1M de dives
+
+Carga usuarios × dives alrededor de los sitios de seed_dives y compara
+find_nearby_dives / find_nearby_sites (prefiltro por rangos de geohash y
+bounding box, haversine exacto vectorizado sobre los candidatos) con un
+escaneo completo: todas las coordenadas a NumPy y haversine sobre todas.
+
+    python scripts/bench_nearby.py --users 100 --dives 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.services.geo import find_nearby_dives, find_nearby_sites, haversine_km  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+# (descripción, lat, lng, radio en km)
+POINTS = [
+    ("Ras Mohammed", 27.73, 34.25, 5.0),
+    ("Mar Rojo norte", 27.9, 34.0, 50.0),
+    ("Taveuni (antimeridiano)", -16.8, 180.0, 10.0),
+]
+
+async def full_scan(db: AsyncSession, lat: float, lng: float, radius_km: float, user_id=None) -> int:
+    """Dives a menos de radius_km sin prefiltro: todas las coordenadas a NumPy"""
+    query = select(DiveLog.location_lat, DiveLog.location_lng).where(DiveLog.location_lat.isnot(None))
+    if user_id is not None:
+        query = query.where(DiveLog.user_id == user_id)
+    rows = await db.execute(query)
+    coordinates = np.array([tuple(row) for row in rows], dtype=np.float64)
+    return int(np.count_nonzero(haversine_km(lat, lng, coordinates[:, 0], coordinates[:, 1]) <= radius_km))
+
+async def timed(engine, fn, repeat: int) -> tuple:
+    """(mediana en segundos, resultado)"""
+    samples = []
+    for _ in range(repeat):
+        async with AsyncSession(engine) as db:
+            started = time.perf_counter()
+            result = await fn(db)
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+async def run(args):
+    async with temporary_engine() as engine:
+        started = time.perf_counter()
+        user_id = (await seed_dives(engine, args.dives, args.users))[0]
+        print(f"{args.users * args.dives} dives cargados en {time.perf_counter() - started:.0f} s, mediana de {args.repeat}")
+        for name, lat, lng, radius_km in POINTS:
+            print(f"  {name}, {radius_km:g} km")
+            cases = {
+                "dives del usuario": lambda db: find_nearby_dives(db, user_id, lat, lng, radius_km, limit=args.dives),
+                "escaneo (usuario)": lambda db: full_scan(db, lat, lng, radius_km, user_id),
+                "sitios": lambda db: find_nearby_sites(db, lat, lng, radius_km),
+                "escaneo (todos)": lambda db: full_scan(db, lat, lng, radius_km),
+            }
+            for label, fn in cases.items():
+                seconds, result = await timed(engine, fn, args.repeat)
+                found = result if isinstance(result, int) else len(result)
+                print(f"    {label:20} {seconds * 1000:9.1f} ms  {found:8} resultados")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--dives", type=int, default=10_000, help="Dives por usuario")
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
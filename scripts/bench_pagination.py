@@ -0,0 +1,69 @@
+"""
+Benchmark de paginación: keyset (cursor) vs OFFSET en páginas profundas
+
+Carga usuarios de N dives y mide la latencia de la misma página del
+listado (DiveLogSummary, orden dive_date DESC, id DESC) con OFFSET y con
+paginate_dive_logs. El cursor de cada página se calcula antes de medir,
+como lo traería el cliente de la página anterior.
+
+    python scripts/bench_pagination.py --dives 30000 --pages 1,10,100,500
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import desc  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.schemas.dive_log import DiveLogSummary  # noqa: E402
+from app.services.pagination import encode_cursor, paginate_dive_logs, split_page  # noqa: E402
+from app.services.projection import project  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+async def timed(db: AsyncSession, query, repeat: int) -> tuple:
+    """(mediana en segundos, filas)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = (await db.execute(query)).all()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), rows
+
+async def run(args):
+    async with temporary_engine() as engine:
+        user_id = (await seed_dives(engine, args.dives, args.users))[-1]
+        base = project(DiveLog, DiveLogSummary).where(DiveLog.user_id == user_id)
+        ordered = base.order_by(desc(DiveLog.dive_date), desc(DiveLog.id))
+        print(f"{args.users} usuarios x {args.dives} dives, {args.limit} por página, mediana de {args.repeat}")
+        print(f"  {'página':>7} {'OFFSET':>10} {'keyset':>10}")
+        async with AsyncSession(engine) as db:
+            for page in (int(page) for page in args.pages.split(",")):
+                skip = (page - 1) * args.limit
+                cursor = None
+                if skip:
+                    previous = (await db.execute(ordered.offset(skip - 1).limit(1))).one()
+                    cursor = encode_cursor(previous.dive_date, previous.id)
+                offset_seconds, offset_rows = await timed(db, ordered.offset(skip).limit(args.limit), args.repeat)
+                keyset_seconds, keyset_rows = await timed(
+                    db, paginate_dive_logs(base, cursor, args.limit), args.repeat
+                )
+                keyset_rows, _ = split_page(keyset_rows, args.limit)
+                assert [row.id for row in keyset_rows] == [row.id for row in offset_rows], f"página {page}"
+                print(f"  {page:7} {offset_seconds * 1000:8.2f} ms {keyset_seconds * 1000:8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dives", type=int, default=30_000, help="Dives por usuario")
+    parser.add_argument("--users", type=int, default=3)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--pages", default="1,10,100,500")
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
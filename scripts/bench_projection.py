@@ -0,0 +1,80 @@
+"""
+Microbenchmark de serialización del listado: ORM + Pydantic vs proyección
+
+Por cada 1k filas compara el camino original (DiveLog completo hidratado
+como ORM, con notes y marine_life, y DiveLogSummary.model_validate por
+fila) con project() + serialize_rows (solo las columnas de
+DiveLogSummary, tuplas a dicts). Mide la consulta y la serialización por
+separado.
+
+    python scripts/bench_projection.py --rows 1000 --repeat 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import desc, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.schemas.dive_log import DiveLogSummary  # noqa: E402
+from app.services.projection import project, schema_fields, serialize_rows  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+def orm_serialize(dive_logs) -> list:
+    return [DiveLogSummary.model_validate(dive_log).model_dump() for dive_log in dive_logs]
+
+async def measure(engine, query, fetch, serialize, repeat: int) -> tuple:
+    """(mediana de la consulta, mediana de la serialización, resultado)"""
+    fetch_samples, serialize_samples = [], []
+    for _ in range(repeat):
+        # Sesión nueva: el identity map no guarda instancias entre vueltas
+        async with AsyncSession(engine) as db:
+            started = time.perf_counter()
+            rows = fetch(await db.execute(query))
+            fetched = time.perf_counter()
+            result = serialize(rows)
+            fetch_samples.append(fetched - started)
+            serialize_samples.append(time.perf_counter() - fetched)
+    return statistics.median(fetch_samples), statistics.median(serialize_samples), result
+
+async def run(args):
+    async with temporary_engine() as engine:
+        user_id = (await seed_dives(engine, args.rows * 5))[0]
+        order = (desc(DiveLog.dive_date), desc(DiveLog.id))
+        fields = schema_fields(DiveLogSummary)
+        candidates = {
+            "ORM + model_validate": (
+                select(DiveLog), lambda result: result.scalars().all(), orm_serialize,
+            ),
+            "project + serialize_rows": (
+                project(DiveLog, DiveLogSummary), lambda result: result.all(),
+                lambda rows: serialize_rows(rows, fields),
+            ),
+        }
+        print(f"{args.rows} filas por listado, mediana de {args.repeat} (ms por 1k filas)")
+        print(f"  {'':26} {'consulta':>9} {'serializar':>11} {'total':>9}")
+        results = []
+        scale = 1000 / args.rows * 1000
+        for name, (query, fetch, serialize) in candidates.items():
+            query = query.where(DiveLog.user_id == user_id).order_by(*order).limit(args.rows)
+            fetch_seconds, serialize_seconds, result = await measure(engine, query, fetch, serialize, args.repeat)
+            results.append(result)
+            print(
+                f"  {name:26} {fetch_seconds * scale:9.2f} {serialize_seconds * scale:11.2f} "
+                f"{(fetch_seconds + serialize_seconds) * scale:9.2f}"
+            )
+        assert results[0] == results[1], "Las dos rutas no devuelven lo mismo"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de codificación de respuestas: jsonable_encoder vs json vs orjson
+
+Construye N dive logs sintéticos (objetos con atributos, como las
+instancias ORM) y mide cuánto cuesta convertirlos en el cuerpo de la
+respuesta por cada camino:
+
+  response_model   el original: from_orm en el handler, FastAPI vuelve a
+                   validar con response_model y pasa por jsonable_encoder
+  model_response   model_dump una vez y StdJSONResponse (json estándar)
+  model_response   model_dump una vez y ORJSONFastResponse
+  filas + orjson   listado proyectado: dicts desde tuplas (serialize_rows)
+
+    python scripts/bench_responses.py --sizes 1,50,500 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from app.core.responses import ORJSONFastResponse, StdJSONResponse, orjson  # noqa: E402
+from app.schemas.dive_log import DiveLogResponse, DiveLogSummary  # noqa: E402
+from app.services.projection import schema_fields, serialize_rows  # noqa: E402
+from seed_dives import SITES, dive_row  # noqa: E402
+
+def synthetic_dives(count: int) -> list:
+    rng = random.Random(42)
+    start = datetime(2015, 1, 1)
+    columns = dict.fromkeys(schema_fields(DiveLogResponse))
+    dives = []
+    for index in range(count):
+        site = (index % len(SITES) + 1, 1) + SITES[index % len(SITES)]
+        row = dive_row(rng, 1, index + 1, site, start + timedelta(hours=index * 6))
+        values = {**columns, **row, "id": index + 1, "created_at": row["dive_date"]}
+        dives.append(SimpleNamespace(**values))
+    return dives
+
+def as_objects(schema, dives) -> list:
+    return dives
+
+def as_rows(schema, dives) -> list:
+    """Las tuplas que devolvería la consulta proyectada"""
+    fields = schema_fields(schema)
+    return [tuple(getattr(dive, field) for field in fields) for dive in dives]
+
+def via_response_model(schema, dives) -> bytes:
+    models = [schema.model_validate(dive) for dive in dives]
+    # FastAPI: validación contra response_model y jsonable_encoder
+    validated = [schema.model_validate(model.model_dump()) for model in models]
+    return JSONResponse(jsonable_encoder(validated)).body
+
+def via_model_response(response_class):
+    def encode(schema, dives) -> bytes:
+        return response_class([schema.model_validate(dive).model_dump() for dive in dives]).body
+    return encode
+
+def via_rows(schema, rows) -> bytes:
+    return ORJSONFastResponse(serialize_rows(rows, schema_fields(schema))).body
+
+def timed(encode, schema, payload, repeat: int) -> tuple:
+    """(mediana en segundos, bytes)"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(schema, payload)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), len(body)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,50,500", help="Dive logs por respuesta")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    candidates = {
+        "response_model": (as_objects, via_response_model),
+        "model_response (json)": (as_objects, via_model_response(StdJSONResponse)),
+    }
+    if orjson is not None:
+        candidates["model_response (orjson)"] = (as_objects, via_model_response(ORJSONFastResponse))
+        candidates["filas + orjson"] = (as_rows, via_rows)
+    for schema in (DiveLogResponse, DiveLogSummary):
+        print(f"{schema.__name__}, mediana de {args.repeat}")
+        for size in (int(size) for size in args.sizes.split(",")):
+            dives = synthetic_dives(size)
+            baseline = None
+            for name, (prepare, encode) in candidates.items():
+                seconds, size_bytes = timed(encode, schema, prepare(schema, dives), args.repeat)
+                baseline = baseline or seconds
+                print(
+                    f"  {size:4} dives  {name:24} {seconds * 1e6:10.0f} µs  {size_bytes:9} bytes  "
+                    f"x{baseline / seconds:5.1f}"
+                )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark de búsqueda full-text (fallback SQLite) con 1M de dives
+
+Carga usuarios × dives y mide p50/p95 de search_dive_logs por consulta,
+con y sin filtros, con el índice del usuario ya en caché (la primera
+llamada lo construye y se mide aparte). Con --max-p95-ms sale con código
+1 si algún p95 lo supera.
+
+    python scripts/bench_search.py --users 100 --dives 10000 --repeat 50 --max-p95-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.services.search import _indexes, search_dive_logs  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+# (descripción, consulta, filtros)
+CASES = [
+    ("un término", "reef", {}),
+    ("prefijo", "bl", {}),
+    ("dos términos", "blue hole", {}),
+    ("página 10", "reef", {"offset": 180}),
+    ("profundidad", "reef", {"min_depth": 30}),
+    # Ningún dive del usuario es de 2030: recorre todos los candidatos
+    ("fechas sin dives", "reef", {"date_from": date(2030, 1, 1)}),
+    ("país", "reef", {"country": "Egypt"}),
+    ("sin resultados", "kelp", {}),
+]
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run(args) -> bool:
+    async with temporary_engine() as engine:
+        started = time.perf_counter()
+        user_ids = await seed_dives(engine, args.dives, args.users)
+        print(f"{args.users * args.dives} dives cargados en {time.perf_counter() - started:.0f} s, {args.repeat} vueltas")
+        user_id = user_ids[0]
+        async with AsyncSession(engine) as db:
+            started = time.perf_counter()
+            await search_dive_logs(db, user_id, "reef")
+            print(f"  índice de {args.dives} dives construido en {(time.perf_counter() - started) * 1000:.0f} ms")
+            first = await db.scalar(select(func.min(DiveLog.dive_date)).where(DiveLog.user_id == user_id))
+        print(f"  caché: {_indexes.stats()}")
+        year = first.year + 1
+        cases = CASES + [("fechas", "reef", {"date_from": date(year, 1, 1), "date_to": date(year, 12, 31)})]
+        print(f"  {'':16} {'p50':>9} {'p95':>9} {'resultados':>11}")
+        within = True
+        for name, query, filters in cases:
+            samples = []
+            for _ in range(args.repeat):
+                async with AsyncSession(engine) as db:
+                    started = time.perf_counter()
+                    results = await search_dive_logs(db, user_id, query, **filters)
+                    samples.append(time.perf_counter() - started)
+            p95 = percentile(samples, 0.95) * 1000
+            within = within and (args.max_p95_ms is None or p95 <= args.max_p95_ms)
+            print(f"  {name:16} {percentile(samples, 0.5) * 1000:6.1f} ms {p95:6.1f} ms {len(results):11}")
+        return within
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--dives", type=int, default=10_000, help="Dives por usuario")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--max-p95-ms", type=float, default=None)
+    args = parser.parse_args()
+    if not asyncio.run(run(args)):
+        print(f"p95 por encima de {args.max_p95_ms:g} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
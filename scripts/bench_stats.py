@@ -0,0 +1,85 @@
+"""
+Benchmark de /stats/summary: agregados SQL vs cargar los dives en Python
+
+Carga varios usuarios de N dives y compara el cálculo original (todos los
+DiveLog del usuario hidratados como ORM y agregados en Python) con
+compute_dive_stats: solo el resumen, con las secciones agregadas y con
+todas las de STATS_SECTIONS.
+
+    python scripts/bench_stats.py --dives 10000 --users 5 --repeat 5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.services.stats import STATS_SECTIONS, compute_dive_stats  # noqa: E402
+from seed_dives import seed_dives, temporary_engine  # noqa: E402
+
+async def python_stats(db: AsyncSession, user_id: int) -> dict:
+    """El cálculo original de get_dive_stats (sin la división por cero)"""
+    dive_logs = (await db.execute(select(DiveLog).where(DiveLog.user_id == user_id))).scalars().all()
+    with_avg = [dive.avg_depth for dive in dive_logs if dive.avg_depth]
+    locations = {}
+    for dive in dive_logs:
+        country = dive.country or "Unknown"
+        locations[country] = locations.get(country, 0) + 1
+    favorite_locations = sorted(locations.items(), key=lambda x: x[1], reverse=True)[:5]
+    return {
+        "total_dives": len(dive_logs),
+        "max_depth": max(dive.max_depth for dive in dive_logs),
+        "total_time_minutes": sum(dive.dive_duration for dive in dive_logs if dive.dive_duration),
+        "average_depth": round(sum(with_avg) / len(with_avg), 1) if with_avg else 0,
+        "favorite_locations": [{"country": country, "dives": dives} for country, dives in favorite_locations],
+    }
+
+async def timed(engine, fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        # Sesión nueva en cada vuelta: sin identity map de la anterior
+        async with AsyncSession(engine) as db:
+            started = time.perf_counter()
+            await fn(db)
+            samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+async def run(args):
+    async with temporary_engine() as engine:
+        user_id = (await seed_dives(engine, args.dives, args.users))[-1]
+        async with AsyncSession(engine) as db:
+            expected = await python_stats(db, user_id)
+            computed = await compute_dive_stats(db, user_id)
+        for key in ("total_dives", "max_depth", "total_time_minutes", "average_depth"):
+            assert computed[key] == expected[key], f"{key}: {computed[key]} != {expected[key]}"
+
+        aggregate_sections = [name for name in STATS_SECTIONS if name != "gas"]
+        candidates = {
+            "ORM + Python (original)": lambda db: python_stats(db, user_id),
+            "SQL, resumen": lambda db: compute_dive_stats(db, user_id),
+            "SQL, secciones agregadas": lambda db: compute_dive_stats(db, user_id, aggregate_sections),
+            # gas carga columnas por dive para los percentiles SAC/RMV
+            "SQL, todas las secciones": lambda db: compute_dive_stats(db, user_id, STATS_SECTIONS),
+        }
+        print(f"{args.users} usuarios x {args.dives} dives, mediana de {args.repeat}")
+        baseline = None
+        for name, fn in candidates.items():
+            seconds = await timed(engine, fn, args.repeat)
+            baseline = baseline or seconds
+            print(f"  {name:26} {seconds * 1000:8.1f} ms  x{baseline / seconds:5.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dives", type=int, default=10_000, help="Dives por usuario")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+EXPLAIN ANALYZE de las consultas calientes de dive_logs
+
+Ejecuta el plan real de la consulta de cada endpoint contra la base de
+datos configurada (Postgres) y marca las que hacen Seq Scan sobre dive_logs.
+
+    python scripts/explain_hot_queries.py --seed --users 50 --dives-per-user 2000
+    python scripts/explain_hot_queries.py --user-id 42
+"""
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import desc, func, insert, literal_column, select, text  # noqa: E402
+from app.core.database import engine  # noqa: E402
+from app.models.dive_log import SEARCH_CONFIG, DiveLog  # noqa: E402
+from app.models.dive_site import Country, DiveSite  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.models.user_stats import UserCountryStats, UserDiveStats  # noqa: E402
+from app.services.dive_sites import UNKNOWN_COUNTRY, normalize_country, normalize_name  # noqa: E402
+from app.services.pagination import encode_cursor, paginate_dive_logs  # noqa: E402
+from app.services.search import search_vector, tsquery_text  # noqa: E402
+
+SEED_PREFIX = "explain-seed"
+NOTE_WORDS = [
+    "turtle", "shark", "manta", "octopus", "nudibranch", "barracuda", "moray", "grouper",
+    "dolphin", "seahorse", "lionfish", "stingray", "reef", "wall", "wreck", "current",
+    "drift", "cave", "coral", "sand", "thermocline", "surge", "visibility", "buddy",
+]
+COUNTRIES = ["Mexico", "Egypt", "Indonesia", "Philippines", "Spain", "Thailand", "Australia", None]
+
+def seed_catalog(conn) -> list:
+    """Países y 500 sitios sintéticos; devuelve (nombre, país, site_id, country_id)"""
+    country_ids = {}
+    for country in COUNTRIES:
+        name = country or UNKNOWN_COUNTRY
+        country_ids[country] = conn.execute(
+            insert(Country).values(name=name, normalized_name=f"{SEED_PREFIX} {normalize_country(name)}")
+            .returning(Country.id)
+        ).scalar_one()
+    sites = []
+    for number in range(1, 501):
+        country = random.choice(COUNTRIES)
+        name = f"Site {number}"
+        site_id = conn.execute(
+            insert(DiveSite).values(
+                name=name, normalized_name=normalize_name(name), country_id=country_ids[country]
+            ).returning(DiveSite.id)
+        ).scalar_one()
+        sites.append((name, country, site_id, country_ids[country]))
+    return sites
+
+def seed(conn, users: int, dives_per_user: int):
+    """Crear usuarios y dive logs sintéticos y refrescar estadísticas del planner"""
+    start = datetime(2015, 1, 1)
+    sites = seed_catalog(conn)
+    for index in range(users):
+        user_id = conn.execute(
+            insert(User).values(
+                email=f"{SEED_PREFIX}-{index}@example.com",
+                username=f"{SEED_PREFIX}-{index}",
+                hashed_password="x",
+                is_active=True,
+                total_dives=dives_per_user,
+            ).returning(User.id)
+        ).scalar_one()
+        rows = []
+        for number in range(1, dives_per_user + 1):
+            site_name, country, site_id, country_id = random.choice(sites)
+            rows.append({
+                "user_id": user_id,
+                "dive_number": number,
+                "dive_site_name": site_name,
+                "site_id": site_id,
+                "dive_date": start + timedelta(hours=random.randint(0, 24 * 365 * 10)),
+                "max_depth": round(random.uniform(5, 45), 1),
+                "avg_depth": round(random.uniform(4, 25), 1),
+                "dive_duration": random.randint(20, 70),
+                "country": country,
+                "country_id": country_id,
+                "notes": " ".join(random.choices(NOTE_WORDS, k=random.randint(0, 60))),
+                "marine_life": " ".join(random.sample(NOTE_WORDS[:12], k=random.randint(0, 3))),
+            })
+        conn.execute(insert(DiveLog), rows)
+    conn.execute(text("ANALYZE dive_logs"))
+    conn.execute(text("ANALYZE users"))
+
+def hot_queries(conn, user_id: int) -> dict:
+    """Consultas equivalentes a las de cada endpoint"""
+    sample = conn.execute(
+        select(DiveLog.id, DiveLog.dive_date, DiveLog.site_id)
+        .where(DiveLog.user_id == user_id)
+        .order_by(desc(DiveLog.dive_date), desc(DiveLog.id))
+        .offset(500 * 50)
+        .limit(1)
+    ).first()
+    dive_id = sample.id if sample else 1
+    deep_cursor = encode_cursor(sample.dive_date, sample.id) if sample else None
+
+    search_query = func.to_tsquery(literal_column(f"'{SEARCH_CONFIG}'::regconfig"), tsquery_text(["reef"]))
+    return {
+        "GET /dive-logs/ (page 1)": paginate_dive_logs(
+            select(DiveLog).where(DiveLog.user_id == user_id), None, 50
+        ),
+        "GET /dive-logs/ (page ~500)": paginate_dive_logs(
+            select(DiveLog).where(DiveLog.user_id == user_id), deep_cursor, 50
+        ),
+        "GET|PUT|DELETE /dive-logs/{dive_id}": select(DiveLog).where(
+            DiveLog.id == dive_id, DiveLog.user_id == user_id
+        ),
+        "POST /dive-logs/ (counter resync)": select(func.max(DiveLog.dive_number)).where(
+            DiveLog.user_id == user_id
+        ),
+        "GET /stats/summary (totals fallback)": select(
+            func.count(DiveLog.id), func.max(DiveLog.max_depth),
+            func.sum(DiveLog.dive_duration), func.avg(DiveLog.avg_depth),
+        ).where(DiveLog.user_id == user_id),
+        "GET /stats/summary (countries fallback)": select(DiveLog.country_id, func.count(DiveLog.id))
+            .where(DiveLog.user_id == user_id)
+            .group_by(DiveLog.country_id),
+        "GET /dive-logs/search?q=reef": select(DiveLog.id, func.ts_rank(search_vector, search_query))
+            .where(DiveLog.user_id == user_id, search_vector.op("@@")(search_query))
+            .order_by(desc(func.ts_rank(search_vector, search_query)))
+            .limit(20),
+        "GET /dive-logs/sites/{site_id}": select(
+            func.count(DiveLog.id), func.count(func.distinct(DiveLog.user_id)), func.avg(DiveLog.max_depth),
+        ).where(DiveLog.site_id == (sample.site_id if sample else 1)),
+        "GET /stats/summary (materialized)": select(UserDiveStats).where(UserDiveStats.user_id == user_id),
+        "GET /stats/summary (materialized countries)": select(UserCountryStats)
+            .where(UserCountryStats.user_id == user_id)
+            .order_by(desc(UserCountryStats.dive_count))
+            .limit(5),
+    }
+
+def explain(conn, query) -> str:
+    sql = str(query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    rows = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")).scalars().all()
+    return "\n".join(rows)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="crear datos sintéticos antes de medir")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--dives-per-user", type=int, default=2000)
+    parser.add_argument("--user-id", type=int, help="usuario a analizar (por defecto el de más dives)")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "postgresql":
+        print("❌ EXPLAIN ANALYZE requiere Postgres")
+        return 2
+
+    with engine.begin() as conn:
+        if args.seed:
+            seed(conn, args.users, args.dives_per_user)
+            print(f"✅ Sembrados {args.users} usuarios x {args.dives_per_user} dives")
+
+        user_id = args.user_id or conn.execute(
+            select(DiveLog.user_id).group_by(DiveLog.user_id).order_by(desc(func.count(DiveLog.id))).limit(1)
+        ).scalar()
+        if user_id is None:
+            print("❌ No hay dive logs; usar --seed")
+            return 2
+
+        seq_scans = []
+        for name, query in hot_queries(conn, user_id).items():
+            plan = explain(conn, query)
+            print(f"\n=== {name} ===\n{plan}")
+            if "Seq Scan on dive_logs" in plan:
+                seq_scans.append(name)
+
+    print()
+    if seq_scans:
+        for name in seq_scans:
+            print(f"❌ Seq Scan en dive_logs: {name}")
+        return 1
+    print("✅ Todas las consultas usan índices")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
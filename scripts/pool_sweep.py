@@ -0,0 +1,94 @@
+"""
+Barrido de tamaños de pool bajo carga concurrente
+
+Para cada pool_size lanza N clientes concurrentes que ejecutan la consulta
+del listado de dive logs durante unos segundos y mide throughput, latencias
+y espera de checkout. El "codo" es el tamaño a partir del cual más
+conexiones ya no mejoran el p99.
+
+    python scripts/pool_sweep.py --sizes 2,5,10,20 --concurrency 50 --seconds 10
+    python scripts/pool_sweep.py --user-id 42 --max-overflow 0
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import create_async_engine  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import POOL_PRESETS  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.schemas.dive_log import DiveLogSummary  # noqa: E402
+from app.services.pagination import paginate_dive_logs  # noqa: E402
+from app.services.projection import project  # noqa: E402
+
+def _percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+async def run_size(pool_size: int, max_overflow: int, concurrency: int, seconds: float, user_id: int) -> dict:
+    preset = POOL_PRESETS.get(settings.ENVIRONMENT, POOL_PRESETS["production"])
+    engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL_COMPUTED,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=60,
+        pool_pre_ping=preset["pool_pre_ping"],
+    )
+    query = paginate_dive_logs(project(DiveLog, DiveLogSummary).where(DiveLog.user_id == user_id), None, 50)
+    latencies = []
+    waits = []
+    deadline = time.perf_counter() + seconds
+
+    async def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            async with engine.connect() as conn:
+                waits.append(time.perf_counter() - started)
+                (await conn.execute(query)).all()
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    await engine.dispose()
+    return {
+        "pool_size": pool_size,
+        "requests": len(latencies),
+        "rps": len(latencies) / seconds,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "avg_checkout_wait_ms": statistics.mean(waits) * 1000,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,2,5,10,20", help="Tamaños de pool separados por comas")
+    parser.add_argument("--max-overflow", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--user-id", type=int, default=None, help="Usuario con dive logs (por defecto el primero)")
+    args = parser.parse_args()
+
+    user_id = args.user_id
+    if user_id is None:
+        engine = create_async_engine(settings.ASYNC_DATABASE_URL_COMPUTED)
+        async with engine.connect() as conn:
+            user_id = (await conn.execute(select(DiveLog.user_id).limit(1))).scalar()
+        await engine.dispose()
+        if user_id is None:
+            sys.exit("No hay dive logs: sembrar datos con scripts/explain_hot_queries.py --seed")
+
+    print(f"{'pool':>5} {'reqs':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'wait ms':>9}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        result = await run_size(size, args.max_overflow, args.concurrency, args.seconds, user_id)
+        print(
+            f"{result['pool_size']:>5} {result['requests']:>8} {result['rps']:>9.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['avg_checkout_wait_ms']:>9.2f}"
+        )
+
+if __name__ == "__main__":
+    asyncio.run(main())
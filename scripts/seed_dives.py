@@ -0,0 +1,163 @@
+"""
+Datos sintéticos para los benchmarks
+
+seed_dives() crea las tablas y carga usuarios con dives realistas en lotes
+(inserts Core, como la importación masiva): sitios y países del catálogo,
+coordenadas alrededor de cada sitio con su geohash, notas y vida marina,
+y las estadísticas materializadas de cada usuario (como tras sus dives).
+Los benchmarks lo usan sobre un SQLite temporal (temporary_engine); como
+script carga la base de datos de settings.
+
+    python scripts/seed_dives.py --users 10 --dives 10000
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.core.geohash import geohash_for  # noqa: E402
+from app.models.dive_log import DiveLog  # noqa: E402
+from app.models.dive_site import Country, DiveSite  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.dive_sites import normalize_name  # noqa: E402
+from app.services.user_stats import rebuild_user_stats  # noqa: E402
+
+SEED_BATCH = 5000
+
+# (sitio, país, región, lat, lng); Rainbow Reef queda junto al antimeridiano
+SITES = [
+    ("Ras Mohammed", "Egypt", "Red Sea", 27.73, 34.25),
+    ("Blue Hole", "Egypt", "Dahab", 28.57, 34.54),
+    ("Thistlegorm", "Egypt", "Red Sea", 27.81, 33.92),
+    ("Cenote Dos Ojos", "Mexico", "Quintana Roo", 20.33, -87.39),
+    ("Palancar Reef", "Mexico", "Cozumel", 20.31, -87.02),
+    ("Manta Point", "Indonesia", "Nusa Penida", -8.79, 115.52),
+    ("Liberty Wreck", "Indonesia", "Bali", -8.27, 115.59),
+    ("Islas Medas", "Spain", "Costa Brava", 42.05, 3.22),
+    ("Cabo de Palos", "Spain", "Murcia", 37.63, -0.69),
+    ("Barracuda Point", "Malaysia", "Sipadan", 4.11, 118.63),
+    ("Great White Wall", "Fiji", "Taveuni", -16.83, 179.99),
+    ("Rainbow Reef", "Fiji", "Taveuni", -16.78, -179.98),
+]
+GAS_MIXES = ["Air", "Air", "Air", "Nitrox 32%", "Nitrox 36%"]
+SUITS = ["wetsuit", "drysuit", "shorty"]
+SPECIES = ["Turtle", "Reef shark", "Manta", "Napoleon wrasse", "Moray eel", "Octopus", "Barracuda", "Nudibranch"]
+NOTE_WORDS = [
+    "turtle", "shark", "manta", "reef", "wall", "wreck", "current", "drift", "coral", "cave",
+    "visibility", "thermocline", "school", "barracuda", "night", "swim-through", "pinnacle", "sandy",
+]
+
+async def seed_catalog(conn) -> List[tuple]:
+    """Países y sitios de SITES; devuelve (site_id, country_id, sitio, país, región, lat, lng)"""
+    country_ids = {}
+    for country in dict.fromkeys(site[1] for site in SITES):
+        country_ids[country] = (await conn.execute(
+            insert(Country).values(name=country, normalized_name=normalize_name(country)).returning(Country.id)
+        )).scalar_one()
+    sites = []
+    for name, country, region, lat, lng in SITES:
+        site_id = (await conn.execute(
+            insert(DiveSite).values(
+                name=name, normalized_name=normalize_name(name), country_id=country_ids[country], region=region
+            ).returning(DiveSite.id)
+        )).scalar_one()
+        sites.append((site_id, country_ids[country], name, country, region, lat, lng))
+    return sites
+
+def dive_row(rng: random.Random, user_id: int, number: int, site: tuple, dive_date: datetime) -> dict:
+    site_id, country_id, name, country, region, site_lat, site_lng = site
+    lat = site_lat + rng.uniform(-0.02, 0.02)
+    # Normalizar a [-180, 180) para los sitios junto al antimeridiano
+    lng = (site_lng + rng.uniform(-0.02, 0.02) + 180) % 360 - 180
+    max_depth = round(rng.uniform(6, 40), 1)
+    return {
+        "user_id": user_id,
+        "dive_number": number,
+        "dive_date": dive_date,
+        "dive_site_name": name,
+        "country": country,
+        "region": region,
+        "site_id": site_id,
+        "country_id": country_id,
+        "location_lat": lat,
+        "location_lng": lng,
+        "geohash": geohash_for(lat, lng),
+        "max_depth": max_depth,
+        "avg_depth": round(max_depth * rng.uniform(0.5, 0.7), 1),
+        "dive_duration": rng.randint(25, 70),
+        "water_temperature": round(rng.uniform(14, 30), 1),
+        "visibility": round(rng.uniform(5, 40)),
+        "suit_type": rng.choice(SUITS),
+        "tank_volume": rng.choice([10.0, 12.0, 15.0]),
+        "gas_mix": rng.choice(GAS_MIXES),
+        "start_pressure": 200,
+        "end_pressure": rng.randint(40, 90),
+        "marine_life": ", ".join(rng.sample(SPECIES, k=rng.randint(0, 3))) or None,
+        "notes": " ".join(rng.choices(NOTE_WORDS, k=rng.randint(5, 30))),
+        "rating": rng.randint(1, 5),
+    }
+
+async def seed_dives(engine: AsyncEngine, dives: int, users: int = 1, seed: int = 42) -> List[int]:
+    """
+    Crear las tablas y cargar `users` usuarios con `dives` dives cada uno
+    Devuelve los IDs de usuario
+    """
+    rng = random.Random(seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        sites = await seed_catalog(conn)
+        user_ids = []
+        for index in range(users):
+            user_id = (await conn.execute(
+                insert(User).values(
+                    email=f"bench{index}@example.com", username=f"bench{index}", hashed_password="x",
+                    is_active=True, total_dives=dives,
+                ).returning(User.id)
+            )).scalar_one()
+            user_ids.append(user_id)
+            start = datetime(2000, 1, 1) + timedelta(days=rng.randint(0, 3650))
+            for first in range(1, dives + 1, SEED_BATCH):
+                await conn.execute(insert(DiveLog), [
+                    dive_row(rng, user_id, number, rng.choice(sites), start + timedelta(hours=number * 6))
+                    for number in range(first, min(first + SEED_BATCH, dives + 1))
+                ])
+    async with AsyncSession(engine) as db:
+        await rebuild_user_stats(db, user_ids)
+    return user_ids
+
+@asynccontextmanager
+async def temporary_engine(**options) -> AsyncIterator[AsyncEngine]:
+    """Engine async sobre un SQLite en un directorio temporal"""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}", **options)
+        try:
+            yield engine
+        finally:
+            await engine.dispose()
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--dives", type=int, default=10_000, help="Dives por usuario")
+    args = parser.parse_args()
+
+    engine = create_async_engine(settings.ASYNC_DATABASE_URL_COMPUTED)
+    try:
+        user_ids = await seed_dives(engine, args.dives, args.users)
+    finally:
+        await engine.dispose()
+    print(f"{len(user_ids)} usuarios con {args.dives} dives: IDs {user_ids[0]}-{user_ids[-1]}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
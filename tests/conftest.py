@@ -0,0 +1,66 @@
+"""
+Fixtures comunes: la app contra un SQLite temporal (aiosqlite)
+
+Las variables de entorno se fijan antes de importar app.*: Settings las
+lee al importarse. Cada test parte de una base de datos vacía.
+"""
+import os
+import tempfile
+
+_tmpdir = tempfile.mkdtemp(prefix="diveapp-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmpdir, 'test.db')}"
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("CACHE_BACKEND", "none")
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from app.core.database import AsyncSessionLocal, Base, async_engine  # noqa: E402
+from app.core.security import create_access_token, token_cache, user_cache  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.services.dive_sites import site_catalog  # noqa: E402
+from app.services.search import _indexes  # noqa: E402
+from app.services.sightings import species_catalog  # noqa: E402
+
+pytest_plugins = ["app.core.query_audit"]
+
+async def reset_database():
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    # Caches en memoria con IDs de la base de datos anterior
+    for cache in (site_catalog, species_catalog, user_cache, token_cache, _indexes):
+        cache.clear()
+
+@pytest.fixture
+def client():
+    """
+    TestClient con un único event loop para todo el test
+    (las conexiones aiosqlite del pool no se pueden compartir entre loops)
+    """
+    with TestClient(app) as client:
+        client.portal.call(reset_database)
+        yield client
+        client.portal.call(async_engine.dispose)
+
+@pytest.fixture
+def run(client):
+    """Ejecutar una corrutina en el event loop de la app: run(fn, *args)"""
+    return lambda fn, *args: client.portal.call(fn, *args)
+
+async def create_user(username: str = "diver", **values) -> User:
+    async with AsyncSessionLocal() as db:
+        user = User(
+            email=f"{username}@example.com", username=username, hashed_password="x", is_active=True, **values
+        )
+        db.add(user)
+        await db.commit()
+        return user
+
+@pytest.fixture
+def user(run) -> User:
+    return run(create_user)
+
+@pytest.fixture
+def auth_headers(user) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
@@ -0,0 +1,20 @@
+from datetime import datetime
+import pytest
+from app.core.dates import parse_dates, parse_flexible_date
+
+def test_parse_dates_matches_single_value_parser():
+    values = ["2025-01-15", "15/01/2025", "01/02/2025", "15.01.2025", "15 01 2025", "15-Jan-2025", "2025/01/15"]
+    assert parse_dates(values, "dmy") == [parse_flexible_date(value, "dmy") for value in values]
+
+def test_parse_dates_settles_day_month_order_per_column():
+    # 01/15 solo es válida como MM/DD: el resto de la columna también
+    assert parse_dates(["01/15/2025", "01/02/2025"], "dmy") == [datetime(2025, 1, 15), datetime(2025, 1, 2)]
+    # Columna mezclada: cada valor ambiguo usa el orden pedido
+    assert parse_dates(["13/01/2025", "01/13/2025", "01/02/2025"], "dmy") == [
+        datetime(2025, 1, 13), datetime(2025, 1, 13), datetime(2025, 2, 1),
+    ]
+
+def test_parse_dates_empty_and_invalid_values():
+    assert parse_dates([None, "", "31/02/2025", "15-Foo-2025", "x"], errors="coerce") == [None] * 5
+    with pytest.raises(ValueError, match="31/02/2025"):
+        parse_dates(["2025-01-15", "31/02/2025"])
@@ -0,0 +1,117 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import insert, select, update
+from app.core.database import AsyncSessionLocal
+from app.core.security import user_cache
+from app.models.dive_log import DiveLog
+from app.models.dive_site import Country, DiveSite
+from app.models.species import DiveSighting, Species
+from app.models.user import User
+from app.services.dive_numbers import add_dive_log
+
+CONCURRENT_INSERTS = 20
+
+async def _insert_one(user_id: int, index: int) -> int:
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        dive_log = DiveLog(dive_site_name=f"Site {index}", dive_date=datetime(2024, 1, 1), max_depth=10 + index)
+        await add_dive_log(db, user, dive_log)
+        await db.commit()
+        return dive_log.dive_number
+
+async def _insert_concurrently(user_id: int, count: int) -> list:
+    return await asyncio.gather(*(_insert_one(user_id, index) for index in range(count)))
+
+async def _stored_state(user_id: int):
+    async with AsyncSessionLocal() as db:
+        numbers = (await db.execute(
+            select(DiveLog.dive_number).where(DiveLog.user_id == user_id).order_by(DiveLog.dive_number)
+        )).scalars().all()
+        user = await db.get(User, user_id)
+        return numbers, user.total_dives, user.max_depth_achieved
+
+def test_concurrent_inserts_get_unique_contiguous_numbers(run, user):
+    returned = run(_insert_concurrently, user.id, CONCURRENT_INSERTS)
+    numbers, total_dives, max_depth = run(_stored_state, user.id)
+
+    expected = list(range(1, CONCURRENT_INSERTS + 1))
+    assert sorted(returned) == expected
+    assert numbers == expected
+    assert total_dives == CONCURRENT_INSERTS
+    assert max_depth == 10 + CONCURRENT_INSERTS - 1
+
+async def _counter_behind(user_id: int):
+    """Dive ya existente con el número 1 y el contador todavía en 0"""
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(DiveLog).values(
+            user_id=user_id, dive_number=1, dive_site_name="Old", dive_date=datetime(2020, 1, 1), max_depth=12
+        ))
+        await db.execute(update(User).where(User.id == user_id).values(total_dives=0))
+        await db.commit()
+
+def test_counter_behind_existing_numbers_is_resynced(run, user):
+    run(_counter_behind, user.id)
+
+    assert run(_insert_one, user.id, 0) == 2
+    numbers, total_dives, _ = run(_stored_state, user.id)
+    assert numbers == [1, 2]
+    assert total_dives == 2
+
+async def _catalog_rows(dive_log_id: int) -> tuple:
+    async with AsyncSessionLocal() as db:
+        countries = (await db.execute(select(Country.id))).scalars().all()
+        sites = (await db.execute(select(DiveSite.id))).scalars().all()
+        species = (await db.execute(select(Species.id))).scalars().all()
+        sightings = (await db.execute(
+            select(DiveSighting.species_id).where(DiveSighting.dive_log_id == dive_log_id)
+        )).scalars().all()
+        return countries, sites, species, sightings
+
+def test_resync_keeps_catalog_rows_of_the_same_transaction(client, run, user, auth_headers):
+    # El conflicto llega después de crear país, sitio y especie en la misma transacción
+    run(_counter_behind, user.id)
+    response = client.post("/api/v1/dive-logs/", headers=auth_headers, json={
+        "dive_site_name": "Shark Reef", "country": "Fiji", "dive_date": "2024-05-02T09:00:00",
+        "max_depth": 20, "marine_life": "Bull shark",
+    })
+    assert response.status_code == 200, response.text
+    dive = response.json()
+    assert dive["dive_number"] == 2
+
+    countries, sites, species, sightings = run(_catalog_rows, dive["id"])
+    assert countries == [dive["country_id"]]
+    assert sites == [dive["site_id"]]
+    assert sightings == species and len(species) == 1
+
+async def _insert_with_cached_user(user_id: int, commit: bool) -> tuple:
+    """Entrada de user_cache antes y después de terminar la transacción"""
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        email = user.email
+        user_cache.set(email, "cached")
+        await add_dive_log(db, user, DiveLog(dive_site_name="Site", dive_date=datetime(2024, 1, 1), max_depth=10))
+        before = user_cache.get(email)
+        await (db.commit() if commit else db.rollback())
+        return before, user_cache.get(email)
+
+def test_user_cache_invalidated_after_commit(run, user):
+    # Invalidar en el flush dejaría que otra request recachee el contador viejo
+    assert run(_insert_with_cached_user, user.id, True) == ("cached", None)
+    assert run(_insert_with_cached_user, user.id, False) == ("cached", "cached")
+
+async def _rename_with_cached_user(user_id: int) -> tuple:
+    async with AsyncSessionLocal() as db:
+        user = await db.get(User, user_id)
+        old_email = user.email
+        user_cache.set(old_email, "cached")
+        user.email = "renamed@example.com"
+        user_cache.set(user.email, "cached")
+        await db.flush()
+        flushed = (user_cache.get(old_email), user_cache.get(user.email))
+        await db.commit()
+        return flushed, (user_cache.get(old_email), user_cache.get(user.email))
+
+def test_user_update_invalidates_old_and_new_email_after_commit(run, user):
+    flushed, committed = run(_rename_with_cached_user, user.id)
+    assert flushed == ("cached", "cached")
+    assert committed == (None, None)
@@ -0,0 +1,84 @@
+import asyncio
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.dive_log import DiveLog
+from app.models.dive_site import DiveSite
+from app.models.user import User
+from app.services.dive_numbers import add_dive_log
+from app.services.dive_sites import best_match, normalize_country, site_catalog
+
+def test_normalization_and_matching():
+    assert normalize_country("EE.UU.") == normalize_country("USA") == "united states"
+    assert best_match("blue hole dahab", {"blue hole  dahab", "canyon"}) == "blue hole  dahab"
+    assert best_match("site 12", {"site 2"}) is None
+
+async def _resolve_all(names):
+    async with AsyncSessionLocal() as db:
+        ids = [await site_catalog.resolve(db, name, "Egypt") for name in names]
+        await db.commit()
+        return ids
+
+def test_variants_resolve_to_one_site(run):
+    ids = run(_resolve_all, ["Blue Hole", "Blue-Hole", "blue hole", "Canyon"])
+    assert ids[0] == ids[1] == ids[2]
+    assert ids[3][0] != ids[0][0]
+    assert len({country_id for _, country_id in ids}) == 1
+    assert site_catalog.stats()["sites"] == 2
+
+async def _resolve_and_rollback():
+    async with AsyncSessionLocal() as db:
+        site_id, _ = await site_catalog.resolve(db, "Thistlegorm", "Egypt")
+        # Visible para la propia transacción, no para la caché compartida
+        assert await site_catalog.site_id(db, "Thistlegorm", _) == site_id
+        assert site_catalog.stats() == {"countries": 0, "sites": 0, "variants": 0}
+        await db.rollback()
+
+def test_rolled_back_sites_never_reach_the_cache(run):
+    run(_resolve_and_rollback)
+    assert site_catalog.stats()["sites"] == 0
+    [(site_id, country_id)] = run(_resolve_all, ["Thistlegorm"])
+    assert site_catalog.stats()["sites"] == 1
+    assert site_id is not None and country_id is not None
+
+async def _create_with_small_pool(user_id: int, count: int):
+    """
+    Creaciones concurrentes con un pool de una sola conexión: el catálogo
+    no debe pedir una segunda conexión mientras la sesión ya tiene una
+    """
+    engine = create_async_engine(
+        settings.ASYNC_DATABASE_URL_COMPUTED, poolclass=AsyncAdaptedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=5,
+    )
+
+    async def create(index: int):
+        async with AsyncSession(engine, expire_on_commit=False) as db:
+            user = await db.get(User, user_id)
+            dive_log = DiveLog(
+                dive_site_name=f"Reef {index}", country="Egypt", dive_date=datetime(2024, 1, 1), max_depth=15
+            )
+            await site_catalog.assign(db, dive_log)
+            await add_dive_log(db, user, dive_log)
+            await db.commit()
+            return dive_log.site_id
+
+    try:
+        return await asyncio.wait_for(asyncio.gather(*(create(index) for index in range(count))), timeout=30)
+    finally:
+        await engine.dispose()
+
+def test_catalog_inserts_use_the_request_connection(run, user):
+    site_ids = run(_create_with_small_pool, user.id, 5)
+    assert len(set(site_ids)) == 5
+    assert site_catalog.stats()["sites"] == 5
+
+async def _stored_sites() -> list:
+    async with AsyncSessionLocal() as db:
+        return (await db.execute(select(DiveSite.name))).scalars().all()
+
+def test_rolled_back_sites_are_not_stored(run):
+    run(_resolve_and_rollback)
+    assert run(_stored_sites) == []
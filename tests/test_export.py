@@ -0,0 +1,124 @@
+"""
+Memoria de la exportación en streaming del logbook
+
+Se exportan dos logbooks, de SMALL_DIVES y DIVES dives (el NDJSON de DIVES
+ocupa ~75 MB). Memoria constante significa que el pico no crece con el
+tamaño: el de DIVES no supera al de SMALL_DIVES en más de MAX_GROWTH_MB y
+queda por debajo de MAX_PEAK_MB. El pico suma tracemalloc (Python) y el
+memory pool de Arrow, cuyos buffers nativos tracemalloc no ve.
+"""
+import csv
+import gzip
+import io
+import json
+import random
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.models.dive_log import DiveLog
+from app.services.export import EXPORT_FIELDS, export_dive_logs, pa, pq
+from conftest import create_user
+
+SMALL_DIVES = 10_000
+DIVES = 100_000
+MAX_PEAK_MB = 8
+MAX_GROWTH_MB = 1
+SEED_BATCH = 5000
+NOTE_WORDS = ["turtle", "shark", "manta", "reef", "wall", "wreck", "current", "drift", "coral", "cave"]
+
+async def seed(user_id: int, dives: int):
+    rng = random.Random(42)
+    start = datetime(2010, 1, 1)
+    async with async_engine.begin() as conn:
+        for first in range(1, dives + 1, SEED_BATCH):
+            await conn.execute(insert(DiveLog), [
+                {
+                    "user_id": user_id,
+                    "dive_number": number,
+                    "dive_site_name": f"Site {rng.randint(1, 500)}",
+                    "dive_date": start + timedelta(hours=number * 5),
+                    "max_depth": round(rng.uniform(5, 40), 1),
+                    "dive_duration": rng.randint(25, 70),
+                    "country": rng.choice(["Mexico", "Egypt", "Indonesia", "Spain"]),
+                    "tank_volume": 12.0,
+                    "start_pressure": 200,
+                    "end_pressure": rng.randint(40, 90),
+                    "notes": " ".join(rng.choices(NOTE_WORDS, k=20)),
+                }
+                for number in range(first, min(first + SEED_BATCH, dives + 1))
+            ])
+
+# Los proxies viven hasta el final: Arrow puede liberar buffers suyos más tarde
+_arrow_pools = []
+
+@contextmanager
+def arrow_peak():
+    """Pico de memoria de Arrow dentro del bloque: lista de un elemento, en bytes"""
+    peak = [0]
+    if pa is None:
+        yield peak
+        return
+    pool = pa.proxy_memory_pool(pa.default_memory_pool())
+    _arrow_pools.append(pool)
+    pa.set_memory_pool(pool)
+    try:
+        yield peak
+    finally:
+        pa.set_memory_pool(pa.default_memory_pool())
+        peak[0] = pool.max_memory()
+
+async def export(user_id: int, format: str, compressed: bool) -> tuple:
+    """(bytes exportados, pico de memoria en bytes)"""
+    # Los chunks van a disco para comprobarlos después sin que cuenten en el pico
+    with tempfile.TemporaryFile() as output:
+        with arrow_peak() as native:
+            tracemalloc.start()
+            try:
+                async with AsyncSessionLocal() as db:
+                    async for chunk in export_dive_logs(db, user_id, format, compressed):
+                        output.write(chunk)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        output.seek(0)
+        return output.read(), peak + native[0]
+
+def count_rows(data: bytes, format: str, compressed: bool, dives: int) -> int:
+    if format == "parquet":
+        metadata = pq.ParquetFile(io.BytesIO(data)).metadata
+        assert metadata.num_row_groups == -(-dives // settings.EXPORT_BATCH_SIZE)
+        return metadata.num_rows
+    if compressed:
+        data = gzip.decompress(data)
+    text = data.decode("utf-8")
+    if format == "csv":
+        rows = list(csv.reader(io.StringIO(text)))
+        assert tuple(rows[0]) == EXPORT_FIELDS
+        return len(rows) - 1
+    lines = text.splitlines()
+    assert json.loads(lines[-1])["dive_number"] == dives
+    return len(lines)
+
+@pytest.mark.parametrize("compressed", [False, True], ids=["plain", "gzip"])
+@pytest.mark.parametrize("format", [
+    "csv",
+    "ndjson",
+    pytest.param("parquet", marks=pytest.mark.skipif(pq is None, reason="pyarrow no instalado")),
+])
+def test_export_memory_is_constant(run, user, format, compressed):
+    small_user = run(create_user, "small")
+    peaks = {}
+    for owner, dives in ((small_user, SMALL_DIVES), (user, DIVES)):
+        run(seed, owner.id, dives)
+        data, peaks[dives] = run(export, owner.id, format, compressed)
+        assert count_rows(data, format, compressed, dives) == dives
+
+    mb = 1024 * 1024
+    assert peaks[DIVES] < MAX_PEAK_MB * mb, f"pico {peaks[DIVES] / mb:.1f} MB"
+    growth = peaks[DIVES] - peaks[SMALL_DIVES]
+    assert growth < MAX_GROWTH_MB * mb, f"el pico crece {growth / mb:.1f} MB de {SMALL_DIVES} a {DIVES} dives"
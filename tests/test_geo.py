@@ -0,0 +1,18 @@
+DIVE = {"dive_site_name": "Rainbow Reef", "country": "Fiji", "dive_date": "2024-05-02T09:00:00", "max_depth": 18}
+
+def test_nearby_site_across_antimeridian(client, auth_headers):
+    for lng in (179.99, -179.99):
+        response = client.post(
+            "/api/v1/dive-logs/", headers=auth_headers, json={**DIVE, "location_lat": -16.78, "location_lng": lng}
+        )
+        assert response.status_code == 200, response.text
+
+    response = client.get(
+        "/api/v1/dive-logs/sites/nearby", headers=auth_headers, params={"lat": -16.78, "lng": 180, "radius_km": 10}
+    )
+    assert response.status_code == 200, response.text
+    [site] = response.json()
+    # La media directa de las longitudes (0.0) lo pondría a medio planeta
+    assert abs(abs(site["location_lng"]) - 180) < 0.01
+    assert site["dive_count"] == 2
+    assert site["distance_km"] < 1
@@ -0,0 +1,20 @@
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from app.schemas.dive_log import DiveProfileUpload
+from app.services.profiles import ProfileError, analyze, build_series, pack, unpack
+
+def test_times_from_a_late_start_are_rebased():
+    # Reloj del ordenador: la primera muestra llega a los 3600 s
+    times = [3600 + 20 * index for index in range(10)]
+    series = build_series(DiveProfileUpload(depths=[0, 5, 10, 12, 12, 10, 6, 5, 3, 0], times=times))
+    assert series.times[0] == 0
+    assert series.times[-1] == 180
+
+    stored = unpack(SimpleNamespace(**pack(series, analyze(series))))
+    np.testing.assert_array_equal(stored.times, series.times)
+    np.testing.assert_array_equal(stored.depths, series.depths)
+
+def test_gap_larger_than_int16_delta_is_rejected():
+    with pytest.raises(ProfileError, match=r"Gap between samples too large \(max 3276.7 s\)"):
+        build_series(DiveProfileUpload(depths=[0, 10, 0], times=[0, 60, 60 + 3300]))
@@ -0,0 +1,126 @@
+"""
+Cada endpoint de QUERY_BUDGETS ejecutado dentro de su presupuesto
+
+El usuario autenticado se saca de la caché antes de cada medida: los
+presupuestos incluyen su carga (peor caso).
+"""
+import pytest
+from app.core.query_audit import QUERY_BUDGETS
+from app.core.security import user_cache
+from app.services.stats import STATS_SECTIONS
+
+DIVE = {
+    "dive_site_name": "Ras Mohammed", "country": "Egypt", "dive_date": "2024-03-10T10:00:00",
+    "max_depth": 24, "avg_depth": 14, "dive_duration": 50, "tank_volume": 12,
+    "start_pressure": 200, "end_pressure": 60, "marine_life": "Turtle, Napoleon wrasse",
+    "notes": "Strong current on the reef wall",
+}
+
+covered = set()
+
+def measure(client, query_budget, endpoint: str, method: str, url: str, **kwargs):
+    covered.add(endpoint)
+    user_cache.clear()
+    with query_budget(endpoint) as recorder:
+        response = client.request(method, url, **kwargs)
+    assert response.status_code == 200, response.text
+    assert recorder.count > 0
+    return response
+
+def create_dive(client, auth_headers, **values) -> dict:
+    response = client.post("/api/v1/dive-logs/", headers=auth_headers, json={**DIVE, **values})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+@pytest.fixture
+def dive(client, auth_headers) -> dict:
+    create_dive(client, auth_headers, dive_site_name="Shark Reef", dive_date="2023-08-01T09:00:00")
+    return create_dive(client, auth_headers)
+
+def test_create_dive_log(client, auth_headers, query_budget):
+    # Peor caso: país, sitio y especies nuevos
+    measure(client, query_budget, "app.api.v1.dive_logs:create_dive_log",
+            "POST", "/api/v1/dive-logs/", headers=auth_headers, json=DIVE)
+
+def test_list_dive_logs(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:get_user_dive_logs",
+            "GET", "/api/v1/dive-logs/", headers=auth_headers)
+
+def test_dive_log_detail(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:get_dive_log_detail",
+            "GET", f"/api/v1/dive-logs/{dive['id']}", headers=auth_headers)
+
+def test_update_dive_log(client, auth_headers, dive, query_budget):
+    # Cambia sitio y especies: catálogo, estadísticas y avistamientos
+    measure(client, query_budget, "app.api.v1.dive_logs:update_dive_log",
+            "PUT", f"/api/v1/dive-logs/{dive['id']}", headers=auth_headers,
+            json={"dive_site_name": "Jackfish Alley", "max_depth": 31, "marine_life": "Manta, Turtle"})
+
+def test_delete_dive_log(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:delete_dive_log",
+            "DELETE", f"/api/v1/dive-logs/{dive['id']}", headers=auth_headers)
+
+def test_dive_stats(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:get_dive_stats",
+            "GET", "/api/v1/dive-logs/stats/summary", headers=auth_headers,
+            params={"include": ",".join(STATS_SECTIONS)})
+
+def test_gas_stats(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:get_gas_stats",
+            "GET", "/api/v1/dive-logs/stats/gas", headers=auth_headers)
+
+def test_dive_site_stats(client, auth_headers, dive, query_budget):
+    measure(client, query_budget, "app.api.v1.dive_logs:get_dive_site_stats",
+            "GET", f"/api/v1/dive-logs/sites/{dive['site_id']}", headers=auth_headers)
+
+def test_search(client, auth_headers, dive, query_budget):
+    # Todos los filtros: la consulta de IDs permitidos también cuenta
+    response = measure(client, query_budget, "app.api.v1.dive_logs:search_user_dive_logs",
+                       "GET", "/api/v1/dive-logs/search", headers=auth_headers,
+                       params={"q": "reef cur", "country": "Egypt", "min_depth": 10, "date_from": "2024-01-01"})
+    assert [result["id"] for result in response.json()] == [dive["id"]]
+
+def test_export(client, auth_headers, dive, query_budget):
+    response = measure(client, query_budget, "app.api.v1.dive_logs:export_user_dive_logs",
+                       "GET", "/api/v1/dive-logs/export", headers=auth_headers, params={"format": "ndjson"})
+    assert len(response.content.splitlines()) == 2
+
+def test_upload_and_get_profile(client, auth_headers, dive, query_budget):
+    depths = [0, 5, 12, 18, 18, 15, 10, 5, 5, 5, 5, 0]
+    measure(client, query_budget, "app.api.v1.dive_logs:upload_dive_profile",
+            "PUT", f"/api/v1/dive-logs/{dive['id']}/profile", headers=auth_headers,
+            json={"depths": depths, "interval_seconds": 60})
+    measure(client, query_budget, "app.api.v1.dive_logs:get_dive_profile",
+            "GET", f"/api/v1/dive-logs/{dive['id']}/profile", headers=auth_headers)
+
+def test_species_endpoints(client, auth_headers, dive, query_budget):
+    species = measure(client, query_budget, "app.api.v1.species:list_species",
+                      "GET", "/api/v1/species/", headers=auth_headers, params={"q": "tur"}).json()
+    measure(client, query_budget, "app.api.v1.species:get_species_sightings",
+            "GET", f"/api/v1/species/{species[0]['species_id']}", headers=auth_headers)
+    measure(client, query_budget, "app.api.v1.species:get_site_seasonality",
+            "GET", f"/api/v1/species/sites/{dive['site_id']}/seasonality", headers=auth_headers)
+
+def test_auth_endpoints(client, query_budget):
+    credentials = {"email": "new@example.com", "password": "s3cret-pass"}
+    measure(client, query_budget, "app.api.v1.auth:register_user",
+            "POST", "/api/v1/auth/register", json={**credentials, "username": "new"})
+    token = measure(client, query_budget, "app.api.v1.auth:login_user",
+                    "POST", "/api/v1/auth/login", json=credentials).json()["access_token"]
+    measure(client, query_budget, "app.api.v1.auth:get_current_user_profile",
+            "GET", "/api/v1/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+def test_legacy_endpoints(client, query_budget):
+    credentials = {"email": "legacy@example.com", "password": "s3cret-pass"}
+    user_id = measure(client, query_budget, "app.main:register_user_simple",
+                      "POST", "/api/v1/register", params={**credentials, "username": "legacy"}).json()["user_id"]
+    measure(client, query_budget, "app.main:login_user_simple", "POST", "/api/v1/login", params=credentials)
+    measure(client, query_budget, "app.main:create_dive_log", "POST", "/api/v1/dive-logs", params={
+        "user_id": user_id, "dive_site_name": "Blue Hole", "max_depth": 30, "dive_date": "15/01/2025",
+        "country": "Egypt", "marine_life": "Turtle",
+    })
+    measure(client, query_budget, "app.main:get_user_dive_logs", "GET", f"/api/v1/users/{user_id}/dive-logs")
+
+def test_every_budget_is_covered():
+    # Se ejecuta al final del módulo (orden de declaración)
+    assert covered == set(QUERY_BUDGETS)
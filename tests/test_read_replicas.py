@@ -0,0 +1,109 @@
+"""
+Réplicas de lectura con dos SQLite: cada réplica guarda un dive distinto
+(max_depth) para saber desde qué base de datos se leyó cada respuesta
+"""
+from datetime import datetime
+import pytest
+from app.api.v1 import dive_logs
+from app.core import database
+from app.core.cache import MemoryCacheBackend
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, Base, ReadReplicaRouter
+from app.core.response_cache import ResponseCache
+from app.models.dive_log import DiveLog
+from app.models.user import User
+
+PRIMARY_DEPTH = 30.0
+REPLICA_DEPTHS = (10.0, 20.0)
+
+async def copy_user(sessionmaker, user: User):
+    async with sessionmaker() as db:
+        db.add(User(
+            id=user.id, email=user.email, username=user.username, hashed_password="x", is_active=True
+        ))
+        await db.commit()
+
+async def add_dive(sessionmaker, user_id: int, max_depth: float):
+    async with sessionmaker() as db:
+        db.add(DiveLog(
+            user_id=user_id, dive_number=1, dive_date=datetime(2024, 5, 1, 9),
+            dive_site_name="Coral Garden", max_depth=max_depth,
+        ))
+        await db.commit()
+
+def make_router(paths) -> ReadReplicaRouter:
+    return ReadReplicaRouter([f"sqlite:///{path}" for path in paths])
+
+async def create_schema(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+@pytest.fixture
+def router(run, user, tmp_path, monkeypatch):
+    router = make_router([tmp_path / "replica-0.db", tmp_path / "replica-1.db"])
+    for replica, depth in zip(router.replicas, REPLICA_DEPTHS):
+        run(create_schema, replica.engine)
+        run(copy_user, replica.sessionmaker, user)
+        run(add_dive, replica.sessionmaker, user.id, depth)
+    run(add_dive, AsyncSessionLocal, user.id, PRIMARY_DEPTH)
+    monkeypatch.setattr(database, "read_router", router)
+    yield router
+    run(router.close)
+
+@pytest.fixture
+def cache(monkeypatch) -> ResponseCache:
+    cache = ResponseCache(MemoryCacheBackend())
+    monkeypatch.setattr(dive_logs, "response_cache", cache)
+    return cache
+
+def listed_depths(client, auth_headers) -> list:
+    response = client.get("/api/v1/dive-logs/", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return [dive["max_depth"] for dive in response.json()]
+
+def test_reads_rotate_between_healthy_replicas(client, run, router, auth_headers):
+    run(router.check_all)
+    assert [status["healthy"] for status in router.status()] == [True, True]
+    depths = [listed_depths(client, auth_headers) for _ in range(4)]
+    assert sorted(map(tuple, depths[:2])) == [(10.0,), (20.0,)]
+    assert depths[2:] == depths[:2]
+
+def test_unhealthy_replicas_fall_back_to_primary(client, run, router, auth_headers, tmp_path):
+    # Directorio inexistente: SQLite no puede abrir el fichero
+    broken = make_router([tmp_path / "missing" / "replica.db"])
+    run(broken.check_all)
+    assert broken.status()[0]["healthy"] is False
+    assert broken.status()[0]["last_error"]
+    run(broken.close)
+
+    router.replicas[0].healthy = False
+    assert {tuple(listed_depths(client, auth_headers)) for _ in range(3)} == {(20.0,)}
+    router.replicas[1].healthy = False
+    assert router.choose() is None
+    assert listed_depths(client, auth_headers) == [PRIMARY_DEPTH]
+
+def test_commit_sets_read_your_writes_cookie(client, router, auth_headers):
+    response = client.get("/api/v1/dive-logs/", headers=auth_headers)
+    assert settings.READ_YOUR_WRITES_COOKIE not in response.headers.get("set-cookie", "")
+
+    response = client.post("/api/v1/dive-logs/", headers=auth_headers, json={
+        "dive_site_name": "Blue Hole", "country": "Egypt", "dive_date": "2024-05-02T09:00:00", "max_depth": 40,
+    })
+    assert response.status_code == 200, response.text
+    assert settings.READ_YOUR_WRITES_COOKIE in response.headers["set-cookie"]
+    # El cliente guarda la cookie: las lecturas siguientes van al primario
+    for _ in range(2):
+        assert sorted(listed_depths(client, auth_headers)) == [PRIMARY_DEPTH, 40.0]
+
+def test_replica_responses_are_not_cached(client, router, cache, auth_headers):
+    for _ in range(2):
+        response = client.get("/api/v1/dive-logs/", headers=auth_headers)
+        assert response.status_code == 200, response.text
+        assert "x-cache" not in response.headers
+    assert cache.metrics["dive_logs:list"]["hits"] == 0
+
+    for replica in router.replicas:
+        replica.healthy = False
+    assert [client.get("/api/v1/dive-logs/", headers=auth_headers).headers["x-cache"] for _ in range(2)] == [
+        "MISS", "HIT"
+    ]
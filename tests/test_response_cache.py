@@ -0,0 +1,23 @@
+import asyncio
+import time
+import pytest
+from app.core.cache import MemoryCacheBackend
+from app.core.response_cache import ResponseCache
+
+def test_lock_released_when_compute_fails():
+    cache = ResponseCache(MemoryCacheBackend(), lock_wait=2.0)
+
+    async def failing():
+        raise LookupError("dive not found")
+
+    async def scenario() -> float:
+        with pytest.raises(LookupError):
+            await cache.get_or_compute("resp:1", "detail", failing)
+        started = time.monotonic()
+        with pytest.raises(LookupError):
+            await cache.get_or_compute("resp:1", "detail", failing)
+        return time.monotonic() - started
+
+    # Con el lock pendiente la segunda petición esperaría lock_wait (2 s)
+    assert asyncio.run(scenario()) < 0.5
+    assert asyncio.run(cache.backend.get("lock:resp:1")) is None
@@ -0,0 +1,61 @@
+from app.main import app
+
+def _routes() -> set:
+    return {(method, route.path) for route in app.routes for method in getattr(route, "methods", ())}
+
+def test_dive_log_router_is_mounted():
+    routes = _routes()
+    for path in (
+        "/api/v1/dive-logs/import",
+        "/api/v1/dive-logs/search",
+        "/api/v1/dive-logs/export",
+        "/api/v1/dive-logs/nearby",
+        "/api/v1/dive-logs/sites/nearby",
+        "/api/v1/dive-logs/sites/{site_id}",
+        "/api/v1/dive-logs/{dive_id}/profile",
+        "/api/v1/dive-logs/stats/gas",
+        "/api/v1/dive-logs/stats/summary",
+    ):
+        assert any(route_path == path for _, route_path in routes), path
+
+def test_router_paths_are_not_captured_by_legacy_listing(client, auth_headers):
+    response = client.get("/api/v1/dive-logs/stats/gas", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["dives"] == 0
+
+def test_dive_log_detail_is_the_authenticated_route(client, user, auth_headers):
+    dive = {"dive_site_name": "Blue Hole", "dive_date": "2024-03-01T10:00:00", "max_depth": 30}
+    created = client.post("/api/v1/dive-logs/", headers=auth_headers, json=dive).json()
+
+    response = client.get(f"/api/v1/dive-logs/{created['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["id"] == created["id"]
+    assert "etag" in response.headers
+    # Sin token ya no lo atiende el listado legacy por user_id
+    assert client.get(f"/api/v1/dive-logs/{created['id']}").status_code in (401, 403)
+
+def test_legacy_listing_by_user_id(client, user):
+    response = client.get(f"/api/v1/users/{user.id}/dive-logs")
+    assert response.status_code == 200
+    assert response.json()["dive_logs"] == []
+
+def test_import_endpoint(client, auth_headers):
+    body = "dive_site_name,dive_date,max_depth,country\nBlue Hole,2024-03-01,30,Egypt\nReef,bad date,12,Egypt\n"
+    response = client.post(
+        "/api/v1/dive-logs/import", content=body, headers={**auth_headers, "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 1
+    assert report["failed"] == 1
+
+def test_import_settles_day_month_order_per_batch(client, auth_headers):
+    # 01/15 solo vale como MM/DD: 02/03 del mismo archivo es 3 de febrero
+    body = "dive_site_name,dive_date,max_depth\nReef,01/15/2024,12\nWall,02/03/2024,20\n"
+    response = client.post(
+        "/api/v1/dive-logs/import", content=body, params={"date_order": "dmy"},
+        headers={**auth_headers, "Content-Type": "text/csv"},
+    )
+    assert response.json()["imported"] == 2
+    dives = client.get("/api/v1/dive-logs/", headers=auth_headers).json()
+    assert sorted(dive["dive_date"][:10] for dive in dives) == ["2024-01-15", "2024-02-03"]
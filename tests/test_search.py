@@ -0,0 +1,33 @@
+from app.core.cache import TTLCache
+from app.services import search
+
+def test_cache_evicts_by_weight():
+    cache = TTLCache(maxsize=10, ttl=60, maxweight=100)
+    cache.set("a", 1, weight=60)
+    cache.set("b", 2, weight=30)
+    cache.set("c", 3, weight=20)
+    assert cache.get("a") is None
+    assert cache.weight == 50
+    # Mayor que todo el presupuesto: no se guarda ni desaloja a nadie
+    cache.set("d", 4, weight=101)
+    assert cache.get("d") is None
+    assert (cache.get("b"), cache.get("c")) == (2, 3)
+    cache.set("b", 5, weight=10)
+    assert cache.weight == 30
+
+def test_filtered_search_reads_past_first_chunk(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(search, "SEARCH_FETCH_CHUNK", 1)
+    for day, depth in enumerate((10, 12, 30, 14, 35), start=1):
+        response = client.post("/api/v1/dive-logs/", headers=auth_headers, json={
+            "dive_site_name": "Coral Garden", "country": "Egypt",
+            "dive_date": f"2024-05-{day:02}T09:00:00", "max_depth": depth,
+        })
+        assert response.status_code == 200, response.text
+
+    response = client.get(
+        "/api/v1/dive-logs/search", headers=auth_headers,
+        params={"q": "coral", "min_depth": 25, "limit": 1, "offset": 1},
+    )
+    assert response.status_code == 200, response.text
+    # Empate de relevancia: más reciente primero; solo quedan 35 m y 30 m
+    assert [dive["max_depth"] for dive in response.json()] == [30]
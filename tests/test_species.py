@@ -0,0 +1,74 @@
+from sqlalchemy import select
+from app.core.database import AsyncSessionLocal
+from app.models.species import DiveSighting, Species
+from app.services.sightings import parse_species, species_catalog
+
+def test_parse_species():
+    assert parse_species("Turtle, manta; turtle\nMoray") == ["Turtle", "manta", "Moray"]
+    assert parse_species('[{"name": "Whale shark"}, "Nudibranch"]') == ["Whale shark", "Nudibranch"]
+    assert parse_species("   ") == []
+
+async def _resolve(marine_life: str, commit: bool):
+    async with AsyncSessionLocal() as db:
+        ids = await species_catalog.resolve(db, marine_life)
+        # La misma transacción vuelve a ver sus altas sin ir a la base de datos
+        assert await species_catalog.resolve(db, marine_life) == ids
+        if commit:
+            await db.commit()
+        else:
+            await db.rollback()
+        return ids
+
+async def _species_count() -> int:
+    async with AsyncSessionLocal() as db:
+        return len((await db.execute(select(Species.id))).all())
+
+def test_species_reach_the_cache_only_after_commit(run):
+    run(_resolve, "Turtle, Manta", False)
+    assert species_catalog.stats()["species"] == 0
+    assert run(_species_count) == 0
+
+    ids = run(_resolve, "Turtle, Manta", True)
+    assert species_catalog.stats()["species"] == 2
+    assert run(_resolve, "manta", True) == ids[1:]
+
+def _create(client, auth_headers, site: str, month: int, marine_life: str) -> int:
+    response = client.post("/api/v1/dive-logs/", headers=auth_headers, json={
+        "dive_site_name": site, "country": "Egypt", "dive_date": f"2024-{month:02d}-10T10:00:00",
+        "max_depth": 20, "marine_life": marine_life,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_species_endpoints(client, auth_headers):
+    first = _create(client, auth_headers, "Ras Mohammed", 3, "Turtle, Napoleon wrasse")
+    _create(client, auth_headers, "Ras Mohammed", 3, "turtle")
+    _create(client, auth_headers, "Ras Mohammed", 7, "Turtle")
+
+    species = client.get("/api/v1/species/", params={"q": "tur"}, headers=auth_headers).json()
+    assert [(entry["name"], entry["sightings"]) for entry in species] == [("Turtle", 3)]
+
+    detail = client.get(f"/api/v1/species/{species[0]['species_id']}", headers=auth_headers).json()
+    assert detail["by_month"][2] == 2 and detail["by_month"][6] == 1
+    assert detail["sites"][0]["site_id"] == first["site_id"]
+
+    seasonality = client.get(f"/api/v1/species/sites/{first['site_id']}/seasonality", headers=auth_headers).json()
+    assert {entry["name"]: entry["total"] for entry in seasonality["species"]} == {"Turtle": 3, "Napoleon wrasse": 1}
+
+    assert client.get("/api/v1/species/999999", headers=auth_headers).status_code == 404
+
+async def _sightings(dive_id: int) -> list:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Species.name).join(DiveSighting, DiveSighting.species_id == Species.id)
+            .where(DiveSighting.dive_log_id == dive_id).order_by(Species.name)
+        )
+        return result.scalars().all()
+
+def test_legacy_create_writes_sightings(client, run, user):
+    response = client.post("/api/v1/dive-logs", params={
+        "user_id": user.id, "dive_site_name": "Dahab Canyon", "max_depth": 28, "dive_date": "15/01/2025",
+        "country": "Egypt", "marine_life": "Lionfish, Moray",
+    })
+    assert response.status_code == 200, response.text
+    assert run(_sightings, response.json()["dive_id"]) == ["Lionfish", "Moray"]